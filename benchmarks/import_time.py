@@ -0,0 +1,146 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+# The modules that `import dexofuzzy` must not load before a sample is hashed.
+HEAVY_MODULES = ("numpy", "zipfile", "multiprocessing", "sqlite3", "http.server", "ssdeep")
+
+# Each case is timed from process start to exit, so the interpreter start-up is included.
+CASES = {
+    "python": [sys.executable, "-c", "pass"],
+    "import": [sys.executable, "-c", "import dexofuzzy"],
+    "version": [sys.executable, "-m", "dexofuzzy", "-v"],
+    "score": [sys.executable, "-m", "dexofuzzy", "-s", "3:abcdefgh:abc", "3:abcdefgz:abc"],
+}
+
+
+def time_command(command, repeat):
+    """
+    This function times a command.
+    :param command: list of arguments
+    :param repeat: the number of runs
+    :return: list of seconds
+    """
+
+    seconds = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - start)
+
+    return seconds
+
+
+def get_loaded_modules():
+    """
+    This function lists the heavy modules loaded by `import dexofuzzy`.
+    :return: list of module names
+    """
+
+    code = (
+        "import sys, dexofuzzy; "
+        f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+
+    return output.stdout.split()
+
+
+def get_slowest_imports(command, top):
+    """
+    This function lists the slowest imports of a command with -X importtime.
+    :param command: list of arguments, starting with the interpreter
+    :param top: the number of imports returned
+    :return: list of (module name, cumulative milliseconds)
+    """
+
+    output = subprocess.run(
+        [command[0], "-X", "importtime"] + command[1:], capture_output=True, text=True
+    )
+    imports = []
+
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+
+        if cumulative.strip().isdigit():
+            imports.append((name.strip(), int(cumulative) / 1000))
+
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.import_time",
+        description="Dexofuzzy import and CLI start-up time",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="runs per case (default: 20)")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="fail if the median of a case exceeds plain python by more than "
+                        + "this many milliseconds (default: 50)")
+    parser.add_argument("--top", type=int, default=0,
+                        help="also list the N slowest imports of each case")
+    parser.add_argument("-j", "--json", metavar="JSON_FILENAME", help="output as json format")
+    args = parser.parse_args(argv)
+
+    report = {"cases": {}, "loaded_modules": get_loaded_modules()}
+
+    for name, command in CASES.items():
+        seconds = time_command(command, args.repeat)
+        report["cases"][name] = {
+            "min_ms": min(seconds) * 1000,
+            "median_ms": statistics.median(seconds) * 1000,
+        }
+
+        if args.top:
+            report["cases"][name]["slowest_imports"] = get_slowest_imports(command, args.top)
+
+    baseline = report["cases"]["python"]["median_ms"]
+    report["over_budget"] = [
+        name for name, case in report["cases"].items() if case["median_ms"] - baseline > args.budget_ms
+    ]
+
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as json_file:
+            json.dump(report, json_file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    for name in report["over_budget"]:
+        overhead = report["cases"][name]["median_ms"] - baseline
+        print(f"{name} takes {overhead:.1f} ms over plain python, budget {args.budget_ms:.1f} ms", file=sys.stderr)
+
+    for name in report["loaded_modules"]:
+        print(f"import dexofuzzy loads {name}", file=sys.stderr)
+
+    if report["over_budget"] or report["loaded_modules"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
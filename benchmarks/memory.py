@@ -0,0 +1,226 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Internal packages
+from benchmarks.synthetic import SyntheticDex
+
+
+# Each mode hashes the corpus in a fresh interpreter, the way a long-running worker would.
+MODES = ("arena", "bytes")
+
+
+def get_rss():
+    """
+    This function reads the resident set size of this process. Without
+    /proc, the peak resident set size is returned instead.
+    :return: the number of bytes
+    """
+
+    try:
+        with open("/proc/self/statm", encoding="UTF-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def write_corpus(directory, samples, classes, seed):
+    """
+    This function writes a corpus of apk files of four sizes, interleaved so
+    that buffers of every size are allocated and freed throughout the run.
+    :param directory: string
+    :param samples: the number of apk files
+    :param classes: the number of classes per dex of the largest size
+    :param seed: int
+    :return: list of file path
+    """
+
+    sizes = [max(1, classes >> shift) for shift in (3, 2, 1, 0)]
+    groups = []
+
+    for size_idx, size in enumerate(sizes):
+        synthetic = SyntheticDex(classes=size, seed=seed + size_idx)
+        groups.append(synthetic.write_corpus(
+            os.path.join(directory, f"classes_{size}"),
+            samples=(samples + size_idx) // len(sizes),
+            families=8,
+        ))
+
+    return [group[idx] for idx in range(max(map(len, groups))) for group in groups if idx < len(group)]
+
+
+def run_mode(mode, file_paths, passes, interval):
+    """
+    This function hashes the corpus in this process and samples its resident set size.
+    :param mode: "arena" to read through a BufferArena, "bytes" to read into new bytes objects
+    :param file_paths: list of file path
+    :param passes: the number of times the corpus is hashed
+    :param interval: the number of samples between two measures
+    :return: dict
+    """
+
+    from dexofuzzy.core.arena import BufferArena
+    from dexofuzzy.core.generator import Generator
+
+    arena = BufferArena() if mode == "arena" else None
+    points = [(0, get_rss())]
+    errors = 0
+    started = time.perf_counter()
+
+    for idx in range(len(file_paths) * passes):
+        file_path = file_paths[idx % len(file_paths)]
+
+        try:
+            if arena is not None:
+                arena.get_digest(file_path)
+            else:
+                with open(file_path, "rb") as file:
+                    hashlib.sha256(file.read()).digest()
+
+            Generator(arena=arena).get_dexofuzzy(file_path)
+
+        except Exception:
+            errors += 1
+
+        if (idx + 1) % interval == 0:
+            points.append((idx + 1, get_rss()))
+
+    report = {}
+    report["seconds"] = time.perf_counter() - started
+    report["samples"] = len(file_paths) * passes
+    report["errors"] = errors
+    report["points"] = points
+    report["arena_allocations"] = arena.allocations if arena is not None else None
+
+    return report
+
+
+def get_growth(points, warmup):
+    """
+    This function measures how the resident set size moves after the warm-up.
+    :param points: list of (sample count, bytes)
+    :param warmup: the number of samples left out
+    :return: dict
+    """
+
+    steady = [(count, rss) for count, rss in points if count >= warmup] or points[-1:]
+    counts = [count for count, _ in steady]
+    sizes = [rss for _, rss in steady]
+    mean_count = sum(counts) / len(counts)
+    mean_size = sum(sizes) / len(sizes)
+    variance = sum((count - mean_count) ** 2 for count in counts)
+
+    # The least-squares slope, so that a single spike does not count as growth.
+    slope = sum(
+        (count - mean_count) * (rss - mean_size) for count, rss in steady
+    ) / variance if variance else 0.0
+
+    growth = {}
+    growth["rss_start_mb"] = sizes[0] / (1 << 20)
+    growth["rss_end_mb"] = sizes[-1] / (1 << 20)
+    growth["rss_max_mb"] = max(sizes) / (1 << 20)
+    growth["growth_mb"] = (sizes[-1] - sizes[0]) / (1 << 20)
+    growth["slope_kb_per_1000_samples"] = slope * 1000 / 1024
+
+    return growth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.memory",
+        description="Dexofuzzy resident memory over a long batch",
+    )
+    parser.add_argument("--samples", type=int, default=2000, help="apk files in the corpus (default: 2000)")
+    parser.add_argument("--classes", type=int, default=80,
+                        help="classes per dex of the largest apk files, the others have 1/2, 1/4 and 1/8 "
+                        + "(default: 80)")
+    parser.add_argument("--passes", type=int, default=1, help="times the corpus is hashed (default: 1)")
+    parser.add_argument("--interval", type=int, default=50, help="samples between two measures (default: 50)")
+    parser.add_argument("--warmup", type=int, default=200,
+                        help="samples hashed before the growth is measured (default: 200)")
+    parser.add_argument("--max-growth-mb", type=float, default=8.0,
+                        help="fail if the resident set size of the arena mode grows by more than "
+                        + "this many megabytes after the warm-up (default: 8)")
+    parser.add_argument("--directory", help="hash the apk files of this directory instead of a synthetic corpus")
+    parser.add_argument("--seed", type=int, default=0, help="(default: 0)")
+    parser.add_argument("-j", "--json", metavar="JSON_FILENAME", help="output as json format")
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--file-list", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        with open(args.file_list, encoding="UTF-8") as file_list:
+            file_paths = file_list.read().splitlines()
+
+        print(json.dumps(run_mode(args.run, file_paths, args.passes, args.interval)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.directory:
+            file_paths = sorted(
+                os.path.join(root, name) for root, _, names in os.walk(args.directory) for name in names
+            )
+        else:
+            file_paths = write_corpus(directory, args.samples, args.classes, args.seed)
+
+        list_path = os.path.join(directory, "files.txt")
+        with open(list_path, "w", encoding="UTF-8") as file_list:
+            file_list.write("\n".join(file_paths))
+
+        report = {"parameters": vars(args), "modes": {}}
+
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.memory", "--run", mode, "--file-list", list_path,
+                 "--passes", str(args.passes), "--interval", str(args.interval)],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(output.stdout)
+            result.update(get_growth(result["points"], args.warmup))
+            report["modes"][mode] = result
+
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as json_file:
+            json.dump(report, json_file, indent=4)
+    else:
+        print(json.dumps(
+            {mode: {key: value for key, value in result.items() if key != "points"}
+             for mode, result in report["modes"].items()},
+            indent=4,
+        ))
+
+    arena = report["modes"]["arena"]
+    if arena["growth_mb"] > args.max_growth_mb:
+        print(f"arena grows by {arena['growth_mb']:.1f} MB after {args.warmup} samples, "
+              + f"budget {args.max_growth_mb:.1f} MB", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
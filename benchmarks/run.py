@@ -0,0 +1,293 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Internal packages
+from benchmarks.synthetic import SyntheticDex
+from dexofuzzy.core.arena import BufferArena
+from dexofuzzy.core.backend import get_backend, set_backend
+from dexofuzzy.core.dex.extractor import Extractor, _DexReader
+from dexofuzzy.core.discovery import Discovery
+from dexofuzzy.core.generator import Generator
+from dexofuzzy.core.minhash import MinHashLSH, numpy
+from dexofuzzy.core.partial_matching import PartialMatching
+from dexofuzzy.core.record import Record, RecordTable
+
+
+class Benchmark:
+    """
+    This class times each stage of dexofuzzy on a synthetic corpus.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.stages = {}
+
+    def run(self):
+        """
+        This function runs every stage.
+        :return: dict
+        """
+
+        synthetic = SyntheticDex(
+            classes=self.args.classes,
+            methods_per_class=self.args.methods_per_class,
+            method_length=self.args.method_length,
+            switch_density=self.args.switch_density,
+            array_density=self.args.array_density,
+            support_share=self.args.support_share,
+            seed=self.args.seed,
+        )
+        dex_data = synthetic.get_dex()
+        opcodes_list = Extractor().get_opcodes(dex_data)
+        method_fuzzy_list = get_backend().hash_many(opcodes_list)
+        feature = "".join(method_fuzzy.split(":")[1] for method_fuzzy in method_fuzzy_list)
+        megabytes = len(dex_data) / 1e6
+
+        self.measure("parse_tables", self.__parse_tables, (dex_data,), megabytes, "MB/s")
+        self.measure(
+            "decode_opcodes", self.__decode_opcodes, (dex_data,), megabytes, "MB/s",
+            setup=self.__parse_tables,
+        )
+        self.measure("extract", self.__extract, (dex_data,), megabytes, "MB/s")
+        self.measure("hash_methods", get_backend().hash_many, (opcodes_list,), len(opcodes_list), "methods/s")
+        self.measure("hash_final", get_backend().hash, (feature,), 1, "hashes/s")
+
+        with tempfile.TemporaryDirectory() as directory:
+            synthetic.write_corpus(
+                directory,
+                samples=self.args.samples,
+                families=self.args.families,
+                dex_count=self.args.dex_count,
+                mutation_rate=self.args.mutation_rate,
+            )
+            self.measure("scan_directory", self.__scan_directory, (directory,), self.args.samples, "samples/s")
+            dexofuzzy_list = self.__scan_directory(directory)
+
+        self.measure("clustering", self.__clustering, (dexofuzzy_list,), len(dexofuzzy_list), "samples/s")
+
+        if numpy is not None:
+            self.measure(
+                "minhash_clustering", self.__minhash_clustering, (dexofuzzy_list,),
+                len(dexofuzzy_list), "samples/s"
+            )
+
+        records = self.__get_records(dexofuzzy_list)
+        self.measure("records_dict", self.__records_dict, (records,), len(records), "records/s")
+        self.measure("records_table", self.__records_table, (records,), len(records), "records/s")
+
+        report = {}
+        report["environment"] = {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "backend": getattr(get_backend(), "name", type(get_backend()).__name__),
+            "numpy": numpy.__version__ if numpy is not None else None,
+        }
+        report["parameters"] = {
+            key: value for key, value in vars(self.args).items() if key not in ("json", "compare")
+        }
+        report["corpus"] = {
+            "dex_size": len(dex_data),
+            "methods": len(opcodes_list),
+            "opcodes": sum(len(opcodes) for opcodes in opcodes_list) // 2,
+        }
+        report["stages"] = self.stages
+
+        return report
+
+    def measure(self, name, function, args, amount, unit, setup=None):
+        """
+        This function times a stage, then measures its peak memory in a separate run.
+        :param name: string
+        :param function: callable
+        :param args: tuple
+        :param amount: the amount of work per run, in `unit` seconds
+        :param unit: string
+        :param setup: untimed callable turning args into the argument of function
+        """
+
+        timings = []
+        for _ in range(self.args.repeat):
+            prepared = (setup(*args),) if setup else args
+            started = time.perf_counter()
+            function(*prepared)
+            timings.append(time.perf_counter() - started)
+
+        prepared = (setup(*args),) if setup else args
+        tracemalloc.start()
+        function(*prepared)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        best = min(timings)
+        stage = {}
+        stage["seconds"] = best
+        stage["median_seconds"] = statistics.median(timings)
+        stage["throughput"] = amount / best if best else None
+        stage["unit"] = unit
+        stage["peak_memory"] = peak
+        self.stages[name] = stage
+
+        print(f"{name:<20}{best:>12.4f} s{stage['throughput']:>16.1f} {unit:<10}{peak / 1e6:>10.1f} MB",
+              file=sys.stderr)
+
+    def __parse_tables(self, dex_data):
+        # The stages below reach into the reader behind Extractor to time its steps one by one.
+        reader = _DexReader(dex_data)
+        reader.parse_tables()
+        return reader
+
+    def __decode_opcodes(self, reader):
+        reader.decode_opcodes()
+        return reader.opcodes_in_methods
+
+    def __extract(self, dex_data):
+        return Extractor().get_opcodes(dex_data)
+
+    def __scan_directory(self, directory):
+        # The same steps as dexofuzzy -d: discover, hash the file, then extract and hash its dex files.
+        arena = BufferArena()
+        generator = Generator(arena=arena)
+        dexofuzzy_list = RecordTable()
+
+        for file_path, _ in Discovery().scan(directory):
+            try:
+                digest = arena.get_digest(file_path)
+                dexofuzzy = generator.get_dexofuzzy(file_path)
+
+            except Exception:
+                continue
+
+            dexofuzzy_list.append(Record(file_path, digest, os.path.getsize(file_path), dexofuzzy))
+
+        return dexofuzzy_list
+
+    def __clustering(self, dexofuzzy_list):
+        partial_matching = PartialMatching(self.args.n_gram, self.args.m_partial_matching)
+        return partial_matching.get_clustering(
+            [dexofuzzy.split(":")[1] for dexofuzzy in dexofuzzy_list.get_dexofuzzy_list()]
+        )
+
+    def __minhash_clustering(self, dexofuzzy_list):
+        return MinHashLSH(self.args.n_gram, 0.5).get_pairs(dexofuzzy_list.get_dexofuzzy_list())
+
+    def __get_records(self, dexofuzzy_list):
+        # Each sample of the corpus is repeated under a new name and sha256 to fill --records.
+        samples = itertools.cycle(dexofuzzy_list)
+        return [
+            (f"/samples/{idx // 1000:04d}/sample_{idx:08d}.apk", idx.to_bytes(32, "big"), sample.size,
+             sample.dexofuzzy)
+            for idx, sample in zip(range(self.args.records), samples)
+        ]
+
+    def __records_dict(self, records):
+        return [
+            {"name": name, "sha256": digest.hex(), "size": str(size), "dexofuzzy": dexofuzzy}
+            for name, digest, size, dexofuzzy in records
+        ]
+
+    def __records_table(self, records):
+        dexofuzzy_list = RecordTable()
+
+        for name, digest, size, dexofuzzy in records:
+            dexofuzzy_list.append(Record(name, digest, size, dexofuzzy))
+
+        return dexofuzzy_list
+
+
+def compare_reports(baseline, current):
+    """
+    This function compares the stages of two benchmark reports.
+    :param baseline: dict
+    :param current: dict
+    :return: dict of {stage: current seconds / baseline seconds}
+    """
+
+    ratios = {}
+    for name, stage in current["stages"].items():
+        if name in baseline["stages"] and baseline["stages"][name]["seconds"]:
+            ratios[name] = stage["seconds"] / baseline["stages"][name]["seconds"]
+
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Dexofuzzy benchmarks on a synthetic corpus",
+    )
+    parser.add_argument("--classes", type=int, default=500, help="classes per dex (default: 500)")
+    parser.add_argument("--methods-per-class", type=int, default=10, help="(default: 10)")
+    parser.add_argument("--method-length", type=int, default=40,
+                        help="mean instructions per method (default: 40)")
+    parser.add_argument("--switch-density", type=float, default=0.05,
+                        help="share of methods with a switch payload (default: 0.05)")
+    parser.add_argument("--array-density", type=float, default=0.05,
+                        help="share of methods with an array payload (default: 0.05)")
+    parser.add_argument("--support-share", type=float, default=0.2,
+                        help="share of android.support classes (default: 0.2)")
+    parser.add_argument("--samples", type=int, default=20, help="apk files in the corpus (default: 20)")
+    parser.add_argument("--families", type=int, default=4, help="groups of similar apk files (default: 4)")
+    parser.add_argument("--dex-count", type=int, default=2, help="dex files per apk (default: 2)")
+    parser.add_argument("--mutation-rate", type=float, default=0.01,
+                        help="share of methods that differ within a family (default: 0.01)")
+    parser.add_argument("--n-gram", type=int, default=7, help="-g N (default: 7)")
+    parser.add_argument("--m-partial-matching", type=int, default=1, help="-g M (default: 1)")
+    parser.add_argument("--records", type=int, default=100000,
+                        help="results accumulated by the records stages (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="(default: 0)")
+    parser.add_argument("--backend", help="the fuzzy hash backend")
+    parser.add_argument("-j", "--json", metavar="JSON_FILENAME", help="output as json format")
+    parser.add_argument("--compare", metavar="JSON_FILENAME",
+                        help="print the time ratio of each stage against an earlier result")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        set_backend(args.backend)
+
+    report = Benchmark(args).run()
+
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as json_file:
+            json.dump(report, json_file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.compare:
+        with open(args.compare, encoding="UTF-8") as json_file:
+            baseline = json.load(json_file)
+
+        for name, ratio in compare_reports(baseline, report).items():
+            print(f"{name:<20}{ratio:>8.2f}x", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import hashlib
+import io
+import os
+import random
+import struct
+import zipfile
+import zlib
+
+# (opcode, code units, weight) of common Dalvik instructions
+INSTRUCTIONS = [
+    (0x01, 1, 3), (0x07, 1, 4), (0x0a, 1, 6), (0x0c, 1, 8), (0x0f, 1, 2),
+    (0x11, 1, 2), (0x12, 1, 8), (0x21, 1, 1), (0x28, 1, 3), (0xb0, 1, 2),
+    (0x13, 2, 2), (0x1a, 2, 6), (0x1c, 2, 1), (0x1f, 2, 3), (0x22, 2, 4),
+    (0x38, 2, 4), (0x39, 2, 4), (0x32, 2, 1), (0x52, 2, 3), (0x59, 2, 2),
+    (0x54, 2, 5), (0x5b, 2, 3), (0x60, 2, 1), (0x62, 2, 3), (0x69, 2, 1),
+    (0x90, 2, 1), (0x44, 2, 1), (0xd8, 2, 2), (0x23, 2, 1), (0x29, 2, 1),
+    (0x6e, 3, 14), (0x70, 3, 8), (0x71, 3, 7), (0x72, 3, 3), (0x6f, 3, 1),
+    (0x74, 3, 1), (0x14, 3, 1), (0x1b, 3, 1), (0x18, 5, 1),
+]
+
+PACKED_SWITCH = 0x2b
+SPARSE_SWITCH = 0x2c
+FILL_ARRAY_DATA = 0x26
+RETURN_VOID = 0x0e
+
+
+class SyntheticDex:
+    """
+    This class generates reproducible synthetic dex files for benchmarking.
+    """
+
+    def __init__(self, classes=200, methods_per_class=10, method_length=40,
+                 switch_density=0.05, array_density=0.05, support_share=0.2, seed=0):
+        self.classes = classes
+        self.methods_per_class = methods_per_class
+        self.method_length = method_length
+        self.switch_density = switch_density
+        self.array_density = array_density
+        self.support_share = support_share
+        self.seed = seed
+
+        self.__opcodes = [opcode for opcode, _, _ in INSTRUCTIONS]
+        self.__units = {opcode: units for opcode, units, _ in INSTRUCTIONS}
+        self.__weights = [weight for _, _, weight in INSTRUCTIONS]
+
+    def get_methods(self, seed=None):
+        """
+        This function generates the bytecode of every method, grouped by class.
+        :param seed: int (default: the seed of the generator)
+        :return: list of (class descriptor, list of bytecode)
+        """
+
+        rand = random.Random(self.seed if seed is None else seed)
+        classes = []
+
+        for class_idx in range(self.classes):
+            if rand.random() < self.support_share:
+                descriptor = f"Landroid/support/v4/pkg{class_idx % 16}/Class{class_idx};"
+            else:
+                descriptor = f"Lcom/example/pkg{class_idx % 16}/Class{class_idx};"
+
+            methods = [self.get_method(rand) for _ in range(self.methods_per_class)]
+            classes.append((descriptor, methods))
+
+        return classes
+
+    def get_method(self, rand):
+        """
+        This function generates the bytecode of one method.
+        :param rand: random.Random
+        :return: bytes
+        """
+
+        length = max(1, int(rand.uniform(0.5, 1.5) * self.method_length))
+        code = bytearray()
+        units = 0
+
+        for opcode in rand.choices(self.__opcodes, self.__weights, k=length):
+            code += self.__instruction(rand, opcode, self.__units[opcode])
+            units += self.__units[opcode]
+
+        payloads = []
+        if rand.random() < self.switch_density:
+            opcode = rand.choice((PACKED_SWITCH, SPARSE_SWITCH))
+            code += self.__instruction(rand, opcode, 3)
+            payloads.append(self.__switch_payload(rand, opcode))
+
+        if rand.random() < self.array_density:
+            code += self.__instruction(rand, FILL_ARRAY_DATA, 3)
+            payloads.append(self.__array_payload(rand))
+
+        code += bytes((RETURN_VOID, 0x00))
+
+        for payload in payloads:
+            # Payloads are 4-byte aligned, padded with nop.
+            if len(code) % 4:
+                code += b"\x00\x00"
+
+            code += payload
+
+        return bytes(code)
+
+    def get_dex(self, seed=None, classes=None):
+        """
+        This function builds a dex file.
+        :param seed: int (default: the seed of the generator)
+        :param classes: the result of get_methods, generated if omitted
+        :return: bytes
+        """
+
+        if classes is None:
+            classes = self.get_methods(seed)
+
+        classes = sorted(classes)
+        count = len(classes)
+        names = sorted({f"method{idx}" for _, methods in classes for idx in range(len(methods))})
+        name_indices = {name: count + idx for idx, name in enumerate(names)}
+        method_count = sum(len(methods) for _, methods in classes)
+
+        string_ids_off = 0x70
+        type_ids_off = string_ids_off + (count + len(names)) * 4
+        method_ids_off = type_ids_off + count * 4
+        class_defs_off = method_ids_off + method_count * 8
+        data_off = class_defs_off + count * 0x20
+
+        data = bytearray()
+        method_ids = bytearray()
+        class_data_offs = []
+
+        for class_idx, (_, methods) in enumerate(classes):
+            # Methods are ordered by name, as method_ids are.
+            methods = sorted(enumerate(methods), key=lambda method: f"method{method[0]}")
+            first_method_idx = len(method_ids) // 8
+            code_offs = []
+
+            for idx, bytecode in methods:
+                method_ids += struct.pack("<HHI", class_idx, 0, name_indices[f"method{idx}"])
+                data += b"\x00" * (-(data_off + len(data)) % 4)
+                code_offs.append(data_off + len(data))
+                data += struct.pack("<HHHHII", 4, 1, 2, 0, 0, len(bytecode) // 2)
+                data += bytecode
+
+            class_data_offs.append(data_off + len(data))
+            data += _uleb128(0) + _uleb128(0) + _uleb128(0) + _uleb128(len(methods))
+
+            for idx, code_off in enumerate(code_offs):
+                data += _uleb128(1 if idx else first_method_idx) + _uleb128(0x1) + _uleb128(code_off)
+
+        string_data_offs = []
+        for string in [descriptor for descriptor, _ in classes] + names:
+            string_data_offs.append(data_off + len(data))
+            encoded = string.encode("UTF-8")
+            data += _uleb128(len(encoded)) + encoded + b"\x00"
+
+        data += b"\x00" * (-len(data) % 4)
+
+        body = bytearray()
+        body += b"".join(struct.pack("<I", off) for off in string_data_offs)
+        body += b"".join(struct.pack("<I", idx) for idx in range(count))
+        body += method_ids
+
+        for idx, class_data_off in enumerate(class_data_offs):
+            body += struct.pack("<IIIIIIII", idx, 0x1, 0xFFFFFFFF, 0, 0xFFFFFFFF, 0, class_data_off, 0)
+
+        body += data
+        file_size = 0x70 + len(body)
+
+        header = bytearray(b"dex\n035\x00")
+        header += b"\x00" * 24
+        header += struct.pack("<III", file_size, 0x70, 0x12345678)
+        header += struct.pack("<III", 0, 0, 0)
+        header += struct.pack("<II", count + len(names), string_ids_off)
+        header += struct.pack("<II", count, type_ids_off)
+        header += struct.pack("<II", 0, 0)
+        header += struct.pack("<II", 0, 0)
+        header += struct.pack("<II", method_count, method_ids_off)
+        header += struct.pack("<II", count, class_defs_off)
+        header += struct.pack("<II", len(data), data_off)
+
+        dex = header + body
+        dex[12:32] = hashlib.sha1(dex[32:]).digest()
+        dex[8:12] = struct.pack("<I", zlib.adler32(dex[12:]))
+
+        return bytes(dex)
+
+    def get_apk(self, seed=None, dex_count=2, mutation_rate=0.0, base_seed=None):
+        """
+        This function builds a multi-dex apk in memory.
+        :param seed: int (default: the seed of the generator)
+        :param dex_count: the number of classes*.dex files
+        :param mutation_rate: the share of methods regenerated from `seed` when
+                              `base_seed` is given, so samples of one base are similar
+        :param base_seed: int
+        :return: bytes
+        """
+
+        seed = self.seed if seed is None else seed
+        rand = random.Random(seed)
+        buffer = io.BytesIO()
+
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as apk:
+            apk.writestr("AndroidManifest.xml", b"\x03\x00\x08\x00" + _random_bytes(rand, 256))
+
+            for dex_idx in range(dex_count):
+                if base_seed is None:
+                    classes = self.get_methods(seed * 1000 + dex_idx)
+                else:
+                    classes = self.get_methods(base_seed * 1000 + dex_idx)
+                    classes = [
+                        (descriptor, [
+                            self.get_method(rand) if rand.random() < mutation_rate else bytecode
+                            for bytecode in methods
+                        ])
+                        for descriptor, methods in classes
+                    ]
+
+                name = "classes.dex" if dex_idx == 0 else f"classes{dex_idx + 1}.dex"
+                apk.writestr(name, self.get_dex(classes=classes))
+
+        return buffer.getvalue()
+
+    def write_corpus(self, directory, samples=20, families=4, dex_count=2, mutation_rate=0.01):
+        """
+        This function writes a corpus of apk files made of `families` groups of similar samples.
+        :param directory: string
+        :return: list of file path
+        """
+
+        os.makedirs(directory, exist_ok=True)
+        file_paths = []
+
+        for idx in range(samples):
+            apk = self.get_apk(
+                seed=self.seed + idx + 1,
+                dex_count=dex_count,
+                mutation_rate=mutation_rate,
+                base_seed=self.seed + (idx % families) + 1,
+            )
+            file_path = os.path.join(directory, f"sample_{idx:05d}.apk")
+
+            with open(file_path, "wb") as file:
+                file.write(apk)
+
+            file_paths.append(file_path)
+
+        return file_paths
+
+    def __instruction(self, rand, opcode, units):
+        return bytes((opcode,)) + _random_bytes(rand, units * 2 - 1)
+
+    def __switch_payload(self, rand, opcode):
+        size = rand.randint(1, 16)
+
+        if opcode == PACKED_SWITCH:
+            payload = struct.pack("<HHi", 0x0100, size, rand.randint(-100, 100))
+            payload += _random_bytes(rand, 4 * size)
+        else:
+            payload = struct.pack("<HH", 0x0200, size)
+            payload += b"".join(struct.pack("<i", key) for key in sorted(rand.sample(range(-1000, 1000), size)))
+            payload += _random_bytes(rand, 4 * size)
+
+        return payload
+
+    def __array_payload(self, rand):
+        element_width = rand.choice((1, 2, 4, 8))
+        size = rand.randint(1, 64)
+        payload = struct.pack("<HHI", 0x0300, element_width, size)
+        payload += _random_bytes(rand, size * element_width)
+        payload += b"\x00" * (len(payload) % 2)
+
+        return payload
+
+
+def _random_bytes(rand, size):
+    return rand.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+
+def _uleb128(value):
+    encoded = bytearray()
+
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
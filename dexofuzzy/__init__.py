@@ -39,6 +39,27 @@ Dexofuzzy API usage:
     >>> dexofuzzy.hash_from_file('classes.dex')
     '48:U7uPrEMc0HZj0/zeGnD2KmUCNc2FuGgy9fY:UHMHZ4/zeGD2+Cap3y9Q'
 
+... hash_many(samples, workers=None, ordered=True, threads=False, table=None)
+
+    >>> import dexofuzzy
+    >>> for result in dexofuzzy.hash_many(['Sample.apk', 'classes2.dex']):
+    ...     print(result['index'], result['dexofuzzy'], result['error'])
+    0 48:U7uPrEMc0HZj0/zeGnD2KmUCNc2FuGgy9fY:UHMHZ4/zeGD2+Cap3y9Q None
+    1 48:B2KmUCNc2FuGgy9fbdD7uPrEMc0HZj0/zeGn5:B2+Cap3y9pDHMHZ4/zeG5 None
+
+... RecordTable()
+
+    >>> import dexofuzzy
+    >>> results = dexofuzzy.RecordTable()
+    >>> for result in dexofuzzy.hash_many(['Sample.apk', 'classes2.dex'], table=results):
+    ...     print(result['index'], result['record'])
+    0 0
+    1 1
+    >>> results[0].name, results[0].size
+    ('Sample.apk', 1057746)
+    >>> results.get_dexofuzzy_list()
+    ['48:U7uPrEMc0HZj0/zeGnD2KmUCNc2FuGgy9fY:UHMHZ4/zeGD2+Cap3y9Q', '48:B2KmUCNc2FuGgy9fbdD7uPrEMc0HZj0/zeGn5:B2+Cap3y9pDHMHZ4/zeG5']
+
 ... compare(dexofuzzy_1, dexofuzzy_2)
 
     >>> import dexofuzzy
@@ -57,16 +78,32 @@ Dexofuzzy API usage:
 """
 
 # Default packages
-import sys
+import importlib
 
 # Internal packages
-from .core.generator import Generator
+from .core.backend import get_backend, set_backend
+
+# Loaded on first access, so that importing dexofuzzy does not pull in
+# zipfile and multiprocessing before a sample is hashed.
+_LAZY_ATTRIBUTES = {
+    "Generator": ".core.generator",
+    "Pool": ".core.pool",
+    "Record": ".core.record",
+    "RecordTable": ".core.record",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
 
-# 3rd-party packages
-if sys.platform == "win32":
-    import dexofuzzy.bin as ssdeep
-else:
-    import ssdeep
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 
 def compare(dexofuzzy_1, dexofuzzy_2):
@@ -77,7 +114,7 @@ def compare(dexofuzzy_1, dexofuzzy_2):
     :return: A value from zero to 100 indicating the match score of the two signatures
     """
 
-    return ssdeep.compare(dexofuzzy_1, dexofuzzy_2)
+    return get_backend().compare(dexofuzzy_1, dexofuzzy_2)
 
 
 def hash(dex_data):
@@ -90,6 +127,8 @@ def hash(dex_data):
     if not isinstance(dex_data, bytes):
         raise TypeError("must be of bytes type")
 
+    from .core.generator import Generator
+
     generator = Generator()
     dexofuzzy = generator.get_dexofuzzy(dex_data)
 
@@ -106,7 +145,27 @@ def hash_from_file(file_path):
     if not isinstance(file_path, str):
         raise TypeError("must be of string type")
 
+    from .core.generator import Generator
+
     generator = Generator()
     dexofuzzy = generator.get_dexofuzzy(file_path)
 
     return dexofuzzy
+
+
+def hash_many(samples, workers=None, ordered=True, threads=False, table=None):
+    """
+    This function computes the dexofuzzy of many samples in worker processes.
+    To reuse the workers across batches, use dexofuzzy.Pool instead.
+    :param samples: iterable of dex binary data (bytes) or file path (string)
+    :param workers: the number of worker processes (default: the number of CPUs)
+    :param ordered: yield in input order if True, otherwise in completion order
+    :param threads: use worker threads instead of processes, see dexofuzzy.Pool
+    :param table: RecordTable to append the records to, see dexofuzzy.Pool.hash_many
+    :return: generator of dict with index, dexofuzzy, error and, with a table, record
+    """
+
+    from .core.pool import Pool
+
+    with Pool(workers, threads=threads) as pool:
+        yield from pool.hash_many(samples, ordered=ordered, table=table)
@@ -0,0 +1,211 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+Dexofuzzy asyncio API usage:
+
+The blocking work runs in an executor, by default the event loop's
+default thread pool. Pass a concurrent.futures.ProcessPoolExecutor to
+hash large APKs without holding the GIL of the event loop's process.
+
+A timeout only stops waiting: a thread or process of the executor can not
+be interrupted, so it keeps hashing the sample until it is done. To kill
+the samples that run too long, hash them with the --timeout option of the
+command line, which runs them in worker processes replaced on a timeout.
+
+... await hash(dex_binary_data, executor=None, timeout=None)
+
+    >>> import dexofuzzy.aio
+    >>> await dexofuzzy.aio.hash(dex_data)
+    '48:U7uPrEMc0HZj0/zeGnD2KmUCNc2FuGgy9fY:UHMHZ4/zeGD2+Cap3y9Q'
+
+... await hash_from_file(apk_file_path or dex_file_path, executor=None, timeout=None)
+
+    >>> await dexofuzzy.aio.hash_from_file('Sample.apk', timeout=30)
+    '48:U7uPrEMc0HZj0/zeGnD2KmUCNc2FuGgy9fY:UHMHZ4/zeGD2+Cap3y9Q'
+
+... async for result in hash_many(samples, concurrency=4, executor=None, timeout=None)
+
+    >>> async for result in dexofuzzy.aio.hash_many(['Sample.apk', 'classes.dex']):
+    ...     print(result['index'], result['dexofuzzy'], result['error'])
+
+... await compare_many(dexofuzzy, dexofuzzy_list, executor=None)
+
+    >>> await dexofuzzy.aio.compare_many(hash1, [hash1, hash2])
+    [100, 50]
+"""
+
+# Default packages
+import asyncio
+
+# Internal packages
+import dexofuzzy
+
+
+def _hash_sample(sample):
+    if isinstance(sample, bytes):
+        return dexofuzzy.hash(sample)
+
+    return dexofuzzy.hash_from_file(sample)
+
+
+def _compare_many(src_dexofuzzy, dexofuzzy_list):
+    return [dexofuzzy.compare(src_dexofuzzy, dst_dexofuzzy) for dst_dexofuzzy in dexofuzzy_list]
+
+
+def _discard_result(future):
+    # The result of a sample given up on is never awaited.
+    if not future.cancelled():
+        future.exception()
+
+
+async def _run(executor, timeout, function, *args):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, function, *args)
+
+    return await asyncio.wait_for(future, timeout)
+
+
+async def hash(dex_data, executor=None, timeout=None):
+    """
+    This function computes the dexofuzzy of a dex binary data without blocking the event loop.
+    :param dex_data: bytes
+    :param executor: concurrent.futures.Executor (default: the loop's default executor)
+    :param timeout: seconds to wait before raising asyncio.TimeoutError, the executor keeps hashing
+    :return: The dexofuzzy of the dex binary data
+    """
+
+    if not isinstance(dex_data, bytes):
+        raise TypeError("must be of bytes type")
+
+    return await _run(executor, timeout, dexofuzzy.hash, dex_data)
+
+
+async def hash_from_file(file_path, executor=None, timeout=None):
+    """
+    This function computes the dexofuzzy of the apk file or the dex file without blocking the event loop.
+    :param file_path: string
+    :param executor: concurrent.futures.Executor (default: the loop's default executor)
+    :param timeout: seconds to wait before raising asyncio.TimeoutError, the executor keeps hashing
+    :return: The dexofuzzy of the dex file
+    """
+
+    if not isinstance(file_path, str):
+        raise TypeError("must be of string type")
+
+    return await _run(executor, timeout, dexofuzzy.hash_from_file, file_path)
+
+
+async def hash_many(samples, concurrency=4, executor=None, timeout=None):
+    """
+    This function computes the dexofuzzy of many samples with at most
+    `concurrency` samples in flight, yielding results in completion order.
+    An error, a timeout or a sample of another type is reported in its
+    result and does not abort the iteration. A sample past its timeout still
+    holds its place in flight until the executor is done with it. Closing
+    the iterator cancels the samples not started yet.
+    :param samples: iterable of dex binary data (bytes) or file path (string)
+    :param concurrency: the maximum number of samples in flight
+    :param executor: concurrent.futures.Executor (default: the loop's default executor)
+    :param timeout: seconds to wait for each sample
+    :return: async iterator of dict with index, dexofuzzy and error
+    """
+
+    if concurrency <= 0:
+        raise ValueError("concurrency must be greater than zero")
+
+    loop = asyncio.get_running_loop()
+    pending = {}
+    deadlines = {}
+    # The samples past their timeout, which the executor is still hashing.
+    abandoned = set()
+    samples = enumerate(samples)
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) + len(abandoned) < concurrency:
+                item = next(samples, None)
+
+                if item is None:
+                    exhausted = True
+                    break
+
+                index, sample = item
+
+                if not isinstance(sample, (bytes, str)):
+                    yield {"index": index, "dexofuzzy": None, "error": "TypeError: must be of bytes or string type"}
+                    continue
+
+                future = loop.run_in_executor(executor, _hash_sample, sample)
+                pending[future] = index
+
+                if timeout is not None:
+                    deadlines[future] = loop.time() + timeout
+
+            if not pending and exhausted:
+                break
+
+            wait_timeout = None
+            if pending and timeout is not None:
+                wait_timeout = max(0.0, min(deadlines[future] for future in pending) - loop.time())
+
+            done, _ = await asyncio.wait(
+                set(pending) | abandoned, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            abandoned.difference_update(done)
+            now = loop.time()
+
+            for future in list(pending):
+                result = {}
+                result["index"] = pending[future]
+                result["dexofuzzy"] = None
+                result["error"] = None
+
+                if future in done:
+                    try:
+                        result["dexofuzzy"] = future.result()
+
+                    except Exception as e:
+                        result["error"] = f"{type(e).__name__}: {e}"
+
+                elif timeout is not None and deadlines[future] <= now:
+                    result["error"] = f"TimeoutError: exceeded {timeout} seconds"
+                    future.add_done_callback(_discard_result)
+                    abandoned.add(future)
+
+                else:
+                    continue
+
+                del pending[future]
+                deadlines.pop(future, None)
+                yield result
+
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def compare_many(src_dexofuzzy, dexofuzzy_list, executor=None, timeout=None):
+    """
+    This function computes the match score between a dexofuzzy and each of a list of dexofuzzy.
+    :param src_dexofuzzy: string
+    :param dexofuzzy_list: list of dexofuzzy
+    :param executor: concurrent.futures.Executor (default: the loop's default executor)
+    :param timeout: seconds to wait before raising asyncio.TimeoutError
+    :return: list of values from zero to 100
+    """
+
+    return await _run(executor, timeout, _compare_many, src_dexofuzzy, list(dexofuzzy_list))
@@ -7,7 +7,6 @@ import os
 import sys
 from os.path import join
 from os.path import split
-from pip._vendor import six
 
 
 # Length of an individual fuzzy hash signature component
@@ -25,7 +24,17 @@ class FuzzyLibError(Exception):
 is_64bits = sys.maxsize > 2**32
 _package_path = split(__file__)[0]
 _lib_path = join(_package_path, r"fuzzy_64.dll" if is_64bits else r"fuzzy.dll")
-fuzzy_lib = ctypes.cdll.LoadLibrary(_lib_path)
+_fuzzy_lib = None
+
+
+def _get_fuzzy_lib():
+    # The DLL is loaded by the first hash or compare, not when the module is imported.
+    global _fuzzy_lib
+
+    if _fuzzy_lib is None:
+        _fuzzy_lib = ctypes.cdll.LoadLibrary(_lib_path)
+
+    return _fuzzy_lib
 
 
 def compare(signature_1, signature_2):
@@ -39,19 +48,19 @@ def compare(signature_1, signature_2):
     :raises FuzzyLibError: If the fuzzy library returns an internal error
     :raises TypeError: If one of the signatures type is not str, unicode or bytes
     """
-    if isinstance(signature_1, six.text_type):
+    if isinstance(signature_1, str):
         signature_1 = signature_1.encode("ascii")
-    if isinstance(signature_2, six.text_type):
+    if isinstance(signature_2, str):
         signature_2 = signature_2.encode("ascii")
 
-    if not isinstance(signature_1, six.binary_type):
+    if not isinstance(signature_1, bytes):
         raise TypeError('"signature_1" must be of binary or text type')
-    if not isinstance(signature_2, six.binary_type):
+    if not isinstance(signature_2, bytes):
         raise TypeError('"signature_2" must be of binary or text type')
 
     hash_1_buffer = ctypes.create_string_buffer(signature_1)
     hash_2_buffer = ctypes.create_string_buffer(signature_2)
-    compare_result = fuzzy_lib.fuzzy_compare(hash_1_buffer, hash_2_buffer)
+    compare_result = _get_fuzzy_lib().fuzzy_compare(hash_1_buffer, hash_2_buffer)
 
     if compare_result == -1:
         raise FuzzyLibError(compare_result)
@@ -69,19 +78,19 @@ def hash(data, encoding="utf-8"):
     :raises FuzzyLibError: If the fuzzy library returns an internal error
     :raises TypeError: If data is not str, unicode or bytes
     """
-    if not isinstance(encoding, six.string_types):
+    if not isinstance(encoding, str):
         raise TypeError('"encoding" must be of string type')
 
-    if isinstance(data, six.text_type):
+    if isinstance(data, str):
         data = data.encode(encoding)
 
-    if not isinstance(data, six.binary_type):
+    if not isinstance(data, bytes):
         raise TypeError('"data" must be of binary or text type')
 
     result_buffer = ctypes.create_string_buffer(FUZZY_MAX_RESULT)
     file_buffer = ctypes.create_string_buffer(data)
     # Ignoring the terminating null byte
-    hash_result = fuzzy_lib.fuzzy_hash_buf(
+    hash_result = _get_fuzzy_lib().fuzzy_hash_buf(
         file_buffer, len(file_buffer) - 1, result_buffer
     )
     if hash_result != 0:
@@ -101,7 +110,7 @@ def hash_from_file(file_path):
     :raises IOError: If Python is unable to read the file
     :raises FuzzyLibError: If the fuzzy library returns an internal error
     """
-    if not isinstance(file_path, six.string_types):
+    if not isinstance(file_path, str):
         raise TypeError('"file_path" must be of string type')
 
     if not os.path.exists(file_path):
@@ -113,7 +122,7 @@ def hash_from_file(file_path):
 
     result_buffer = ctypes.create_string_buffer(FUZZY_MAX_RESULT)
     file_path_buffer = ctypes.create_string_buffer(file_path.encode("utf-8"))
-    hash_result = fuzzy_lib.fuzzy_hash_filename(file_path_buffer, result_buffer)
+    hash_result = _get_fuzzy_lib().fuzzy_hash_filename(file_path_buffer, result_buffer)
     if hash_result != 0:
         raise FuzzyLibError(hash_result)
 
@@ -16,9 +16,15 @@
 """
 
 # Internal packages
+import sys
+
 from dexofuzzy.cli.command import Command
 
 
 def execute_from_command_line():
     command = Command()
-    command.console()
+
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        command.serve(sys.argv[2:])
+    else:
+        command.console()
@@ -17,23 +17,20 @@
 
 # Default packages
 import argparse
-import csv
-import hashlib
-import inspect
-import json
-import logging
 import os
+import signal
 import sys
-import traceback
+import threading
+import time
 
 # Internal packages
-from dexofuzzy.core.generator import Generator
+from dexofuzzy.core.backend import BACKENDS, BackendError, get_backend, set_backend
+from dexofuzzy.core.dex.budget import Budget
+from dexofuzzy.core.discovery import Discovery
+from dexofuzzy.core.record import Record, RecordTable
 
-# 3rd-party packages
-if sys.platform == "win32":
-    import dexofuzzy.bin as ssdeep
-else:
-    import ssdeep
+# The other modules, some of which pull in zipfile, multiprocessing, numpy, sqlite3 or
+# http.server, are imported by the functions that use them, so that -v, -s and --help start fast.
 
 
 class Command:
@@ -44,6 +41,17 @@ class Command:
     def __init__(self):
         self.args = None
         self.logger = None
+        self.metrics = None
+        self.budget = None
+        self.isolation = None
+        self.threads = None
+        self.discovery = None
+        self.method_index = None
+        self.sink = None
+        self.cache = None
+        self.walker = None
+        self.ngram_matrix = None
+        self.__local = threading.local()
 
     def console(self):
         """
@@ -65,6 +73,76 @@ class Command:
             help="the directory of samples to extract dexofuzzy"
         )
 
+        parser.add_argument(
+            "--watch", action="store_true",
+            help="keep polling the -d directory and hash the samples as they arrive, appending to "
+            + "the -c, -j (as JSON lines), --sqlite, --method-index and --ngram-matrix outputs"
+        )
+        parser.add_argument(
+            "--watch-interval", metavar="SECONDS", type=float, default=1.0,
+            help="the polling interval of --watch, and of --queue while other workers hold "
+            + "the remaining samples (default: 1)"
+        )
+        parser.add_argument(
+            "--settle", metavar="SECONDS", type=float, default=2.0,
+            help="wait until a sample has not been modified for SECONDS before hashing it "
+            + "in --watch (default: 2)"
+        )
+        parser.add_argument(
+            "--flush-interval", metavar="SECONDS", type=float, default=300.0,
+            help="rewrite the --method-index and --ngram-matrix of --watch at most every SECONDS, "
+            + "and on exit (default: 300)"
+        )
+        parser.add_argument(
+            "--move-to", metavar="DIRECTORY",
+            help="move the samples hashed in --watch to DIRECTORY, keeping their relative path"
+        )
+        parser.add_argument(
+            "--watch-state", metavar="STATE_FILENAME",
+            help="keep the samples already hashed by --watch in STATE_FILENAME, so that a restarted "
+            + "watcher does not hash them again"
+        )
+        parser.add_argument(
+            "--enqueue", metavar="QUEUE_FILENAME",
+            help="add the samples of -d, -f and --sample-list to a SQLite work queue "
+            + "instead of hashing them (created if missing)"
+        )
+        parser.add_argument(
+            "--queue", metavar="QUEUE_FILENAME",
+            help="lease samples from the work queue and hash them until none is left; "
+            + "start it on as many hosts as needed"
+        )
+        parser.add_argument(
+            "--lease-batch", metavar="N", type=int, default=16,
+            help="the number of samples leased at once by --queue (default: 16)"
+        )
+        parser.add_argument(
+            "--lease-seconds", metavar="SECONDS", type=float, default=600.0,
+            help="lease the samples for SECONDS, after which another worker retries them "
+            + "(default: 600)"
+        )
+        parser.add_argument(
+            "--max-attempts", metavar="N", type=int, default=3,
+            help="give up a sample of the work queue after N leases (default: 3)"
+        )
+        parser.add_argument(
+            "--include", metavar="GLOB", action="append",
+            help="only the files of the -d directory matching GLOB (can be repeated)"
+        )
+        parser.add_argument(
+            "--exclude", metavar="GLOB", action="append",
+            help="skip the files and directories of the -d directory matching GLOB (can be repeated)"
+        )
+        parser.add_argument(
+            "--no-magic-check", action="store_true",
+            help="do not skip the files of the -d directory that do not start with a zip or dex magic"
+        )
+        parser.add_argument(
+            "--order", choices=["found", "size", "size-desc"],
+            help="the order of the files of the -d directory "
+            + "(default: size-desc with isolated workers, otherwise found)"
+        )
+
         parser.add_argument(
             "-s", "--score", metavar="DEXOFUZZY", nargs=2,
             help="score the dexofuzzy of the sample"
@@ -77,18 +155,202 @@ class Command:
             + "(must include the -d option by default)"
         )
 
+        parser.add_argument(
+            "--max-ngram-df", metavar="FRACTION", type=float,
+            help="ignore the n-grams found in more than FRACTION of the samples in -g"
+        )
+        parser.add_argument(
+            "--ngram-stop-list", metavar="STOP_LIST_FILENAME",
+            help="ignore the n-grams of STOP_LIST_FILENAME in -g, one per line "
+            + "or the stop list of an --ngram-df file"
+        )
+        parser.add_argument(
+            "--ngram-df", metavar="JSON_FILENAME",
+            help="save the document frequency of each n-gram of -g and the n-grams ignored"
+        )
+
+        parser.add_argument(
+            "-m", "--minhash-clustering", metavar=("N", "THRESHOLD"), nargs=2, type=float,
+            help="N-Gram Tokenizer and MinHash/LSH approximate Jaccard clustering "
+            + "based on the sample's dexofuzzy "
+            + "(must include the -d option by default)"
+        )
+        parser.add_argument(
+            "--lsh-bands", metavar=("BANDS", "ROWS"), nargs=2, type=int, default=[32, 4],
+            help="the number of LSH bands and rows per band (default: 32 4)"
+        )
+        parser.add_argument(
+            "--lsh-evaluate", action="store_true",
+            help="report the recall and candidate precision of the -m option "
+            + "against the exact Jaccard clustering"
+        )
+
+        parser.add_argument(
+            "--backend", choices=sorted(BACKENDS),
+            help="the fuzzy hash backend (default: ssdeep, or spamsum if ssdeep is not installed)"
+        )
+
+        parser.add_argument(
+            "--method-index", metavar="INDEX_DIRECTORY",
+            help="add the method fuzzy hashes of the samples to the method index "
+            + "(created if missing)"
+        )
+        parser.add_argument(
+            "--method-query", metavar="SAMPLE_FILENAME",
+            help="rank the samples of the --method-index by the methods they share with the sample"
+        )
+        parser.add_argument(
+            "--top", metavar="N", type=int, default=10,
+            help="the number of samples returned by --method-query and --family-query (default: 10)"
+        )
+        parser.add_argument(
+            "--max-df", metavar="N", type=int,
+            help="ignore the method pieces shared by more than N indexed samples in --method-query"
+        )
+
+        parser.add_argument(
+            "--family-index", metavar="INDEX_DIRECTORY",
+            help="save the -g or -m clusters and their representatives as a family index, "
+            + "or search it with --family-query or --family-evaluate"
+        )
+        parser.add_argument(
+            "--family-query", metavar="SAMPLE_FILENAME",
+            help="compare the sample with the representatives of the --family-index, "
+            + "then with the members of the best-matching families"
+        )
+        parser.add_argument(
+            "--family-evaluate", action="store_true",
+            help="report the recall and comparisons of the --family-index search "
+            + "against comparing with every sample, querying the -d, -f and --sample-list samples"
+        )
+        parser.add_argument(
+            "--representatives", metavar="N", type=int, default=3,
+            help="the number of representatives of each family in the --family-index (default: 3)"
+        )
+        parser.add_argument(
+            "--expand", metavar="N", type=int, default=3,
+            help="the number of best-matching families searched by --family-query (default: 3)"
+        )
+
         parser.add_argument(
             "-c", "--csv", metavar="CSV_FILENAME",
             help="output as CSV format"
         )
         parser.add_argument(
             "-j", "--json", metavar="JSON_FILENAME",
-            help="output as json format (include method fuzzy or clustering)"
+            help="output as json format (include method fuzzy with --detail, or clustering)"
+        )
+        parser.add_argument(
+            "--detail", action="store_true",
+            help="add the dexofuzzy of each dex and the fuzzy hash of each method "
+            + "to the json output (computed in the same pass)"
+        )
+        parser.add_argument(
+            "--ngram-matrix", metavar="NPZ_FILENAME",
+            help="save the hashed opcode n-gram counts of the samples as a CSR matrix "
+            + "(computed in the same pass)"
+        )
+        parser.add_argument(
+            "--ngram-sizes", metavar="N", type=int, nargs="+", default=[1, 2, 3],
+            help="the n-gram sizes of --ngram-matrix (default: 1 2 3)"
+        )
+        parser.add_argument(
+            "--ngram-dimension", metavar="D", type=int, default=1 << 20,
+            help="the number of columns of --ngram-matrix, a power of two (default: 1048576)"
+        )
+        parser.add_argument(
+            "--sqlite", metavar="SQLITE_FILENAME",
+            help="upsert the results into a SQLite database (include the dexofuzzy "
+            + "of each dex with --detail, and the clustering edges)"
         )
         parser.add_argument(
             "-l", "--error-log", metavar="LOG_FILENAME",
             help="output the error log"
         )
+
+        parser.add_argument(
+            "--nested-archives", action="store_true",
+            help="also hash the dex files of the APKs and JARs nested in an APK "
+            + "(always done for split APK bundles such as XAPK and APKS)"
+        )
+        parser.add_argument(
+            "--max-archive-depth", metavar="N", type=int, default=3,
+            help="the maximum nesting depth of archives read in memory (default: 3)"
+        )
+        parser.add_argument(
+            "--max-inflated-size", metavar="MB", type=int, default=2048,
+            help="fail the samples whose dex files and nested archives inflate to more than MB megabytes "
+            + "(default: 2048)"
+        )
+        parser.add_argument(
+            "--dex-cache", metavar="N", type=int, default=200000,
+            help="reuse the method hashes of already seen dex files, up to N method hashes "
+            + "per process (default: 200000, 0 to disable)"
+        )
+        parser.add_argument(
+            "--max-dex-size", metavar="BYTES", type=int,
+            help="fail the samples with a larger dex file"
+        )
+        parser.add_argument(
+            "--max-methods", metavar="N", type=int,
+            help="stop extracting a sample after N methods"
+        )
+        parser.add_argument(
+            "--max-instructions", metavar="N", type=int,
+            help="stop extracting a sample after N instructions"
+        )
+        parser.add_argument(
+            "--max-seconds", metavar="SECONDS", type=float,
+            help="stop extracting a sample after SECONDS"
+        )
+        parser.add_argument(
+            "--allow-partial", action="store_true",
+            help="hash what was extracted when a sample hits a limit, "
+            + "instead of failing it (reported as status: partial)"
+        )
+
+        parser.add_argument(
+            "--workers", metavar="N", type=int,
+            help="hash the samples in N isolated worker processes "
+            + "(default: the number of CPUs with --timeout or --memory-limit)"
+        )
+        parser.add_argument(
+            "--threads", metavar="N", type=int,
+            help="hash the samples in N threads of this process, which run in parallel on a "
+            + "free-threaded Python build or with a hash backend that releases the GIL"
+        )
+        parser.add_argument(
+            "--timeout", metavar="SECONDS", type=float,
+            help="kill and replace the worker of a sample that takes longer than SECONDS"
+        )
+        parser.add_argument(
+            "--memory-limit", metavar="MB", type=int,
+            help="limit the address space of each worker process to MB megabytes"
+        )
+        parser.add_argument(
+            "--quarantine", metavar="QUARANTINE_FILENAME",
+            help="append the samples that timed out, ran out of memory or crashed their worker"
+        )
+        parser.add_argument(
+            "--sample-list", metavar="LIST_FILENAME",
+            help="the file listing the samples to extract dexofuzzy, one path per line "
+            + "(e.g. a quarantine file)"
+        )
+
+        parser.add_argument(
+            "--progress", action="store_true",
+            help="print files/s, MB/s, errors and ETA to stderr periodically"
+        )
+        parser.add_argument(
+            "--metrics-file", metavar="METRICS_FILENAME",
+            help="keep updating counters and histograms in a Prometheus textfile "
+            + "(JSON if the name ends with .json)"
+        )
+        parser.add_argument(
+            "--metrics-interval", metavar="SECONDS", type=float, default=2.0,
+            help="the interval of --progress and --metrics-file (default: 2)"
+        )
+
         parser.add_argument(
             "-v", "--version", action="store_true",
             help="dexofuzzy version information"
@@ -99,7 +361,16 @@ class Command:
             return None
 
         self.args = parser.parse_args()
-        dexofuzzy_list = []
+        dexofuzzy_list = RecordTable()
+        clustering_list = None
+
+        if self.args.backend:
+            try:
+                set_backend(self.args.backend)
+
+            except (BackendError, ImportError) as e:
+                print(f"Unable to load the {self.args.backend} backend: {e}")
+                return None
 
         if self.args.version:
             print("v2.0.0")
@@ -107,68 +378,680 @@ class Command:
         if self.args.score:
             print(self.__get_dexofuzzy_compare(self.args.score[0], self.args.score[1]))
 
+        limits = (
+            self.args.max_dex_size, self.args.max_methods,
+            self.args.max_instructions, self.args.max_seconds,
+        )
+        if any(limit is not None for limit in limits):
+            self.budget = Budget(*limits, partial=self.args.allow_partial)
+
+        has_samples = self.args.directory or self.args.file or self.args.sample_list or self.args.queue
+        isolated = self.args.workers or self.args.timeout or self.args.memory_limit
+
+        if self.args.threads is not None:
+            if self.args.threads <= 0:
+                print("--threads must be greater than zero")
+                return None
+
+            if isolated:
+                print("--threads can not be combined with --workers, --timeout or --memory-limit")
+                return None
+
+            self.threads = self.args.threads
+
+        if has_samples or self.args.method_query or self.args.family_query:
+            from dexofuzzy.core.archive import ArchiveWalker
+
+            self.walker = ArchiveWalker(
+                nested=self.args.nested_archives,
+                max_depth=self.args.max_archive_depth,
+                max_member_size=self.args.max_inflated_size << 20,
+                max_total_size=self.args.max_inflated_size << 20,
+            )
+
+        if has_samples and self.args.dex_cache > 0:
+            from dexofuzzy.core.cache import DexCache
+
+            self.cache = DexCache(self.args.dex_cache)
+
+        if has_samples and isolated:
+            from dexofuzzy.core.isolation import IsolatedPool
+
+            self.isolation = IsolatedPool(
+                _get_isolated_report,
+                workers=self.args.workers,
+                timeout=self.args.timeout,
+                memory_limit=self.args.memory_limit << 20 if self.args.memory_limit else None,
+            )
+
+        if self.args.method_query and not self.args.method_index:
+            print("must include the --method-index option")
+            return None
+
+        if (self.args.family_query or self.args.family_evaluate) and not self.args.family_index:
+            print("must include the --family-index option")
+            return None
+
+        if (self.args.family_index and not (self.args.family_query or self.args.family_evaluate)
+                and not (self.args.clustering or self.args.minhash_clustering)):
+            print("--family-index must include the -g or -m option, --family-query or --family-evaluate")
+            return None
+
+        if self.args.max_ngram_df is not None and not 0.0 < self.args.max_ngram_df <= 1.0:
+            print("--max-ngram-df must be in the range (0, 1]")
+            return None
+
+        if self.args.minhash_clustering:
+            from dexofuzzy.core.minhash import MinHashError, MinHashLSH
+
+            # THRESHOLD is a fraction, so -m is parsed as floats and N is checked here.
+            if not self.args.minhash_clustering[0].is_integer():
+                print("N of the -m option must be an integer")
+                return None
+
+            # numpy is an optional dependency, so -m is checked before any sample is hashed.
+            try:
+                MinHashLSH(
+                    int(self.args.minhash_clustering[0]),
+                    float(self.args.minhash_clustering[1]),
+                    bands=self.args.lsh_bands[0],
+                    rows=self.args.lsh_bands[1],
+                )
+
+            except MinHashError as e:
+                print(f"Unable to cluster dexofuzzy with MinHash: {e}")
+                return None
+
+        if self.args.representatives <= 0 or self.args.expand <= 0:
+            print("--representatives and --expand must be greater than zero")
+            return None
+
+        if self.args.queue and (self.args.method_index or self.args.ngram_matrix):
+            # Each worker holds only its own samples, so it would overwrite the rows of the others.
+            print("--method-index and --ngram-matrix can not be combined with --queue")
+            return None
+
+        if self.args.ngram_matrix:
+            from dexofuzzy.core.ngram import NgramMatrix, OpcodeNgrams
+
+            try:
+                ngrams = OpcodeNgrams(self.args.ngram_sizes, self.args.ngram_dimension)
+                self.ngram_matrix = NgramMatrix(ngrams)
+
+                # A restarted watcher adds its rows to those of the previous runs.
+                if self.args.watch:
+                    self.ngram_matrix = NgramMatrix.load(self.args.ngram_matrix, ngrams)
+
+            except FileNotFoundError:
+                pass
+
+            except Exception as e:
+                print(f"Unable to count opcode n-grams: {e}")
+                return None
+
+        if self.args.sqlite:
+            from dexofuzzy.cli.sink import SQLiteSink
+
+            try:
+                self.sink = SQLiteSink(self.args.sqlite)
+
+            except Exception as e:
+                print(f"Unable to open the SQLite database: {e}")
+                return None
+
+        if self.args.method_index and has_samples:
+            from dexofuzzy.core.method_index import MethodIndex
+
+            try:
+                if MethodIndex.exists(self.args.method_index):
+                    self.method_index = MethodIndex.load(self.args.method_index, mmap=False)
+                else:
+                    self.method_index = MethodIndex()
+
+            except Exception as e:
+                print(f"Unable to open the method index: {e}")
+                return None
+
+        if self.args.watch and not self.args.directory:
+            print("must include the -d option by default")
+            return None
+
+        if self.args.flush_interval < 0:
+            print("--flush-interval must not be negative")
+            return None
+
+        if self.args.watch and (self.args.enqueue or self.args.queue):
+            print("--watch can not be combined with --enqueue or --queue")
+            return None
+
+        if self.args.queue and not self.args.enqueue and (
+            self.args.directory or self.args.file or self.args.sample_list
+        ):
+            print("must include the --enqueue option to add the samples to the work queue")
+            return None
+
+        directory_samples = []
+        if self.args.directory:
+            self.discovery = Discovery(
+                include=self.args.include,
+                exclude=self.args.exclude,
+                check_magic=not self.args.no_magic_check,
+            )
+
+            if not self.args.watch:
+                directory_samples = self.__discover_samples(self.args.directory)
+
+        if self.args.enqueue:
+            self.__enqueue_samples(directory_samples)
+
+            if not self.args.queue:
+                return None
+
+        if self.args.progress or self.args.metrics_file:
+            from dexofuzzy.cli.metrics import Metrics
+
+            self.metrics = Metrics(
+                total=self.__count_samples(directory_samples) if self.args.progress else None,
+                progress=self.args.progress,
+                metrics_file=self.args.metrics_file,
+                interval=self.args.metrics_interval,
+            )
+            self.metrics.start_reporting()
+
+        if self.args.watch:
+            self.__watch(self.args.directory)
+            return None
+
+        if self.args.queue:
+            self.__work_queue(self.args.queue)
+            return None
+
         if self.args.directory:
-            for result in self.__search_directory(self.args.directory):
+            for result in self.__get_reports(directory_samples):
                 if result is not None:
                     print(
-                        f'{result["name"]},{result["sha256"]},'
-                        f'{result["size"]},{result["dexofuzzy"]}'
+                        f"{result.name},{result.sha256},"
+                        f"{result.size},{result.dexofuzzy}"
                     )
 
-                    dexofuzzy_list.append(result)
+                    self.__add_result(result, dexofuzzy_list)
 
         if self.args.file:
             result = self.__search_file(self.args.file)
 
             if result is not None:
                 print(
-                    f'{result["name"]},{result["sha256"]},'
-                    f'{result["size"]},{result["dexofuzzy"]}'
+                    f"{result.name},{result.sha256},"
+                    f"{result.size},{result.dexofuzzy}"
                 )
 
-                dexofuzzy_list.append(result)
+                self.__add_result(result, dexofuzzy_list)
+
+        if self.args.sample_list:
+            for result in self.__search_list(self.args.sample_list):
+                if result is not None:
+                    print(
+                        f"{result.name},{result.sha256},"
+                        f"{result.size},{result.dexofuzzy}"
+                    )
+
+                    self.__add_result(result, dexofuzzy_list)
+
+        if self.metrics is not None:
+            if self.discovery is not None:
+                self.metrics.skipped = self.discovery.skipped_count
+
+            self.metrics.stop_reporting()
+
+        if self.method_index is not None:
+            self.method_index.save(self.args.method_index)
+
+        if self.ngram_matrix is not None:
+            self.__save_ngram_matrix()
+
+        if self.args.method_query:
+            import json
+
+            print(json.dumps(self.__query_methods(self.args.method_query), indent=4))
 
         if self.args.clustering:
             if not self.args.directory:
                 print("must include the -d option by default")
                 return None
 
-            dexofuzzy_list = self.__clustering_dexofuzzy(
+            clustering_list = self.__clustering_dexofuzzy(
                 dexofuzzy_list, self.args.clustering[0], self.args.clustering[1]
             )
 
-            print(json.dumps(dexofuzzy_list, indent=4))
+            self.__store_clustering(dexofuzzy_list, clustering_list, "n-gram")
+            self.__write_records(sys.stdout, dexofuzzy_list, clustering_list)
+            print()
+
+        elif self.args.minhash_clustering:
+            if not self.args.directory:
+                print("must include the -d option by default")
+                return None
+
+            clustering_list = self.__minhash_clustering_dexofuzzy(
+                dexofuzzy_list,
+                self.args.minhash_clustering[0],
+                self.args.minhash_clustering[1],
+            )
+
+            self.__store_clustering(dexofuzzy_list, clustering_list, "minhash")
+            self.__write_records(sys.stdout, dexofuzzy_list, clustering_list)
+            print()
+
+        if self.args.family_index:
+            import json
+
+            family_index = None
+
+            if clustering_list is not None:
+                family_index = self.__save_family_index(dexofuzzy_list, clustering_list)
+
+            if self.args.family_evaluate:
+                print(json.dumps(self.__evaluate_families(family_index, dexofuzzy_list), indent=4))
+
+            if self.args.family_query:
+                print(json.dumps(self.__query_families(family_index, self.args.family_query), indent=4))
+
+        if self.sink is not None:
+            try:
+                self.sink.close()
+
+            except Exception:
+                self.__log_dexofuzzy(message="Unable to write the SQLite database", file=self.args.sqlite)
 
         if self.args.csv:
+            import csv
+
             try:
                 with open(self.args.csv, "w", encoding="UTF-8", newline="") as csv_file:
                     fieldnames = ["name", "sha256", "size", "dexofuzzy"]
                     writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
                     writer.writeheader()
 
-                    for output in dexofuzzy_list:
+                    for idx in range(len(dexofuzzy_list)):
                         row = {}
-                        row["name"] = output["name"]
-                        row["sha256"] = output["sha256"]
-                        row["size"] = output["size"]
-                        row["dexofuzzy"] = output["dexofuzzy"]
+                        row["name"] = dexofuzzy_list.get_name(idx)
+                        row["sha256"] = dexofuzzy_list.get_sha256(idx)
+                        row["size"] = dexofuzzy_list.get_size(idx)
+                        row["dexofuzzy"] = dexofuzzy_list.get_dexofuzzy(idx)
                         writer.writerow(row)
 
             except IOError:
+                import inspect
+                import traceback
+
                 print(f"{inspect.stack()[0][3]} : {traceback.format_exc()}")
                 return False
 
         if self.args.json:
             try:
                 with open(self.args.json, "w", encoding="UTF-8") as json_file:
-                    json.dump(dexofuzzy_list, json_file, indent=4)
+                    self.__write_records(json_file, dexofuzzy_list, clustering_list)
 
             except IOError:
+                import inspect
+                import traceback
+
                 print(f"{inspect.stack()[0][3]} : {traceback.format_exc()}")
                 return False
 
+    def serve(self, argv):
+        """
+        This function handles the Dexofuzzy server.
+        :param argv: list of command line arguments after 'serve'
+        """
+
+        parser = argparse.ArgumentParser(
+            prog="dexofuzzy serve",
+            description=("Dexofuzzy: serve dexofuzzy over localhost HTTP with warm workers"),
+            add_help=True
+        )
+
+        parser.add_argument(
+            "--host", default="127.0.0.1",
+            help="the address to listen on (default: 127.0.0.1)"
+        )
+        parser.add_argument(
+            "--port", type=int, default=8765,
+            help="the port to listen on (default: 8765)"
+        )
+        parser.add_argument(
+            "--unix-socket", metavar="PATH",
+            help="listen on a Unix socket instead of TCP"
+        )
+        parser.add_argument(
+            "--workers", type=int,
+            help="the number of worker processes (default: the number of CPUs)"
+        )
+        parser.add_argument(
+            "--max-pending", type=int,
+            help="the number of requests hashed at once before answering 503 "
+            + "(default: twice the number of workers)"
+        )
+        parser.add_argument(
+            "--max-request-size", metavar="BYTES", type=int, default=256 * 1024 * 1024,
+            help="the largest accepted request body or sample named by path (default: 268435456)"
+        )
+        parser.add_argument(
+            "--timeout", metavar="SECONDS", type=float, default=60.0,
+            help="answer 504 and replace the worker of a sample that takes longer than SECONDS "
+            + "(default: 60)"
+        )
+        parser.add_argument(
+            "--request-timeout", metavar="SECONDS", type=float, default=30.0,
+            help="answer 408 to a client that takes longer than SECONDS to send its request "
+            + "(default: 30)"
+        )
+        parser.add_argument(
+            "--memory-limit", metavar="MB", type=int,
+            help="limit the address space of each worker process to MB megabytes"
+        )
+        parser.add_argument(
+            "--backend", choices=sorted(BACKENDS),
+            help="the fuzzy hash backend (default: ssdeep, or spamsum if ssdeep is not installed)"
+        )
+        parser.add_argument(
+            "-v", "--verbose", action="store_true",
+            help="log every request"
+        )
+
+        self.args = parser.parse_args(argv)
+
+        from dexofuzzy.core.server import Server
+
+        if self.args.timeout <= 0 or self.args.request_timeout <= 0:
+            print("--timeout and --request-timeout must be greater than zero")
+            return None
+
+        if self.args.backend:
+            try:
+                set_backend(self.args.backend)
+
+            except (BackendError, ImportError) as e:
+                print(f"Unable to load the {self.args.backend} backend: {e}")
+                return None
+
+        server = Server(
+            host=self.args.host,
+            port=self.args.port,
+            unix_socket=self.args.unix_socket,
+            workers=self.args.workers,
+            max_pending=self.args.max_pending,
+            max_request_size=self.args.max_request_size,
+            verbose=self.args.verbose,
+            timeout=self.args.timeout,
+            memory_limit=self.args.memory_limit << 20 if self.args.memory_limit else None,
+            request_timeout=self.args.request_timeout,
+        )
+
+        def shutdown(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        print(f"Serving dexofuzzy on {server.address} with {server.pool.workers} workers")
+        sys.stdout.flush()
+        server.serve_forever()
+
+    def __watch(self, sample_dir):
+        from dexofuzzy.core.watcher import Watcher, WatcherError
+
+        sample_path = os.path.join(os.getcwd(), sample_dir)
+
+        if self.args.move_to:
+            move_to = os.path.abspath(self.args.move_to)
+
+            if os.path.commonpath([move_to, os.path.abspath(sample_path)]) == os.path.abspath(sample_path):
+                print("The --move-to directory must be outside the -d directory")
+                return
+
+        try:
+            watcher = Watcher(sample_path, self.discovery, settle=self.args.settle)
+
+            if self.args.watch_state:
+                watcher.load_state(self.args.watch_state)
+
+        except WatcherError as e:
+            print(e)
+            return
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        # The results not yet in every output, whose samples are not moved away yet.
+        pending = []
+        flushed = time.monotonic()
+
+        try:
+            while not stop.is_set():
+                results = []
+
+                for result in self.__get_reports(watcher.poll()):
+                    if result is not None:
+                        print(
+                            f"{result.name},{result.sha256},"
+                            f"{result.size},{result.dexofuzzy}"
+                        )
+
+                        self.__add_result(result)
+                        results.append(result)
+
+                if results:
+                    self.__append_outputs(results)
+                    pending.extend(results)
+
+                # The method index and the n-gram matrix are rewritten as a whole, so not after every batch.
+                flush = bool(pending) and time.monotonic() - flushed >= self.args.flush_interval
+
+                if flush:
+                    self.__flush_outputs()
+                    flushed = time.monotonic()
+
+                if flush or (self.method_index is None and self.ngram_matrix is None):
+                    self.__move_samples(watcher, sample_path, pending)
+                    pending = []
+
+                # The samples seen are saved only once every output holds them.
+                if not pending and self.args.watch_state:
+                    watcher.save_state(self.args.watch_state)
+
+                sys.stdout.flush()
+                stop.wait(self.args.watch_interval)
+
+        finally:
+            if pending:
+                self.__flush_outputs()
+                self.__move_samples(watcher, sample_path, pending)
+
+            if self.args.watch_state:
+                watcher.save_state(self.args.watch_state)
+
+            if self.metrics is not None:
+                self.metrics.skipped = self.discovery.skipped_count
+                self.metrics.stop_reporting()
+
+            if self.sink is not None:
+                self.sink.close()
+
+    def __enqueue_samples(self, directory_samples):
+        from dexofuzzy.cli.workqueue import WorkQueue, WorkQueueError
+
+        # The queue is shared between hosts, so the samples are queued by absolute path.
+        file_paths = list(directory_samples)
+
+        if self.args.file:
+            file_paths.append(self.args.file)
+
+        if self.args.sample_list:
+            file_paths.extend(self.__read_sample_list(self.args.sample_list) or [])
+
+        try:
+            with WorkQueue(self.args.enqueue) as work_queue:
+                added = work_queue.enqueue(os.path.abspath(file_path) for file_path in file_paths)
+
+        except WorkQueueError as e:
+            print(e)
+            return
+
+        print(f"Enqueued {added} samples ({len(file_paths) - added} already queued)")
+
+    def __work_queue(self, queue_file):
+        from dexofuzzy.cli.workqueue import WorkQueue, WorkQueueError
+
+        if self.args.lease_batch <= 0:
+            print("--lease-batch must be greater than zero")
+            return
+
+        try:
+            work_queue = WorkQueue(
+                queue_file, lease_seconds=self.args.lease_seconds, max_attempts=self.args.max_attempts
+            )
+
+        except WorkQueueError as e:
+            print(e)
+            return
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        # A stopped worker finishes its batch; the leases of a killed one expire.
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        try:
+            while not stop.is_set():
+                file_paths = work_queue.lease(self.args.lease_batch)
+
+                if not file_paths:
+                    if not work_queue.get_counts()["leased"]:
+                        break
+
+                    # Other workers hold the remaining samples, which come back if their leases expire.
+                    stop.wait(self.args.watch_interval)
+                    continue
+
+                results = []
+
+                for result in self.__get_reports(file_paths):
+                    if result is not None:
+                        print(
+                            f"{result.name},{result.sha256},"
+                            f"{result.size},{result.dexofuzzy}"
+                        )
+
+                        self.__add_result(result)
+                        results.append(result)
+
+                # The other outputs are written before the samples are marked as done, and
+                # --sqlite upserts by sha256, so a sample hashed twice is stored once.
+                self.__append_outputs(results)
+
+                done = {result.name for result in results}
+                work_queue.complete(results)
+                work_queue.fail(
+                    [file_path for file_path in file_paths if file_path not in done],
+                    "Unable to generate dexofuzzy",
+                )
+                sys.stdout.flush()
+
+        finally:
+            if self.metrics is not None:
+                self.metrics.stop_reporting()
+
+            if self.sink is not None:
+                self.sink.close()
+
+            work_queue.close()
+
+    def __append_outputs(self, results):
+        # Each batch is written before its samples are moved away, so a crash loses no result.
+        if self.sink is not None:
+            self.sink.flush()
+
+        try:
+            if self.args.csv:
+                import csv
+
+                write_header = not os.path.exists(self.args.csv) or not os.path.getsize(self.args.csv)
+
+                with open(self.args.csv, "a", encoding="UTF-8", newline="") as csv_file:
+                    writer = csv.DictWriter(csv_file, fieldnames=["name", "sha256", "size", "dexofuzzy"])
+
+                    if write_header:
+                        writer.writeheader()
+
+                    for result in results:
+                        writer.writerow({
+                            "name": result.name, "sha256": result.sha256,
+                            "size": result.size, "dexofuzzy": result.dexofuzzy,
+                        })
+
+            if self.args.json:
+                import json
+
+                with open(self.args.json, "a", encoding="UTF-8") as json_file:
+                    for result in results:
+                        json_file.write(json.dumps(result.to_dict()) + "\n")
+
+        except IOError:
+            self.__log_dexofuzzy(message="Unable to append the results")
+
+    def __flush_outputs(self):
+        if self.method_index is not None:
+            try:
+                self.method_index.save(self.args.method_index)
+
+            except Exception:
+                self.__log_dexofuzzy(message="Unable to save the method index", file=self.args.method_index)
+
+        if self.ngram_matrix is not None:
+            self.__save_ngram_matrix()
+
+    def __save_ngram_matrix(self):
+        try:
+            self.ngram_matrix.save(self.args.ngram_matrix)
+
+        except Exception:
+            self.__log_dexofuzzy(message="Unable to save the n-gram matrix", file=self.args.ngram_matrix)
+
+    def __move_samples(self, watcher, sample_path, results):
+        if self.args.move_to:
+            for result in results:
+                self.__move_sample(watcher, sample_path, result.name)
+
+    def __move_sample(self, watcher, sample_path, file_path):
+        destination = os.path.join(self.args.move_to, os.path.relpath(file_path, sample_path))
+
+        try:
+            if os.path.exists(destination):
+                destination = f"{destination}.{int(time.time() * 1000)}"
+
+            import shutil
+
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.move(file_path, destination)
+            watcher.forget(file_path)
+
+        except OSError:
+            self.__log_dexofuzzy(message=f"Unable to move the sample to {destination}", file=file_path)
+
     def __log_dexofuzzy(self, message=None, file=None):
         if self.args.error_log:
+            import logging
+            import traceback
+
             self.logger = logging.getLogger(__name__)
             logging.basicConfig(
                 filename=self.args.error_log, level=logging.INFO, format="%(message)s"
@@ -181,119 +1064,452 @@ class Command:
             else:
                 self.logger.error(message)
 
-            self.logger.error("%s", traceback.format_exc())
+            if sys.exc_info()[0] is not None:
+                self.logger.error("%s", traceback.format_exc())
 
     def __get_dexofuzzy_compare(self, src_dexofuzzy, dst_dexofuzzy):
         try:
-            return ssdeep.compare(src_dexofuzzy, dst_dexofuzzy)
+            return get_backend().compare(src_dexofuzzy, dst_dexofuzzy)
 
         except Exception:
             self.__log_dexofuzzy("Unable to compare dexofuzzy")
             return None
 
-    def __search_directory(self, sample_dir):
+    def __discover_samples(self, sample_dir):
         if os.path.isdir(sample_dir) is False:
             print("The directory not found")
 
         sample_path = os.path.join(os.getcwd(), sample_dir)
-        for root, _, files in os.walk(sample_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                yield self.__get_report(file_path)
+        order = self.args.order
+
+        if order is None:
+            order = "size-desc" if self.isolation is not None else "found"
+
+        if order == "found" and not self.args.progress:
+            return (file_path for file_path, _ in self.discovery.scan(sample_path))
+
+        return self.discovery.get_samples(sample_path, None if order == "found" else order)
 
     def __search_file(self, sample_file):
         if os.path.isfile(sample_file) is False:
             print("The file not found")
 
-        return self.__get_report(sample_file)
+        return next(self.__get_reports([sample_file]))
+
+    def __search_list(self, list_file):
+        file_paths = self.__read_sample_list(list_file)
+
+        if file_paths is None:
+            return
+
+        yield from self.__get_reports(file_paths)
+
+    def __read_sample_list(self, list_file):
+        try:
+            with open(list_file, encoding="UTF-8") as file:
+                return [line.split("\t")[0] for line in file.read().splitlines() if line.strip()]
+
+        except IOError:
+            print("The sample list not found")
+            return None
+
+    def __get_reports(self, file_paths):
+        if self.threads is not None:
+            yield from self.__get_threaded_reports(file_paths)
+            return
+
+        if self.isolation is None:
+            for file_path in file_paths:
+                yield self.__get_report(file_path)
+
+            return
+
+        tasks = (
+            (
+                file_path, self.budget, self.__with_details(),
+                self.args.dex_cache, self.walker, self.__get_ngrams(),
+            )
+            for file_path in file_paths
+        )
+
+        if self.metrics is not None:
+            tasks = self.__start_metrics(tasks)
+
+        for (file_path, *_), status, value, elapsed in self.isolation.imap_unordered(tasks):
+            if status == "ok":
+                report, dex_count = value
+                report.name = file_path
+
+                if self.metrics is not None:
+                    self.metrics.finish(report.size, dex_count, latency=elapsed, name=file_path)
+
+                yield report
+                continue
+
+            if self.metrics is not None:
+                size = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+                category = value.split(":")[0] if status == "error" else status
+                self.metrics.finish(size, 0, error=category, latency=elapsed, name=file_path)
+
+            if status != "error":
+                self.__quarantine_sample(file_path, status, value)
+
+            self.__log_dexofuzzy(message=f"Unable to generate dexofuzzy ({value})", file=file_path)
+            yield None
+
+    def __start_metrics(self, tasks):
+        # The pool takes a task only when a worker is free to run it, so this
+        # marks the moment each sample is handed to a worker.
+        for task in tasks:
+            self.metrics.start(task[0])
+            yield task
+
+    def __get_threaded_reports(self, file_paths):
+        import collections
+        from concurrent.futures import ThreadPoolExecutor
+
+        # The fuzzy hash backend is loaded once, before the threads share it.
+        get_backend()
+
+        # Results are yielded in input order, with at most two samples per thread in flight.
+        with ThreadPoolExecutor(self.threads) as executor:
+            pending = collections.deque()
+
+            for file_path in file_paths:
+                pending.append(executor.submit(self.__get_report, file_path))
+
+                if len(pending) >= self.threads * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    def __quarantine_sample(self, file_path, status, message):
+        if not self.args.quarantine:
+            return
+
+        try:
+            with open(self.args.quarantine, "a", encoding="UTF-8") as quarantine_file:
+                quarantine_file.write(f"{file_path}\t{status}\t{message}\n")
+
+        except IOError:
+            self.__log_dexofuzzy(message="Unable to write the quarantine file", file=file_path)
+
+    def __get_ngrams(self):
+        return self.ngram_matrix.ngrams if self.ngram_matrix is not None else None
+
+    def __with_details(self):
+        return self.args.detail or self.method_index is not None
+
+    def __add_result(self, result, dexofuzzy_list=None):
+        if self.method_index is not None:
+            self.method_index.add(result.name, result.details["methods"]["fuzzy"], result.sha256)
+
+            if not self.args.detail:
+                result.details = None
+
+        if self.sink is not None:
+            self.sink.add(result)
+
+        if self.ngram_matrix is not None:
+            self.ngram_matrix.add(result.name, result.sha256, result.ngram_counts)
+            result.ngram_counts = None
+
+        if dexofuzzy_list is not None:
+            dexofuzzy_list.append(result)
+
+    def __store_clustering(self, dexofuzzy_list, clustering_list, method):
+        if self.sink is None or clustering_list is None:
+            return
+
+        for src, clustering in enumerate(clustering_list):
+            for dst, key, value in clustering:
+                self.sink.add_edge(
+                    dexofuzzy_list.get_sha256(src),
+                    dexofuzzy_list.get_sha256(dst),
+                    method,
+                    score=value if key == "jaccard" else None,
+                    signature=value if key == "signature" else None,
+                )
+
+    def __query_methods(self, file_path):
+        from dexofuzzy.core.generator import Generator
+        from dexofuzzy.core.method_index import MethodIndex
+
+        try:
+            method_index = MethodIndex.load(self.args.method_index)
+            generator = Generator(detail=True, walker=self.walker)
+            generator.get_dexofuzzy(file_path)
+
+            return method_index.query(
+                generator.details["methods"]["fuzzy"], top=self.args.top, max_df=self.args.max_df
+            )
+
+        except Exception:
+            self.__log_dexofuzzy(message="Unable to query the method index", file=file_path)
+            return None
+
+    def __save_family_index(self, dexofuzzy_list, clustering_list):
+        from dexofuzzy.core.family_index import FamilyIndex
+
+        try:
+            family_index = FamilyIndex(self.args.representatives)
+            family_index.build(
+                [
+                    (dexofuzzy_list.get_name(idx), dexofuzzy_list.get_sha256(idx), dexofuzzy_list.get_dexofuzzy(idx))
+                    for idx in range(len(dexofuzzy_list))
+                ],
+                clustering_list,
+            )
+            family_index.save(self.args.family_index)
+
+            return family_index
+
+        except Exception:
+            self.__log_dexofuzzy(message="Unable to save the family index", file=self.args.family_index)
+            return None
+
+    def __load_family_index(self, family_index):
+        from dexofuzzy.core.family_index import FamilyIndex
+
+        if family_index is not None:
+            return family_index
+
+        return FamilyIndex.load(self.args.family_index)
+
+    def __evaluate_families(self, family_index, dexofuzzy_list):
+        try:
+            family_index = self.__load_family_index(family_index)
+
+            return family_index.evaluate(
+                [
+                    (dexofuzzy_list.get_name(idx), dexofuzzy_list.get_dexofuzzy(idx))
+                    for idx in range(len(dexofuzzy_list))
+                ],
+                top=self.args.top,
+                expand=self.args.expand,
+            )
+
+        except Exception:
+            self.__log_dexofuzzy(message="Unable to evaluate the family index", file=self.args.family_index)
+            return None
+
+    def __query_families(self, family_index, file_path):
+        from dexofuzzy.core.generator import Generator
+
+        try:
+            family_index = self.__load_family_index(family_index)
+            generator = Generator(walker=self.walker)
+            dexofuzzy = generator.get_dexofuzzy(file_path)
+
+            return family_index.query(dexofuzzy, top=self.args.top, expand=self.args.expand)
+
+        except Exception:
+            self.__log_dexofuzzy(message="Unable to query the family index", file=file_path)
+            return None
+
+    def __count_samples(self, directory_samples):
+        count = len(directory_samples) + (1 if self.args.file else 0)
+
+        if self.args.sample_list and os.path.isfile(self.args.sample_list):
+            with open(self.args.sample_list, encoding="UTF-8") as file:
+                count += sum(1 for line in file if line.strip())
+
+        return count
 
     def __get_report(self, file_path):
+        from dexofuzzy.core.generator import Generator
+
+        generator = Generator(
+            profile=self.metrics is not None, budget=self.budget, detail=self.__with_details(),
+            cache=self.cache, walker=self.walker, ngrams=self.__get_ngrams(), arena=self.__get_arena(),
+        )
+
+        if self.metrics is not None:
+            self.metrics.start(file_path)
+
         try:
-            generator = Generator()
-            report = {}
-            report["name"] = file_path
-            report["sha256"] = self.__get_sha256(file_path)
-            report["size"] = self.__get_file_size(file_path)
-            report["dexofuzzy"] = generator.get_dexofuzzy(file_path)
+            report = Record(
+                file_path,
+                self.__get_sha256(file_path),
+                self.__get_file_size(file_path),
+                generator.get_dexofuzzy(file_path),
+            )
+            self.__finish_metrics(file_path, generator)
+
+            if self.budget is not None:
+                report.status = generator.status
 
+            report.details = generator.details
+            report.ngram_counts = generator.ngram_counts
             return report
 
-        except Exception:
+        except Exception as e:
+            self.__finish_metrics(file_path, generator, error=type(e).__name__)
             self.__log_dexofuzzy(message="Unable to generate dexofuzzy", file=file_path)
             return None
 
+    def __finish_metrics(self, file_path, generator, error=None):
+        if self.metrics is None:
+            return
+
+        try:
+            size = os.stat(file_path).st_size
+
+        except OSError:
+            size = 0
+
+        dex_count = generator.stats.dex_count if generator.stats is not None else 0
+        self.metrics.finish(size, dex_count, error, name=file_path)
+
     def __get_sha256(self, file_path):
         if not os.path.exists(file_path):
             self.__log_dexofuzzy(message="The file not found", file=file_path)
 
         try:
-            with open(file_path, "rb") as file:
-                data = file.read()
-
-            sha256 = hashlib.sha256(data).hexdigest()
+            sha256 = self.__get_arena().get_digest(file_path)
             return sha256
 
         except IOError:
             self.__log_dexofuzzy(message="Unable to get sha256", file=file_path)
             return None
 
+    def __get_arena(self):
+        # An arena belongs to one thread, so each --threads worker has its own.
+        from dexofuzzy.core.arena import BufferArena
+
+        if getattr(self.__local, "arena", None) is None:
+            self.__local.arena = BufferArena()
+
+        return self.__local.arena
+
     def __get_file_size(self, file_path):
         try:
             statinfo = os.stat(file_path)
             file_size = int(statinfo.st_size)
-            return str(file_size)
+            return file_size
 
         except IOError:
             self.__log_dexofuzzy(message="Unable to get file size", file=file_path)
             return None
 
     def __clustering_dexofuzzy(self, dexofuzzy_list, n_gram, m_partial_matching):
+        from dexofuzzy.core.partial_matching import PartialMatching
+
         try:
-            sources = destinations = dexofuzzy_list
-            for source in sources:
-                source["clustering"] = []
-                src_dexofuzzy = source["dexofuzzy"].split(":")[1]
-
-                for destination in destinations:
-                    dst_dexofuzzy = destination["dexofuzzy"].split(":")[1]
-                    signature = self.__search_n_gram(
-                        src_dexofuzzy,
-                        dst_dexofuzzy,
-                        int(n_gram),
-                        int(m_partial_matching),
-                    )
+            stop_list = None
+
+            if self.args.ngram_stop_list:
+                stop_list = PartialMatching.load_stop_list(self.args.ngram_stop_list)
 
-                    if signature:
-                        clustering = {}
-                        clustering["name"] = destination["name"]
-                        clustering["sha256"] = destination["sha256"]
-                        clustering["size"] = destination["size"]
-                        clustering["dexofuzzy"] = dst_dexofuzzy
-                        clustering["signature"] = signature
-                        source["clustering"].append(clustering)
+            partial_matching = PartialMatching(
+                int(n_gram), int(m_partial_matching), max_df=self.args.max_ngram_df, stop_list=stop_list
+            )
+            signatures = [dexofuzzy.split(":")[1] for dexofuzzy in dexofuzzy_list.get_dexofuzzy_list()]
+            clustering_list = partial_matching.get_clustering(signatures)
+
+            if self.args.ngram_df:
+                partial_matching.save_frequencies(self.args.ngram_df)
 
-            return sources
+            return clustering_list
 
         except Exception:
             self.__log_dexofuzzy(message="Unable to cluster dexofuzzy")
             return None
 
-    def __search_n_gram(self, src_dexofuzzy, dst_dexofuzzy, n_gram, m_partial_matching):
+    def __minhash_clustering_dexofuzzy(self, dexofuzzy_list, n_gram, threshold):
+        import json
+
+        from dexofuzzy.core.minhash import MinHashLSH
+
         try:
-            partial_matching = 0
-            signature_list = []
+            minhash = MinHashLSH(
+                int(n_gram),
+                float(threshold),
+                bands=self.args.lsh_bands[0],
+                rows=self.args.lsh_bands[1],
+            )
+            dexofuzzy = dexofuzzy_list.get_dexofuzzy_list()
 
-            for i in range(len(dst_dexofuzzy)):
-                if len(dst_dexofuzzy[i : i + n_gram]) == n_gram:
-                    if dst_dexofuzzy[i : i + n_gram] in src_dexofuzzy:
-                        partial_matching += 1
-                        signature_list.append(dst_dexofuzzy[i : i + n_gram])
+            pairs = minhash.get_pairs(dexofuzzy)
 
-                        if partial_matching == m_partial_matching:
-                            return signature_list
+            if self.args.lsh_evaluate:
+                print(json.dumps(minhash.evaluate(dexofuzzy, pairs), indent=4))
 
-            return None
+            neighbors = {idx: [(idx, 1.0)] for idx in range(len(dexofuzzy_list))}
+            for (src, dst), jaccard in pairs.items():
+                neighbors[src].append((dst, jaccard))
+                neighbors[dst].append((src, jaccard))
+
+            return [
+                [(dst, "jaccard", jaccard) for dst, jaccard in sorted(neighbors[idx])]
+                for idx in range(len(dexofuzzy_list))
+            ]
 
         except Exception:
-            self.__log_dexofuzzy(message="Unable to search n-gram")
+            self.__log_dexofuzzy(message="Unable to cluster dexofuzzy with MinHash")
             return None
+
+    def __write_records(self, file, dexofuzzy_list, clustering_list=None):
+        # The neighbors are kept as indexes into dexofuzzy_list and only expanded here,
+        # one record at a time, instead of copying each neighbor into a dict up front.
+        import json
+
+        file.write("[")
+
+        for idx, record in enumerate(dexofuzzy_list):
+            output = record.to_dict()
+
+            if clustering_list is not None:
+                output["clustering"] = []
+
+                for dst, key, value in clustering_list[idx]:
+                    clustering = {}
+                    clustering["name"] = dexofuzzy_list.get_name(dst)
+                    clustering["sha256"] = dexofuzzy_list.get_sha256(dst)
+                    size = dexofuzzy_list.get_size(dst)
+                    clustering["size"] = str(size) if size is not None else None
+                    clustering["dexofuzzy"] = dexofuzzy_list.get_dexofuzzy(dst).split(":")[1]
+                    clustering[key] = value
+                    output["clustering"].append(clustering)
+
+            file.write("," if idx else "")
+            file.write("\n    " + json.dumps(output, indent=4).replace("\n", "\n    "))
+
+        file.write("\n]" if len(dexofuzzy_list) else "]")
+
+
+_dex_cache = None
+_arena = None
+
+
+def _get_isolated_report(task):
+    global _dex_cache, _arena
+
+    from dexofuzzy.core.arena import BufferArena
+    from dexofuzzy.core.cache import DexCache
+    from dexofuzzy.core.generator import Generator
+
+    file_path, budget, detail, cache_size, walker, ngrams = task
+
+    # Each worker process keeps its own cache across the samples it is given.
+    if _dex_cache is None and cache_size > 0:
+        _dex_cache = DexCache(cache_size)
+
+    # And its own arena, so its memory is reused from one sample to the next.
+    if _arena is None:
+        _arena = BufferArena()
+
+    generator = Generator(
+        profile=True, budget=budget, detail=detail, cache=_dex_cache, walker=walker, ngrams=ngrams, arena=_arena
+    )
+    sha256 = _arena.get_digest(file_path)
+
+    report = Record(None, sha256, os.stat(file_path).st_size, generator.get_dexofuzzy(file_path))
+
+    if budget is not None:
+        report.status = generator.status
+
+    report.details = generator.details
+    report.ngram_counts = generator.ngram_counts
+    return report, generator.stats.dex_count
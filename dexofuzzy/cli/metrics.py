@@ -0,0 +1,316 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import json
+import os
+import sys
+import threading
+import time
+
+
+class Histogram:
+    """
+    This class counts observations into cumulative buckets, as Prometheus does.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+
+    def to_dict(self):
+        histogram = {}
+        histogram["buckets"] = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        histogram["sum"] = self.sum
+        histogram["count"] = self.count
+
+        return histogram
+
+
+class Metrics:
+    """
+    This class tracks the throughput of a CLI run, prints its progress and
+    writes its counters and histograms to a Prometheus textfile or a JSON file.
+
+    The samples in progress are tracked by name, so that with several threads
+    or worker processes the oldest of them, e.g. a stalled worker, is shown.
+    """
+
+    LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+    SIZE_BUCKETS = tuple(1 << shift for shift in range(16, 31, 2))
+    DEX_COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+    def __init__(self, total=None, progress=False, metrics_file=None, metrics_format=None,
+                 interval=2.0, stream=None):
+        self.total = total
+        self.progress = progress
+        self.metrics_file = metrics_file
+        self.metrics_format = metrics_format or (
+            "json" if metrics_file and metrics_file.endswith(".json") else "prometheus"
+        )
+        self.interval = interval
+        self.stream = stream or sys.stderr
+
+        self.started = time.time()
+        self.samples = 0
+        self.skipped = 0
+        self.errors = {}
+        self.bytes = 0
+        self.dex = 0
+        self.latency = Histogram(self.LATENCY_BUCKETS)
+        self.size = Histogram(self.SIZE_BUCKETS)
+        self.dex_count = Histogram(self.DEX_COUNT_BUCKETS)
+        self.in_flight = {}
+
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def __enter__(self):
+        self.start_reporting()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_reporting()
+
+    def start(self, name):
+        """
+        This function marks the beginning of a sample.
+        :param name: string
+        """
+
+        with self.__lock:
+            self.in_flight[name] = time.time()
+
+    def finish(self, size, dex_count, error=None, latency=None, name=None):
+        """
+        This function records the end of a sample.
+        :param size: the file size in bytes
+        :param dex_count: the number of dex files in the sample
+        :param error: the category of the error, None on success
+        :param latency: seconds spent on the sample, measured since start if omitted
+        :param name: the name given to start
+        """
+
+        with self.__lock:
+            started = self.in_flight.pop(name, None)
+
+            if latency is None:
+                latency = time.time() - started if started is not None else 0.0
+
+            self.samples += 1
+            self.bytes += size
+            self.dex += dex_count
+            self.latency.observe(latency)
+            self.size.observe(size)
+            self.dex_count.observe(dex_count)
+
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def get_oldest(self):
+        """
+        This function finds the sample in progress for the longest time.
+        :return: (name, seconds), or (None, 0.0) when no sample is in progress
+        """
+
+        with self.__lock:
+            if not self.in_flight:
+                return None, 0.0
+
+            name = min(self.in_flight, key=self.in_flight.get)
+            return name, time.time() - self.in_flight[name]
+
+    def start_reporting(self):
+        """
+        This function starts reporting periodically in a background thread.
+        """
+
+        if (self.progress or self.metrics_file) and self.__thread is None:
+            self.__thread = threading.Thread(target=self.__report_loop, daemon=True)
+            self.__thread.start()
+
+    def stop_reporting(self):
+        """
+        This function stops the background thread and reports one last time.
+        """
+
+        self.__stopped.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        self.report()
+
+        if self.progress:
+            print(file=self.stream)
+
+    def report(self):
+        """
+        This function prints the progress and writes the metrics file.
+        """
+
+        if self.progress:
+            print(f"\r{self.get_status()}\x1b[K", end="", file=self.stream, flush=True)
+
+        if self.metrics_file:
+            self.write(self.metrics_file)
+
+    def get_status(self):
+        """
+        This function summarizes the progress in one line.
+        :return: string
+        """
+
+        with self.__lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            errors = sum(self.errors.values())
+            status = (
+                f"{self.samples}" + (f"/{self.total}" if self.total else "") + " files"
+                + f" | {self.samples / elapsed:.1f} files/s"
+                + f" | {self.bytes / elapsed / 1e6:.1f} MB/s"
+                + f" | {errors} errors ({errors / self.samples if self.samples else 0:.1%})"
+                + f" | elapsed {_format_duration(elapsed)}"
+            )
+
+            if self.total and self.samples:
+                remaining = (self.total - self.samples) * elapsed / self.samples
+                status += f" | ETA {_format_duration(remaining)}"
+
+        name, seconds = self.get_oldest()
+
+        if name is not None and seconds >= self.interval:
+            status += f" | {name} running for {seconds:.0f}s"
+
+        return status
+
+    def to_dict(self):
+        """
+        This function returns the metrics as a JSON-serializable dict.
+        :return: dict
+        """
+
+        name, seconds = self.get_oldest()
+
+        with self.__lock:
+            metrics = {}
+            metrics["timestamp"] = time.time()
+            metrics["started"] = self.started
+            metrics["samples_total"] = self.samples
+            metrics["samples_expected"] = self.total
+            metrics["skipped_total"] = self.skipped
+            metrics["bytes_total"] = self.bytes
+            metrics["dex_total"] = self.dex
+            metrics["errors_total"] = dict(self.errors)
+            metrics["samples_in_flight"] = len(self.in_flight)
+            metrics["current_sample"] = name
+            metrics["current_sample_seconds"] = seconds
+            metrics["sample_latency_seconds"] = self.latency.to_dict()
+            metrics["sample_size_bytes"] = self.size.to_dict()
+            metrics["sample_dex_count"] = self.dex_count.to_dict()
+
+        return metrics
+
+    def to_prometheus(self):
+        """
+        This function returns the metrics in the Prometheus text exposition format.
+        :return: string
+        """
+
+        metrics = self.to_dict()
+        lines = []
+
+        def add(name, metric_type, help_text, samples):
+            lines.append(f"# HELP dexofuzzy_{name} {help_text}")
+            lines.append(f"# TYPE dexofuzzy_{name} {metric_type}")
+
+            for suffix, labels, value in samples:
+                label = "{" + ",".join(f'{key}="{val}"' for key, val in labels.items()) + "}" if labels else ""
+                lines.append(f"dexofuzzy_{name}{suffix}{label} {value}")
+
+        def histogram(name, help_text, values):
+            samples = [("_bucket", {"le": bound}, count) for bound, count in values["buckets"].items()]
+            samples.append(("_bucket", {"le": "+Inf"}, values["count"]))
+            samples.append(("_sum", {}, values["sum"]))
+            samples.append(("_count", {}, values["count"]))
+            add(name, "histogram", help_text, samples)
+
+        add("samples_total", "counter", "Samples processed.", [("", {}, metrics["samples_total"])])
+        add(
+            "skipped_total", "counter", "Files skipped without a zip or dex magic.",
+            [("", {}, metrics["skipped_total"])],
+        )
+        add("bytes_total", "counter", "Bytes of samples processed.", [("", {}, metrics["bytes_total"])])
+        add("dex_total", "counter", "Dex files processed.", [("", {}, metrics["dex_total"])])
+        add(
+            "errors_total", "counter", "Samples that failed, by error category.",
+            [("", {"category": category}, count) for category, count in sorted(metrics["errors_total"].items())],
+        )
+        add(
+            "samples_in_flight", "gauge", "Samples in progress.", [("", {}, metrics["samples_in_flight"])],
+        )
+        add(
+            "current_sample_seconds", "gauge", "Seconds spent on the oldest sample in progress.",
+            [("", {}, metrics["current_sample_seconds"])],
+        )
+        add("last_update_timestamp_seconds", "gauge", "Time of this update.", [("", {}, metrics["timestamp"])])
+        histogram("sample_latency_seconds", "Seconds per sample.", metrics["sample_latency_seconds"])
+        histogram("sample_size_bytes", "Size of each sample.", metrics["sample_size_bytes"])
+        histogram("sample_dex_count", "Dex files per sample.", metrics["sample_dex_count"])
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path):
+        """
+        This function replaces the metrics file atomically, so a reader never sees a partial file.
+        :param file_path: string
+        """
+
+        if self.metrics_format == "json":
+            content = json.dumps(self.to_dict(), indent=4)
+        else:
+            content = self.to_prometheus()
+
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="UTF-8") as metrics_file:
+            metrics_file.write(content)
+
+        os.replace(temp_path, file_path)
+
+    def __report_loop(self):
+        while not self.__stopped.wait(self.interval):
+            try:
+                self.report()
+
+            except OSError:
+                pass
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
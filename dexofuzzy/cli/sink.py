@@ -0,0 +1,212 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import json
+import sqlite3
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    sha256 TEXT PRIMARY KEY,
+    name TEXT,
+    size INTEGER,
+    dexofuzzy TEXT NOT NULL,
+    block_size INTEGER NOT NULL,
+    status TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_block_size ON samples (block_size);
+
+CREATE TABLE IF NOT EXISTS dex (
+    sha256 TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT,
+    dexofuzzy TEXT NOT NULL,
+    block_size INTEGER NOT NULL,
+    methods INTEGER,
+    PRIMARY KEY (sha256, idx)
+);
+CREATE INDEX IF NOT EXISTS dex_block_size ON dex (block_size);
+
+CREATE TABLE IF NOT EXISTS clustering (
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    method TEXT NOT NULL,
+    score REAL,
+    signature TEXT,
+    PRIMARY KEY (src, dst, method)
+);
+CREATE INDEX IF NOT EXISTS clustering_dst ON clustering (dst);
+"""
+
+UPSERT_SAMPLE = """
+INSERT INTO samples (sha256, name, size, dexofuzzy, block_size, status, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (sha256) DO UPDATE SET
+    name = excluded.name, size = excluded.size, dexofuzzy = excluded.dexofuzzy,
+    block_size = excluded.block_size, status = excluded.status, updated = excluded.updated
+"""
+
+UPSERT_DEX = """
+INSERT INTO dex (sha256, idx, name, dexofuzzy, block_size, methods)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (sha256, idx) DO UPDATE SET
+    name = excluded.name, dexofuzzy = excluded.dexofuzzy,
+    block_size = excluded.block_size, methods = excluded.methods
+"""
+
+UPSERT_EDGE = """
+INSERT INTO clustering (src, dst, method, score, signature)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (src, dst, method) DO UPDATE SET
+    score = excluded.score, signature = excluded.signature
+"""
+
+
+class SQLiteSink:
+    """
+    This class upserts the results of a CLI run into a SQLite database in WAL mode,
+    buffering the rows and writing each batch in a single transaction.
+    """
+
+    def __init__(self, file_path, batch_size=1000, busy_timeout=60.0):
+        if batch_size <= 0:
+            raise SinkError("batch_size must be greater than zero")
+
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.samples = []
+        self.dex = []
+        self.edges = []
+        self.connection = None
+
+        try:
+            # isolation_level=None leaves the transactions to flush, which takes
+            # the write lock up front so that concurrent writers wait instead of failing.
+            self.connection = sqlite3.connect(file_path, timeout=busy_timeout, isolation_level=None)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+        except sqlite3.Error as e:
+            raise SinkError(f"Unable to open the database: {e}") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, record):
+        """
+        This function buffers a result, with the dexofuzzy of each of its dex if the record has details.
+        :param record: Record
+        """
+
+        if record.sha256 is None or record.dexofuzzy is None:
+            return
+
+        self.samples.append((
+            record.sha256, record.name, record.size, record.dexofuzzy,
+            _get_block_size(record.dexofuzzy), record.status, time.time(),
+        ))
+
+        if record.details is not None:
+            for idx, dex in enumerate(record.details["dex"]):
+                self.dex.append((
+                    record.sha256, idx, dex["name"], dex["dexofuzzy"],
+                    _get_block_size(dex["dexofuzzy"]), dex["methods"],
+                ))
+
+        if len(self.samples) + len(self.dex) >= self.batch_size:
+            self.flush()
+
+    def add_edge(self, src_sha256, dst_sha256, method, score=None, signature=None):
+        """
+        This function buffers a clustering edge between two samples.
+        :param src_sha256: string
+        :param dst_sha256: string
+        :param method: "n-gram" or "minhash"
+        :param score: the jaccard index of the minhash clustering
+        :param signature: the matched n-grams of the n-gram clustering
+        """
+
+        if src_sha256 is None or dst_sha256 is None or src_sha256 == dst_sha256:
+            return
+
+        self.edges.append((
+            src_sha256, dst_sha256, method, score,
+            json.dumps(signature) if signature is not None else None,
+        ))
+
+        if len(self.edges) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        This function writes the buffered rows in one transaction.
+        """
+
+        if not (self.samples or self.dex or self.edges):
+            return
+
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                self.connection.executemany(UPSERT_SAMPLE, self.samples)
+                self.connection.executemany(UPSERT_DEX, self.dex)
+                self.connection.executemany(UPSERT_EDGE, self.edges)
+                self.connection.execute("COMMIT")
+
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+        except sqlite3.Error as e:
+            raise SinkError(f"Unable to write to the database: {e}") from e
+
+        self.samples = []
+        self.dex = []
+        self.edges = []
+
+    def close(self):
+        """
+        This function writes the buffered rows and closes the database.
+        """
+
+        if self.connection is None:
+            return
+
+        try:
+            self.flush()
+
+        finally:
+            self.connection.close()
+            self.connection = None
+
+
+def _get_block_size(dexofuzzy):
+    return int(dexofuzzy.split(":")[0])
+
+
+class SinkError(Exception):
+    """
+    This class handles exceptions that occur in the process of writing the results to a database.
+    """
@@ -0,0 +1,236 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import os
+import socket
+import sqlite3
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    path TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    dexofuzzy TEXT,
+    status TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queue_state ON queue (state, lease_until);
+"""
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+class WorkQueue:
+    """
+    This class shares the samples of a batch between worker processes, on one
+    or several hosts, through a SQLite database.
+
+    A worker leases a few samples at a time for `lease_seconds`. It completes
+    each sample with its result, stored in the same transaction, or fails it
+    so that it is retried. The lease of a worker that dies expires, and the
+    samples are then leased again. A sample is given up, as "failed", after
+    `max_attempts` leases.
+
+    Every change is a short transaction that takes the write lock up front.
+    The database keeps the rollback journal rather than WAL, because WAL
+    needs shared memory and so does not work for hosts sharing the file over
+    a network file system. That file system must support POSIX locks.
+    """
+
+    def __init__(self, file_path, lease_seconds=600.0, max_attempts=3, busy_timeout=60.0, worker=None):
+        if lease_seconds <= 0:
+            raise WorkQueueError("lease_seconds must be greater than zero")
+
+        if max_attempts <= 0:
+            raise WorkQueueError("max_attempts must be greater than zero")
+
+        self.file_path = file_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        self.connection = None
+
+        try:
+            self.connection = sqlite3.connect(file_path, timeout=busy_timeout, isolation_level=None)
+            self.connection.executescript(SCHEMA)
+
+        except sqlite3.Error as e:
+            raise WorkQueueError(f"Unable to open the queue: {e}") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def enqueue(self, file_paths, batch_size=1000):
+        """
+        This function adds samples to the queue. A sample already queued, in
+        any state, is left as it is, so the same directory can be enqueued again.
+        :param file_paths: iterable of file path
+        :param batch_size: the number of samples inserted per transaction
+        :return: the number of samples added
+        """
+
+        added = 0
+        batch = []
+
+        for file_path in file_paths:
+            batch.append((file_path, "pending", time.time()))
+
+            if len(batch) >= batch_size:
+                added += self.__insert(batch)
+                batch = []
+
+        if batch:
+            added += self.__insert(batch)
+
+        return added
+
+    def lease(self, count=1):
+        """
+        This function leases the next samples, pending or with an expired lease.
+        :param count: the maximum number of samples leased
+        :return: list of file path
+        """
+
+        now = time.time()
+
+        def lease(cursor):
+            # An expired lease counts as a failed attempt.
+            cursor.execute(
+                "UPDATE queue SET state = 'failed', worker = NULL, lease_until = NULL, "
+                + "error = 'The lease expired', updated = ? "
+                + "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            file_paths = [
+                row[0] for row in cursor.execute(
+                    "SELECT path FROM queue WHERE state = 'pending' "
+                    + "OR (state = 'leased' AND lease_until < ?) LIMIT ?",
+                    (now, count),
+                )
+            ]
+            cursor.executemany(
+                "UPDATE queue SET state = 'leased', worker = ?, lease_until = ?, "
+                + "attempts = attempts + 1, updated = ? WHERE path = ?",
+                [(self.worker, now + self.lease_seconds, now, file_path) for file_path in file_paths],
+            )
+
+            return file_paths
+
+        return self.__transaction(lease)
+
+    def complete(self, records):
+        """
+        This function marks leased samples as done and stores their results.
+        A sample whose lease was lost to another worker is left to that worker,
+        so each sample keeps the result of a single worker.
+        :param records: list of Record, named by the leased file path
+        :return: the number of samples marked as done
+        """
+
+        now = time.time()
+
+        return self.__transaction(lambda cursor: cursor.executemany(
+            "UPDATE queue SET state = 'done', lease_until = NULL, error = NULL, "
+            + "sha256 = ?, size = ?, dexofuzzy = ?, status = ?, updated = ? "
+            + "WHERE path = ? AND state = 'leased' AND worker = ?",
+            [
+                (record.sha256, record.size, record.dexofuzzy, record.status, now, record.name, self.worker)
+                for record in records
+            ],
+        ).rowcount)
+
+    def fail(self, file_paths, error=None):
+        """
+        This function gives leased samples back to the queue, to be retried
+        until they were leased `max_attempts` times.
+        :param file_paths: list of file path
+        :param error: the message stored with the samples
+        :return: the number of samples given back
+        """
+
+        now = time.time()
+
+        return self.__transaction(lambda cursor: cursor.executemany(
+            "UPDATE queue SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            + "worker = NULL, lease_until = NULL, error = ?, updated = ? "
+            + "WHERE path = ? AND state = 'leased' AND worker = ?",
+            [(self.max_attempts, error, now, file_path, self.worker) for file_path in file_paths],
+        ).rowcount)
+
+    def get_counts(self):
+        """
+        This function counts the samples of the queue by state.
+        :return: dict of {state: count}
+        """
+
+        try:
+            counts = dict.fromkeys(STATES, 0)
+            counts.update(self.connection.execute("SELECT state, COUNT(*) FROM queue GROUP BY state"))
+            return counts
+
+        except sqlite3.Error as e:
+            raise WorkQueueError(f"Unable to read the queue: {e}") from e
+
+    def close(self):
+        """
+        This function closes the database.
+        """
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __insert(self, batch):
+        return self.__transaction(lambda cursor: cursor.executemany(
+            "INSERT INTO queue (path, state, updated) VALUES (?, ?, ?) ON CONFLICT (path) DO NOTHING",
+            batch,
+        ).rowcount)
+
+    def __transaction(self, function):
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            try:
+                result = function(cursor)
+                cursor.execute("COMMIT")
+
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+            return result
+
+        except sqlite3.Error as e:
+            raise WorkQueueError(f"Unable to update the queue: {e}") from e
+
+
+class WorkQueueError(Exception):
+    """
+    This class handles exceptions that occur in the process of sharing samples through a work queue.
+    """
@@ -0,0 +1,219 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import contextlib
+import io
+import json
+import os
+import zipfile
+
+
+NESTED_EXTENSIONS = (".apk", ".jar", ".zip")
+
+
+class ArchiveWalker:
+    """
+    This class finds the dex files of an APK, a split APK bundle (XAPK, APKS,
+    APKM) or an archive embedding further APKs or JARs, reading nested
+    archives in memory.
+
+    At each level, the classes*.dex members come first, sorted by name, then
+    the nested archives: those listed in a manifest.json (XAPK) in its order,
+    then base.apk or base-master.apk, then the others sorted by name. Nested
+    dex names are joined with "!", e.g. "base.apk!classes.dex".
+
+    Nested archives are only read from an archive without classes*.dex of its
+    own, such as a bundle, unless nested=True, so the dexofuzzy of a plain APK
+    does not change.
+
+    With a BufferArena, the dex files are inflated into its buffers, and each
+    dex data is a memoryview only valid until the next dex is yielded.
+    Nested archives are still read into bytes objects.
+
+    With the BudgetTracker of a sample, the declared size of each dex member
+    is checked against max_dex_size before it is opened, no more than
+    max_dex_size + 1 bytes of it are inflated, and the deadline is checked
+    between the chunks inflated.
+    """
+
+    def __init__(self, nested=False, max_depth=3, max_member_size=512 << 20, max_total_size=2 << 30):
+        if max_depth < 0:
+            raise ArchiveError("max_depth must not be negative")
+
+        self.nested = nested
+        self.max_depth = max_depth
+        self.max_member_size = max_member_size
+        self.max_total_size = max_total_size
+
+    def walk(self, file, arena=None, budget=None):
+        """
+        This function yields the dex files of an archive.
+        :param file: the path of the archive, or a binary file object
+        :param arena: the BufferArena to inflate the dex files into
+        :param budget: the BudgetTracker of the sample
+        :return: generator of (dex name, dex data)
+        """
+
+        total = [0]
+
+        with contextlib.closing(zipfile.ZipFile(file)) as zip_file:
+            dex_count = 0
+
+            for dex_name, dex_data in self.__walk(zip_file, "", 0, total, arena, budget):
+                dex_count += 1
+                yield dex_name, dex_data
+
+        if not dex_count:
+            raise ArchiveError("Unable to find 'classes.dex' in the APK file")
+
+    def __walk(self, zip_file, prefix, depth, total, arena, budget):
+        dex_names = []
+        archive_names = []
+
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+
+            if info.filename.startswith("classes") and info.filename.endswith(".dex"):
+                dex_names.append(info.filename)
+
+            elif info.filename.lower().endswith(NESTED_EXTENSIONS):
+                archive_names.append(info.filename)
+
+        for dex_name in sorted(dex_names):
+            if arena is None:
+                yield prefix + dex_name, self.__read(zip_file, dex_name, total, budget, dex=True)
+                continue
+
+            with arena.lend() as buffer:
+                yield prefix + dex_name, self.__read(zip_file, dex_name, total, budget, buffer, dex=True)
+
+        if dex_names and not self.nested:
+            return
+
+        if depth >= self.max_depth:
+            return
+
+        for archive_name in self.__get_archive_order(zip_file, archive_names):
+            data = self.__read(zip_file, archive_name, total, budget)
+
+            if not zipfile.is_zipfile(io.BytesIO(data)):
+                continue
+
+            with contextlib.closing(zipfile.ZipFile(io.BytesIO(data))) as nested_file:
+                yield from self.__walk(nested_file, f"{prefix}{archive_name}!", depth + 1, total, arena, budget)
+
+    def __get_archive_order(self, zip_file, archive_names):
+        listed = []
+
+        if "manifest.json" in zip_file.namelist():
+            try:
+                manifest = json.loads(zip_file.read("manifest.json"))
+                listed = [split["file"] for split in manifest.get("split_apks", [])]
+
+            except (ValueError, KeyError, TypeError, AttributeError):
+                listed = []
+
+        def order(archive_name):
+            basename = os.path.basename(archive_name)
+
+            if archive_name in listed:
+                return (0, listed.index(archive_name), archive_name)
+
+            if basename in ("base.apk", "base-master.apk"):
+                return (1, 0, archive_name)
+
+            return (2, 0, archive_name)
+
+        return sorted(archive_names, key=order)
+
+    def __read(self, zip_file, member_name, total, budget, buffer=None, dex=False):
+        info = zip_file.getinfo(member_name)
+        limit = self.max_member_size
+
+        if budget is not None and dex:
+            budget.check_dex(info.file_size)
+
+            if budget.budget.max_dex_size is not None:
+                limit = min(limit, budget.budget.max_dex_size)
+
+        if info.file_size > self.max_member_size:
+            raise ArchiveError(
+                f"The member {member_name} of {info.file_size} bytes exceeds max_member_size {self.max_member_size}"
+            )
+
+        # The declared size can lie, so the read itself is bounded as well.
+        with zip_file.open(info) as member:
+            if budget is not None:
+                member = _DeadlineReader(member, budget)
+
+            if buffer is None:
+                data = member.read(limit + 1)
+            else:
+                data = buffer.read(member, limit + 1, size_hint=info.file_size)
+
+        if budget is not None and dex:
+            budget.check_dex(len(data))
+
+        if len(data) > self.max_member_size:
+            raise ArchiveError(f"The member {member_name} exceeds max_member_size {self.max_member_size}")
+
+        total[0] += len(data)
+
+        if total[0] > self.max_total_size:
+            raise ArchiveError(f"The archive exceeds max_total_size {self.max_total_size}")
+
+        return data
+
+
+class _DeadlineReader:
+    """
+    This class reads a zip member in chunks, checking the deadline of a
+    BudgetTracker before inflating each of them.
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, member, budget):
+        self.member = member
+        self.budget = budget
+
+    def read(self, size):
+        chunks = []
+
+        while size > 0:
+            self.budget.check_deadline()
+            chunk = self.member.read(min(size, self.CHUNK_SIZE))
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b"".join(chunks)
+
+    def readinto(self, view):
+        self.budget.check_deadline()
+        return self.member.readinto(view)
+
+
+class ArchiveError(Exception):
+    """
+    This class handles exceptions that occur in the process of reading archives.
+    """
@@ -0,0 +1,174 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import contextlib
+import hashlib
+
+
+class BufferArena:
+    """
+    This class lends reusable bytearray buffers to a worker, so that the dex
+    files of sample after sample are inflated into the same memory instead of
+    into new bytes objects of several megabytes, whose churn fragments the
+    heap of a long-running process.
+
+    A buffer grows to the largest data read into it, in powers of two, by
+    allocating a larger bytearray rather than resizing the one in place.
+    Buffers larger than `max_idle_size` are dropped when they come back, so
+    one huge sample does not stay resident, and at most `max_idle_buffers`
+    are kept.
+
+    An arena belongs to one thread.
+    """
+
+    MIN_SIZE = 1 << 20
+
+    def __init__(self, max_idle_size=64 << 20, max_idle_buffers=4):
+        if max_idle_size <= 0 or max_idle_buffers <= 0:
+            raise BufferArenaError("max_idle_size and max_idle_buffers must be greater than zero")
+
+        self.max_idle_size = max_idle_size
+        self.max_idle_buffers = max_idle_buffers
+        self.allocations = 0
+        self.__idle = []
+
+    @contextlib.contextmanager
+    def lend(self):
+        """
+        This function lends a buffer until the end of the with block.
+        :return: ArenaBuffer
+        """
+
+        buffer = self.__idle.pop() if self.__idle else ArenaBuffer(self)
+
+        try:
+            yield buffer
+
+        finally:
+            if buffer.capacity <= self.max_idle_size and len(self.__idle) < self.max_idle_buffers:
+                self.__idle.append(buffer)
+
+    def get_digest(self, file_path, algorithm="sha256"):
+        """
+        This function hashes a file in chunks read into a lent buffer.
+        :param file_path: string
+        :param algorithm: the name of a hashlib algorithm
+        :return: bytes
+        """
+
+        digest = hashlib.new(algorithm)
+
+        with self.lend() as buffer, open(file_path, "rb") as file:
+            for chunk in buffer.read_chunks(file):
+                digest.update(chunk)
+
+        return digest.digest()
+
+    def get_idle_size(self):
+        """
+        This function sums the capacity of the buffers kept for reuse.
+        :return: the number of bytes
+        """
+
+        return sum(buffer.capacity for buffer in self.__idle)
+
+
+class ArenaBuffer:
+    """
+    This class is a buffer lent by a BufferArena. The memoryview returned by
+    read or read_chunks is only valid until the buffer is read into again.
+    """
+
+    CHUNK_SIZE = 64 << 10
+
+    def __init__(self, arena):
+        self.arena = arena
+        self.__data = bytearray()
+
+    @property
+    def capacity(self):
+        return len(self.__data)
+
+    def read(self, file, limit=None, size_hint=0):
+        """
+        This function reads a binary file object to its end, or up to `limit` bytes.
+        :param file: binary file object
+        :param limit: the maximum number of bytes read
+        :param size_hint: the expected number of bytes, such as the declared size of a zip member
+        :return: memoryview of the bytes read
+        """
+
+        # One more byte than expected, so that the end of the file is seen without growing.
+        self.__reserve(size_hint + 1 if limit is None else min(size_hint + 1, limit), 0)
+        length = 0
+
+        while limit is None or length < limit:
+            if length == len(self.__data):
+                self.__reserve(length * 2 if limit is None else min(length * 2, limit), length)
+
+            end = len(self.__data) if limit is None else min(len(self.__data), limit)
+
+            # Zip members copy what they inflate, so they are read in small chunks.
+            with memoryview(self.__data)[length : min(end, length + self.CHUNK_SIZE)] as view:
+                count = file.readinto(view)
+
+            if not count:
+                break
+
+            length += count
+
+        return memoryview(self.__data)[:length]
+
+    def read_chunks(self, file, chunk_size=1 << 20):
+        """
+        This function reads a binary file object in chunks, each read into the start of the buffer.
+        :param file: binary file object
+        :param chunk_size: the maximum number of bytes per chunk
+        :return: generator of memoryview
+        """
+
+        self.__reserve(chunk_size, 0)
+
+        with memoryview(self.__data)[:chunk_size] as view:
+            while True:
+                count = file.readinto(view)
+
+                if not count:
+                    return
+
+                yield view[:count]
+
+    def __reserve(self, size, length):
+        if size <= len(self.__data):
+            return
+
+        capacity = max(BufferArena.MIN_SIZE, len(self.__data))
+        while capacity < size:
+            capacity *= 2
+
+        # The old bytearray may still be viewed, so it is replaced rather than resized.
+        data = bytearray(capacity)
+        data[:length] = memoryview(self.__data)[:length]
+        self.__data = data
+        self.arena.allocations += 1
+
+
+class BufferArenaError(Exception):
+    """
+    This class handles exceptions that occur in the process of lending buffers.
+    """
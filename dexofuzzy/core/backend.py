@@ -0,0 +1,127 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import os
+import sys
+
+
+class SsdeepBackend:
+    """
+    This class computes fuzzy hashes with the ssdeep package.
+    """
+
+    name = "ssdeep"
+
+    def __init__(self):
+        if sys.platform == "win32":
+            import dexofuzzy.bin as ssdeep
+        else:
+            import ssdeep
+
+        self.__ssdeep = ssdeep
+
+    def hash(self, data):
+        return self.__ssdeep.hash(data, encoding="UTF-8")
+
+    def hash_many(self, data_list):
+        return [self.__ssdeep.hash(data, encoding="UTF-8") for data in data_list]
+
+    def compare(self, signature_1, signature_2):
+        return self.__ssdeep.compare(signature_1, signature_2)
+
+
+class SpamsumBackend:
+    """
+    This class computes fuzzy hashes with the bundled spamsum engine.
+    """
+
+    name = "spamsum"
+
+    def __init__(self):
+        from dexofuzzy.core import spamsum
+
+        self.__spamsum = spamsum
+
+    def hash(self, data):
+        return self.__spamsum.hash(data, encoding="UTF-8")
+
+    def hash_many(self, data_list):
+        return self.__spamsum.hash_many(data_list, encoding="UTF-8")
+
+    def compare(self, signature_1, signature_2):
+        return self.__spamsum.compare(signature_1, signature_2)
+
+
+BACKENDS = {
+    "ssdeep": SsdeepBackend,
+    "spamsum": SpamsumBackend,
+}
+
+_backend = None
+
+
+def register_backend(name, factory):
+    """
+    This function registers a fuzzy hash backend.
+    :param name: string
+    :param factory: callable returning an object with hash, hash_many and compare
+    """
+
+    BACKENDS[name] = factory
+
+
+def set_backend(name):
+    """
+    This function selects the fuzzy hash backend used by dexofuzzy.
+    :param name: string
+    """
+
+    global _backend
+
+    if name not in BACKENDS:
+        raise BackendError(f"Unknown backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+
+    _backend = BACKENDS[name]()
+
+
+def get_backend():
+    """
+    This function returns the selected fuzzy hash backend. Unless one was set,
+    it is taken from the DEXOFUZZY_BACKEND environment variable, otherwise
+    ssdeep is used with the bundled spamsum engine as the fallback.
+    :return: the backend
+    """
+
+    if _backend is None:
+        name = os.environ.get("DEXOFUZZY_BACKEND")
+
+        if name:
+            set_backend(name)
+        else:
+            try:
+                set_backend("ssdeep")
+            except ImportError:
+                set_backend("spamsum")
+
+    return _backend
+
+
+class BackendError(Exception):
+    """
+    This class handles exceptions that occur in the process of selecting the backend.
+    """
@@ -0,0 +1,137 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import collections
+import hashlib
+import threading
+
+
+class DexEntry:
+    """
+    This class holds what a dex contributes to a dexofuzzy: the fuzzy hash of
+    each of its methods in order, and what extracting them cost the budget.
+    The method names and the opcode n-gram counts are only kept when they
+    were asked for.
+    """
+
+    __slots__ = (
+        "backend", "method_fuzzy_list", "instructions", "method_names", "ngrams_key", "ngram_counts",
+    )
+
+    def __init__(self, backend, method_fuzzy_list, instructions, method_names=None,
+                 ngrams_key=None, ngram_counts=None):
+        self.backend = backend
+        self.method_fuzzy_list = method_fuzzy_list
+        self.instructions = instructions
+        self.method_names = method_names
+        self.ngrams_key = ngrams_key
+        self.ngram_counts = ngram_counts
+
+
+class DexCache:
+    """
+    This class keeps the DexEntry of recently seen dex files, keyed by a
+    BLAKE2b digest of their bytes, so that a dex shared by several samples is
+    extracted and hashed once.
+
+    The least recently used entries are dropped once the entries hold more than
+    `max_methods` method hashes in total. The cache is safe to share between threads.
+    """
+
+    def __init__(self, max_methods=200000):
+        if max_methods <= 0:
+            raise DexCacheError("max_methods must be greater than zero")
+
+        self.max_methods = max_methods
+        self.method_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @staticmethod
+    def get_key(dex_data):
+        """
+        This function computes the cache key of a dex.
+        :param dex_data: bytes
+        :return: bytes
+        """
+
+        return hashlib.blake2b(dex_data, digest_size=16).digest()
+
+    def get(self, key, backend, detail=False, ngrams_key=None):
+        """
+        This function looks up a dex. An entry hashed by another backend, or
+        without the method names or n-gram counts that are needed, is a miss.
+        :param key: the result of get_key
+        :param backend: the name of the fuzzy hash backend
+        :param detail: whether the method names are needed
+        :param ngrams_key: the key of the OpcodeNgrams whose counts are needed
+        :return: DexEntry or None
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if (entry is None or entry.backend != backend or (detail and entry.method_names is None)
+                    or (ngrams_key is not None and entry.ngrams_key != ngrams_key)):
+                self.misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """
+        This function stores the entry of a dex.
+        :param key: the result of get_key
+        :param entry: DexEntry
+        """
+
+        size = len(entry.method_fuzzy_list)
+
+        if size > self.max_methods:
+            return
+
+        with self.__lock:
+            previous = self.__entries.pop(key, None)
+
+            if previous is not None:
+                self.method_count -= len(previous.method_fuzzy_list)
+
+            self.__entries[key] = entry
+            self.method_count += size
+
+            while self.method_count > self.max_methods:
+                _, evicted = self.__entries.popitem(last=False)
+                self.method_count -= len(evicted.method_fuzzy_list)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.method_count = 0
+
+
+class DexCacheError(Exception):
+    """
+    This class handles exceptions that occur in the process of caching dex files.
+    """
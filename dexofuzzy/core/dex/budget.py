@@ -0,0 +1,118 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import time
+
+
+class Budget:
+    """
+    This class holds the resource limits of one sample. A limit of None is unlimited.
+
+    When a limit is hit, the sample fails with BudgetExceededError, or, with
+    partial=True, keeps the opcodes extracted so far and is marked "partial".
+    An oversized dex always fails.
+    """
+
+    def __init__(self, max_dex_size=None, max_methods=None, max_instructions=None,
+                 timeout=None, partial=False):
+        self.max_dex_size = max_dex_size
+        self.max_methods = max_methods
+        self.max_instructions = max_instructions
+        self.timeout = timeout
+        self.partial = partial
+
+    def start(self):
+        """
+        This function starts spending the budget on a sample.
+        :return: BudgetTracker
+        """
+
+        return BudgetTracker(self)
+
+
+class BudgetTracker:
+    """
+    This class tracks what one sample has spent of its budget across its dex files.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.methods = 0
+        self.instructions = 0
+        self.deadline = time.monotonic() + budget.timeout if budget.timeout else None
+
+    def check_dex(self, size):
+        if self.budget.max_dex_size is not None and size > self.budget.max_dex_size:
+            raise BudgetExceededError(
+                "max_dex_size", f"The dex size {size} exceeds max_dex_size {self.budget.max_dex_size}"
+            )
+
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceededError(
+                "timeout", f"The sample exceeds the timeout of {self.budget.timeout} seconds"
+            )
+
+    def charge_method(self, instructions):
+        self.methods += 1
+        self.instructions += instructions
+
+        if self.budget.max_methods is not None and self.methods > self.budget.max_methods:
+            raise BudgetExceededError(
+                "max_methods", f"The sample exceeds max_methods {self.budget.max_methods}"
+            )
+
+        if self.budget.max_instructions is not None and self.instructions > self.budget.max_instructions:
+            raise BudgetExceededError(
+                "max_instructions", f"The sample exceeds max_instructions {self.budget.max_instructions}"
+            )
+
+        self.check_deadline()
+
+    def try_charge(self, methods, instructions):
+        """
+        This function charges the methods of a whole dex at once, as when it is
+        taken from a cache, unless they would exceed a limit.
+        :param methods: int
+        :param instructions: int
+        :return: False if the dex does not fit, so that it is extracted and limited as usual
+        """
+
+        if self.budget.max_methods is not None and self.methods + methods > self.budget.max_methods:
+            return False
+
+        if (self.budget.max_instructions is not None
+                and self.instructions + instructions > self.budget.max_instructions):
+            return False
+
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return False
+
+        self.methods += methods
+        self.instructions += instructions
+        return True
+
+
+class BudgetExceededError(Exception):
+    """
+    This class handles exceptions that occur when a sample exceeds its budget.
+    """
+
+    def __init__(self, limit, message):
+        super().__init__(message)
+        self.limit = limit
@@ -16,42 +16,178 @@
 """
 
 # Default packages
+import contextlib
 import ctypes
 import struct
 
+# Internal packages
+from dexofuzzy.core.dex.budget import Budget, BudgetExceededError
 
-class Extractor:
+
+DEX_MAGIC_NUMBERS = (
+    b"dex\n035\x00", b"dex\n036\x00", b"dex\n037\x00",
+    b"dex\n038\x00", b"dex\n039\x00", b"dex\n040\x00",
+)
+
+
+class DexExtraction:
     """
-    This class extracts opcodes from a dex file.
+    This class holds what was extracted from one dex: the opcodes of each
+    method as a hex string, and whether a budget cut the extraction short.
+    The class descriptor and name of each method are only kept when asked for.
     """
 
+    __slots__ = ("opcodes_in_methods", "method_names", "status", "budget_error",
+                 "class_count", "skipped_class_count")
+
     def __init__(self):
-        self.dex = None
-        self.header_item = {}
-        self.string_id_item = []
-        self.type_id_item = []
-        self.class_def_item = []
         self.opcodes_in_methods = []
+        self.method_names = []
+        self.status = "complete"
+        self.budget_error = None
+        self.class_count = 0
+        self.skipped_class_count = 0
+
+
+class Extractor:
+    """
+    This class extracts opcodes from dex files.
+
+    An Extractor keeps no state between calls: the tables parsed from a dex
+    only live for the call, and the Stats and budget of the sample are passed
+    in. One instance can be reused for any number of dex files and shared
+    between threads.
+    """
+
+    def extract(self, dex_data, stats=None, budget=None, track_methods=False):
+        """
+        This method extracts the opcodes of each method of a dex file.
+        Data without a dex magic yields no methods.
+        :param dex_data: bytes, or a memoryview such as one read into a BufferArena
+        :param stats: the Stats of the sample, updated with the stages and counters
+        :param budget: the Budget, or the BudgetTracker of the sample across its dex files
+        :param track_methods: whether to resolve the class descriptor and name of each method
+        :return: DexExtraction
+        """
+
+        extraction = DexExtraction()
+
+        if dex_data[0:8] not in DEX_MAGIC_NUMBERS:
+            return extraction
+
+        if isinstance(budget, Budget):
+            budget = budget.start()
+
+        if budget is not None:
+            budget.check_dex(len(dex_data))
+
+        reader = _DexReader(dex_data, budget, track_methods)
+
+        with _measure(stats, "parse_tables"):
+            reader.parse_tables()
 
-    def get_opcodes(self, dex_data: bytes) -> list:
+        with _measure(stats, "decode_opcodes"):
+            try:
+                reader.decode_opcodes()
+
+            except BudgetExceededError as e:
+                if not budget.budget.partial:
+                    raise
+
+                extraction.status = "partial"
+                extraction.budget_error = str(e)
+
+        extraction.opcodes_in_methods = reader.opcodes_in_methods
+        extraction.class_count = reader.header_item["class_defs_size"]
+        extraction.skipped_class_count = reader.skipped_class_count
+
+        if track_methods:
+            extraction.method_names = reader.get_method_names()
+
+        if stats is not None:
+            stats.class_count += extraction.class_count
+            stats.method_count += len(extraction.opcodes_in_methods)
+            stats.skipped_class_count += extraction.skipped_class_count
+
+        return extraction
+
+    def get_opcodes(self, dex_data: bytes, stats=None, budget=None) -> list:
         """
         This method extracts opcodes from a dex file.
         :param dex_data: bytes
         :return dex_opcodes: list
         """
 
-        dex_magic_numbers = [b"dex\n035\x00", b"dex\n036\x00", b"dex\n037\x00",
-                             b"dex\n038\x00", b"dex\n039\x00", b"dex\n040\x00"]
+        return self.extract(dex_data, stats, budget).opcodes_in_methods
+
+
+def _measure(stats, stage):
+    if stats is None:
+        return contextlib.nullcontext()
+
+    return stats.measure(stage)
+
+
+class _DexReader:
+    """
+    This class holds the tables of one dex while its opcodes are extracted.
+    """
+
+    def __init__(self, dex, budget=None, track_methods=False):
+        self.dex = dex
+        self.header_item = {}
+        self.string_id_item = []
+        self.type_id_item = []
+        self.class_def_item = []
+        self.opcodes_in_methods = []
+        self.skipped_class_count = 0
+        self.budget = budget
+        self.track_methods = track_methods
+        self.method_refs = []
+        self.view = memoryview(dex)
+
+    def parse_tables(self):
+        self.header_item = self.__header_item()
+        self.string_id_item = self.__string_id_item()
+        self.type_id_item = self.__type_id_item()
+        self.class_def_item = self.__class_def_item()
+
+    def decode_opcodes(self):
+        self.__class_data()
+
+    def get_method_names(self):
+        """
+        This method resolves the class descriptor and the name of each extracted
+        method. It requires track_methods=True.
+        :return: list of (class descriptor, method name) in the order of the opcodes
+        """
+
+        method_ids_off = self.header_item["method_ids_off"]
+        method_ids_size = self.header_item["method_ids_size"]
+        method_names = []
+
+        for class_def_idx, method_idx in self.method_refs:
+            class_name = self.string_id_item[self.type_id_item[
+                                            self.class_def_item[class_def_idx]["class_idx"]]]
+            method_name = ""
 
-        if dex_data[0:8] in dex_magic_numbers:
-            self.dex = dex_data
-            self.header_item = self.__header_item()
-            self.string_id_item = self.__string_id_item()
-            self.type_id_item = self.__type_id_item()
-            self.class_def_item = self.__class_def_item()
-            self.__class_data()
+            if method_idx < method_ids_size:
+                name_idx = struct.unpack("<I", self.dex[
+                                        method_ids_off + (method_idx * 0x08) + 0x04:
+                                        method_ids_off + (method_idx * 0x08) + 0x08])[0]
 
-        return self.opcodes_in_methods
+                if name_idx < len(self.string_id_item):
+                    method_name = self.string_id_item[name_idx]
+
+            method_names.append((self.__decode_string(class_name), self.__decode_string(method_name)))
+
+        return method_names
+
+    def __decode_string(self, string_data):
+        if isinstance(string_data, bytes):
+            return string_data.decode("UTF-8", errors="replace")
+
+        return string_data
 
     def __decode_uleb128(self, offset):
         shift = size = off = 0
@@ -64,6 +200,9 @@ class Extractor:
             if (byte & 0x80) == 0:
                 break
 
+            if off == 5:
+                raise ExtractorError(f"Malformed uleb128 at offset {offset:#x}")
+
             shift += 7
 
         return size, off
@@ -74,6 +213,8 @@ class Extractor:
         header["string_ids_off"] = struct.unpack("<I", self.dex[0x3C:0x40])[0]
         header["type_ids_size"] = struct.unpack("<I", self.dex[0x40:0x44])[0]
         header["type_ids_off"] = struct.unpack("<I", self.dex[0x44:0x48])[0]
+        header["method_ids_size"] = struct.unpack("<I", self.dex[0x58:0x5C])[0]
+        header["method_ids_off"] = struct.unpack("<I", self.dex[0x5C:0x60])[0]
         header["class_defs_size"] = struct.unpack("<I", self.dex[0x60:0x64])[0]
         header["class_defs_off"] = struct.unpack("<I", self.dex[0x64:0x68])[0]
 
@@ -94,8 +235,8 @@ class Extractor:
                 string_data = ""
 
             else:
-                string_data = self.dex[offset + string_data_off:
-                                       offset + string_data_off + utf16_size]
+                string_data = bytes(self.dex[offset + string_data_off:
+                                             offset + string_data_off + utf16_size])
 
             string_data_item.append(string_data)
 
@@ -135,6 +276,9 @@ class Extractor:
         class_defs_size = self.header_item["class_defs_size"]
 
         for i in range(class_defs_size):
+            if self.budget is not None:
+                self.budget.check_deadline()
+
             class_str = self.string_id_item[self.type_id_item[
                                             self.class_def_item[i]["class_idx"]]]
 
@@ -142,6 +286,9 @@ class Extractor:
                 if self.class_def_item[i]["class_data_off"] > 0:
                     self.__class_data_item(i)
 
+            else:
+                self.skipped_class_count += 1
+
     def __class_data_item(self, idx):
         offset = self.class_def_item[idx]["class_data_off"]
         static_fields_size, static_fields_off = self.__decode_uleb128(offset)
@@ -160,10 +307,10 @@ class Extractor:
             offset = self.__encoded_field(offset, instance_fields_size)
 
         if direct_methods_size > 0:
-            offset = self.__encoded_method(offset, direct_methods_size)
+            offset = self.__encoded_method(offset, direct_methods_size, idx)
 
         if virtual_methods_size > 0:
-            offset = self.__encoded_method(offset, virtual_methods_size)
+            offset = self.__encoded_method(offset, virtual_methods_size, idx)
 
     def __encoded_field(self, offset, fields_size):
         for _ in range(fields_size):
@@ -174,9 +321,12 @@ class Extractor:
 
         return offset
 
-    def __encoded_method(self, offset, methods_size):
+    def __encoded_method(self, offset, methods_size, class_def_idx):
+        method_idx = 0
+
         for _ in range(methods_size):
-            _, method_idx_off = self.__decode_uleb128(offset)
+            method_idx_diff, method_idx_off = self.__decode_uleb128(offset)
+            method_idx += method_idx_diff
             offset += method_idx_off
             _, access_flags_off = self.__decode_uleb128(offset)
             offset += access_flags_off
@@ -188,6 +338,13 @@ class Extractor:
                 code_off += 16
                 bytecode_size = ctypes.c_ushort(code_items["insns_size"] * 2).value
                 opcodes = self.__bytecode(bytecode_size, code_off)
+
+                if self.budget is not None:
+                    self.budget.charge_method(len(opcodes) // 2)
+
+                if self.track_methods:
+                    self.method_refs.append((class_def_idx, method_idx))
+
                 self.opcodes_in_methods.append(opcodes)
 
         return offset
@@ -200,143 +357,14 @@ class Extractor:
         return code_items
 
     def __bytecode(self, bytecode_size, offset):
-        bytecode = []
+        if offset + bytecode_size > len(self.dex):
+            raise IndexError("The bytecode exceeds the dex")
 
-        for i in range(bytecode_size):
-            bytecode.append(self.dex[offset + i])
+        # A slice of the dex rather than a copy, so each opcode is read in place.
+        bytecode = self.view[offset : offset + bytecode_size]
+        opcode_format = self.__OPCODE_FORMAT
 
         try:
-            opcode_format = {
-                0x00: self.__format_10x,  0x01: self.__format_12x,
-                0x02: self.__format_22x,  0x03: self.__format_32x,
-                0x04: self.__format_12x,  0x05: self.__format_22x,
-                0x06: self.__format_32x,  0x07: self.__format_12x,
-                0x08: self.__format_22x,  0x09: self.__format_32x,
-                0x0a: self.__format_11x,  0x0b: self.__format_11x,
-                0x0c: self.__format_11x,  0x0d: self.__format_11x,
-                0x0e: self.__format_10x,  0x0f: self.__format_11x,
-                0x10: self.__format_11x,  0x11: self.__format_11x,
-                0x12: self.__format_11n,  0x13: self.__format_21s,
-                0x14: self.__format_31i,  0x15: self.__format_21h,
-                0x16: self.__format_21s,  0x17: self.__format_31i,
-                0x18: self.__format_51l,  0x19: self.__format_21h,
-                0x1a: self.__format_21c,  0x1b: self.__format_31c,
-                0x1c: self.__format_21c,  0x1d: self.__format_11x,
-                0x1e: self.__format_11x,  0x1f: self.__format_21c,
-                0x20: self.__format_22c,  0x21: self.__format_12x,
-                0x22: self.__format_21c,  0x23: self.__format_22c,
-                0x24: self.__format_35c,  0x25: self.__format_3rc,
-                0x26: self.__format_31t,  0x27: self.__format_11x,
-                0x28: self.__format_10t,  0x29: self.__format_20t,
-                0x2a: self.__format_30t,  0x2b: self.__format_31t,
-                0x2c: self.__format_31t,  0x2d: self.__format_23x,
-                0x2e: self.__format_23x,  0x2f: self.__format_23x,
-                0x30: self.__format_23x,  0x31: self.__format_23x,
-                0x32: self.__format_22t,  0x33: self.__format_22t,
-                0x34: self.__format_22t,  0x35: self.__format_22t,
-                0x36: self.__format_22t,  0x37: self.__format_22t,
-                0x38: self.__format_21t,  0x39: self.__format_21t,
-                0x3a: self.__format_21t,  0x3b: self.__format_21t,
-                0x3c: self.__format_21t,  0x3d: self.__format_21t,
-                0x3e: self.__format_10x,  0x3f: self.__format_10x,
-                0x40: self.__format_10x,  0x41: self.__format_10x,
-                0x42: self.__format_10x,  0x43: self.__format_10x,
-                0x44: self.__format_23x,  0x45: self.__format_23x,
-                0x46: self.__format_23x,  0x47: self.__format_23x,
-                0x48: self.__format_23x,  0x49: self.__format_23x,
-                0x4a: self.__format_23x,  0x4b: self.__format_23x,
-                0x4c: self.__format_23x,  0x4d: self.__format_23x,
-                0x4e: self.__format_23x,  0x4f: self.__format_23x,
-                0x50: self.__format_23x,  0x51: self.__format_23x,
-                0x52: self.__format_22c,  0x53: self.__format_22c,
-                0x54: self.__format_22c,  0x55: self.__format_22c,
-                0x56: self.__format_22c,  0x57: self.__format_22c,
-                0x58: self.__format_22c,  0x59: self.__format_22c,
-                0x5a: self.__format_22c,  0x5b: self.__format_22c,
-                0x5c: self.__format_22c,  0x5d: self.__format_22c,
-                0x5e: self.__format_22c,  0x5f: self.__format_22c,
-                0x60: self.__format_21c,  0x61: self.__format_21c,
-                0x62: self.__format_21c,  0x63: self.__format_21c,
-                0x64: self.__format_21c,  0x65: self.__format_21c,
-                0x66: self.__format_21c,  0x67: self.__format_21c,
-                0x68: self.__format_21c,  0x69: self.__format_21c,
-                0x6a: self.__format_21c,  0x6b: self.__format_21c,
-                0x6c: self.__format_21c,  0x6d: self.__format_21c,
-                0x6e: self.__format_35c,  0x6f: self.__format_35c,
-                0x70: self.__format_35c,  0x71: self.__format_35c,
-                0x72: self.__format_35c,  0x73: self.__format_10x,
-                0x74: self.__format_3rc,  0x75: self.__format_3rc,
-                0x76: self.__format_3rc,  0x77: self.__format_3rc,
-                0x78: self.__format_3rc,  0x79: self.__format_10x,
-                0x7a: self.__format_10x,  0x7b: self.__format_12x,
-                0x7c: self.__format_12x,  0x7d: self.__format_12x,
-                0x7e: self.__format_12x,  0x7f: self.__format_12x,
-                0x80: self.__format_12x,  0x81: self.__format_12x,
-                0x82: self.__format_12x,  0x83: self.__format_12x,
-                0x84: self.__format_12x,  0x85: self.__format_12x,
-                0x86: self.__format_12x,  0x87: self.__format_12x,
-                0x88: self.__format_12x,  0x89: self.__format_12x,
-                0x8a: self.__format_12x,  0x8b: self.__format_12x,
-                0x8c: self.__format_12x,  0x8d: self.__format_12x,
-                0x8e: self.__format_12x,  0x8f: self.__format_12x,
-                0x90: self.__format_23x,  0x91: self.__format_23x,
-                0x92: self.__format_23x,  0x93: self.__format_23x,
-                0x94: self.__format_23x,  0x95: self.__format_23x,
-                0x96: self.__format_23x,  0x97: self.__format_23x,
-                0x98: self.__format_23x,  0x99: self.__format_23x,
-                0x9a: self.__format_23x,  0x9b: self.__format_23x,
-                0x9c: self.__format_23x,  0x9d: self.__format_23x,
-                0x9e: self.__format_23x,  0x9f: self.__format_23x,
-                0xa0: self.__format_23x,  0xa1: self.__format_23x,
-                0xa2: self.__format_23x,  0xa3: self.__format_23x,
-                0xa4: self.__format_23x,  0xa5: self.__format_23x,
-                0xa6: self.__format_23x,  0xa7: self.__format_23x,
-                0xa8: self.__format_23x,  0xa9: self.__format_23x,
-                0xaa: self.__format_23x,  0xab: self.__format_23x,
-                0xac: self.__format_23x,  0xad: self.__format_23x,
-                0xae: self.__format_23x,  0xaf: self.__format_23x,
-                0xb0: self.__format_12x,  0xb1: self.__format_12x,
-                0xb2: self.__format_12x,  0xb3: self.__format_12x,
-                0xb4: self.__format_12x,  0xb5: self.__format_12x,
-                0xb6: self.__format_12x,  0xb7: self.__format_12x,
-                0xb8: self.__format_12x,  0xb9: self.__format_12x,
-                0xba: self.__format_12x,  0xbb: self.__format_12x,
-                0xbc: self.__format_12x,  0xbd: self.__format_12x,
-                0xbe: self.__format_12x,  0xbf: self.__format_12x,
-                0xc0: self.__format_12x,  0xc1: self.__format_12x,
-                0xc2: self.__format_12x,  0xc3: self.__format_12x,
-                0xc4: self.__format_12x,  0xc5: self.__format_12x,
-                0xc6: self.__format_12x,  0xc7: self.__format_12x,
-                0xc8: self.__format_12x,  0xc9: self.__format_12x,
-                0xca: self.__format_12x,  0xcb: self.__format_12x,
-                0xcc: self.__format_12x,  0xcd: self.__format_12x,
-                0xce: self.__format_12x,  0xcf: self.__format_12x,
-                0xd0: self.__format_22s,  0xd1: self.__format_22s,
-                0xd2: self.__format_22s,  0xd3: self.__format_22s,
-                0xd4: self.__format_22s,  0xd5: self.__format_22s,
-                0xd6: self.__format_22s,  0xd7: self.__format_22s,
-                0xd8: self.__format_22b,  0xd9: self.__format_22b,
-                0xda: self.__format_22b,  0xdb: self.__format_22b,
-                0xdc: self.__format_22b,  0xdd: self.__format_22b,
-                0xde: self.__format_22b,  0xdf: self.__format_22b,
-                0xe0: self.__format_22b,  0xe1: self.__format_22b,
-                0xe2: self.__format_22b,  0xe3: self.__format_10x,
-                0xe4: self.__format_10x,  0xe5: self.__format_10x,
-                0xe6: self.__format_10x,  0xe7: self.__format_10x,
-                0xe8: self.__format_10x,  0xe9: self.__format_10x,
-                0xea: self.__format_10x,  0xeb: self.__format_10x,
-                0xec: self.__format_10x,  0xed: self.__format_10x,
-                0xee: self.__format_10x,  0xef: self.__format_10x,
-                0xf0: self.__format_10x,  0xf1: self.__format_10x,
-                0xf2: self.__format_10x,  0xf3: self.__format_10x,
-                0xf4: self.__format_10x,  0xf5: self.__format_10x,
-                0xf6: self.__format_10x,  0xf7: self.__format_10x,
-                0xf8: self.__format_10x,  0xf9: self.__format_10x,
-                0xfa: self.__format_45cc, 0xfb: self.__format_4rcc,
-                0xfc: self.__format_35c,  0xfd: self.__format_3rc,
-                0xfe: self.__format_21c,  0xff: self.__format_21c,
-            }
-
             opcodes = ""
             current_off = 0
 
@@ -345,7 +373,7 @@ class Extractor:
 
                 if opcode_hex in opcode_format:
                     opcodes += f"{opcode_hex:02x}"
-                    current_off = opcode_format[opcode_hex](bytecode, current_off)
+                    current_off = opcode_format[opcode_hex](self, bytecode, current_off)
 
                 else:
                     current_off += 1
@@ -529,3 +557,141 @@ class Extractor:
     def __format_45cc(self, _, offset):
         offset += 12
         return offset
+
+    # Built once for every reader, so each handler takes the reader as its first argument.
+    __OPCODE_FORMAT = {
+        0x00: __format_10x,  0x01: __format_12x,
+        0x02: __format_22x,  0x03: __format_32x,
+        0x04: __format_12x,  0x05: __format_22x,
+        0x06: __format_32x,  0x07: __format_12x,
+        0x08: __format_22x,  0x09: __format_32x,
+        0x0a: __format_11x,  0x0b: __format_11x,
+        0x0c: __format_11x,  0x0d: __format_11x,
+        0x0e: __format_10x,  0x0f: __format_11x,
+        0x10: __format_11x,  0x11: __format_11x,
+        0x12: __format_11n,  0x13: __format_21s,
+        0x14: __format_31i,  0x15: __format_21h,
+        0x16: __format_21s,  0x17: __format_31i,
+        0x18: __format_51l,  0x19: __format_21h,
+        0x1a: __format_21c,  0x1b: __format_31c,
+        0x1c: __format_21c,  0x1d: __format_11x,
+        0x1e: __format_11x,  0x1f: __format_21c,
+        0x20: __format_22c,  0x21: __format_12x,
+        0x22: __format_21c,  0x23: __format_22c,
+        0x24: __format_35c,  0x25: __format_3rc,
+        0x26: __format_31t,  0x27: __format_11x,
+        0x28: __format_10t,  0x29: __format_20t,
+        0x2a: __format_30t,  0x2b: __format_31t,
+        0x2c: __format_31t,  0x2d: __format_23x,
+        0x2e: __format_23x,  0x2f: __format_23x,
+        0x30: __format_23x,  0x31: __format_23x,
+        0x32: __format_22t,  0x33: __format_22t,
+        0x34: __format_22t,  0x35: __format_22t,
+        0x36: __format_22t,  0x37: __format_22t,
+        0x38: __format_21t,  0x39: __format_21t,
+        0x3a: __format_21t,  0x3b: __format_21t,
+        0x3c: __format_21t,  0x3d: __format_21t,
+        0x3e: __format_10x,  0x3f: __format_10x,
+        0x40: __format_10x,  0x41: __format_10x,
+        0x42: __format_10x,  0x43: __format_10x,
+        0x44: __format_23x,  0x45: __format_23x,
+        0x46: __format_23x,  0x47: __format_23x,
+        0x48: __format_23x,  0x49: __format_23x,
+        0x4a: __format_23x,  0x4b: __format_23x,
+        0x4c: __format_23x,  0x4d: __format_23x,
+        0x4e: __format_23x,  0x4f: __format_23x,
+        0x50: __format_23x,  0x51: __format_23x,
+        0x52: __format_22c,  0x53: __format_22c,
+        0x54: __format_22c,  0x55: __format_22c,
+        0x56: __format_22c,  0x57: __format_22c,
+        0x58: __format_22c,  0x59: __format_22c,
+        0x5a: __format_22c,  0x5b: __format_22c,
+        0x5c: __format_22c,  0x5d: __format_22c,
+        0x5e: __format_22c,  0x5f: __format_22c,
+        0x60: __format_21c,  0x61: __format_21c,
+        0x62: __format_21c,  0x63: __format_21c,
+        0x64: __format_21c,  0x65: __format_21c,
+        0x66: __format_21c,  0x67: __format_21c,
+        0x68: __format_21c,  0x69: __format_21c,
+        0x6a: __format_21c,  0x6b: __format_21c,
+        0x6c: __format_21c,  0x6d: __format_21c,
+        0x6e: __format_35c,  0x6f: __format_35c,
+        0x70: __format_35c,  0x71: __format_35c,
+        0x72: __format_35c,  0x73: __format_10x,
+        0x74: __format_3rc,  0x75: __format_3rc,
+        0x76: __format_3rc,  0x77: __format_3rc,
+        0x78: __format_3rc,  0x79: __format_10x,
+        0x7a: __format_10x,  0x7b: __format_12x,
+        0x7c: __format_12x,  0x7d: __format_12x,
+        0x7e: __format_12x,  0x7f: __format_12x,
+        0x80: __format_12x,  0x81: __format_12x,
+        0x82: __format_12x,  0x83: __format_12x,
+        0x84: __format_12x,  0x85: __format_12x,
+        0x86: __format_12x,  0x87: __format_12x,
+        0x88: __format_12x,  0x89: __format_12x,
+        0x8a: __format_12x,  0x8b: __format_12x,
+        0x8c: __format_12x,  0x8d: __format_12x,
+        0x8e: __format_12x,  0x8f: __format_12x,
+        0x90: __format_23x,  0x91: __format_23x,
+        0x92: __format_23x,  0x93: __format_23x,
+        0x94: __format_23x,  0x95: __format_23x,
+        0x96: __format_23x,  0x97: __format_23x,
+        0x98: __format_23x,  0x99: __format_23x,
+        0x9a: __format_23x,  0x9b: __format_23x,
+        0x9c: __format_23x,  0x9d: __format_23x,
+        0x9e: __format_23x,  0x9f: __format_23x,
+        0xa0: __format_23x,  0xa1: __format_23x,
+        0xa2: __format_23x,  0xa3: __format_23x,
+        0xa4: __format_23x,  0xa5: __format_23x,
+        0xa6: __format_23x,  0xa7: __format_23x,
+        0xa8: __format_23x,  0xa9: __format_23x,
+        0xaa: __format_23x,  0xab: __format_23x,
+        0xac: __format_23x,  0xad: __format_23x,
+        0xae: __format_23x,  0xaf: __format_23x,
+        0xb0: __format_12x,  0xb1: __format_12x,
+        0xb2: __format_12x,  0xb3: __format_12x,
+        0xb4: __format_12x,  0xb5: __format_12x,
+        0xb6: __format_12x,  0xb7: __format_12x,
+        0xb8: __format_12x,  0xb9: __format_12x,
+        0xba: __format_12x,  0xbb: __format_12x,
+        0xbc: __format_12x,  0xbd: __format_12x,
+        0xbe: __format_12x,  0xbf: __format_12x,
+        0xc0: __format_12x,  0xc1: __format_12x,
+        0xc2: __format_12x,  0xc3: __format_12x,
+        0xc4: __format_12x,  0xc5: __format_12x,
+        0xc6: __format_12x,  0xc7: __format_12x,
+        0xc8: __format_12x,  0xc9: __format_12x,
+        0xca: __format_12x,  0xcb: __format_12x,
+        0xcc: __format_12x,  0xcd: __format_12x,
+        0xce: __format_12x,  0xcf: __format_12x,
+        0xd0: __format_22s,  0xd1: __format_22s,
+        0xd2: __format_22s,  0xd3: __format_22s,
+        0xd4: __format_22s,  0xd5: __format_22s,
+        0xd6: __format_22s,  0xd7: __format_22s,
+        0xd8: __format_22b,  0xd9: __format_22b,
+        0xda: __format_22b,  0xdb: __format_22b,
+        0xdc: __format_22b,  0xdd: __format_22b,
+        0xde: __format_22b,  0xdf: __format_22b,
+        0xe0: __format_22b,  0xe1: __format_22b,
+        0xe2: __format_22b,  0xe3: __format_10x,
+        0xe4: __format_10x,  0xe5: __format_10x,
+        0xe6: __format_10x,  0xe7: __format_10x,
+        0xe8: __format_10x,  0xe9: __format_10x,
+        0xea: __format_10x,  0xeb: __format_10x,
+        0xec: __format_10x,  0xed: __format_10x,
+        0xee: __format_10x,  0xef: __format_10x,
+        0xf0: __format_10x,  0xf1: __format_10x,
+        0xf2: __format_10x,  0xf3: __format_10x,
+        0xf4: __format_10x,  0xf5: __format_10x,
+        0xf6: __format_10x,  0xf7: __format_10x,
+        0xf8: __format_10x,  0xf9: __format_10x,
+        0xfa: __format_45cc, 0xfb: __format_4rcc,
+        0xfc: __format_35c,  0xfd: __format_3rc,
+        0xfe: __format_21c,  0xff: __format_21c,
+    }
+
+
+class ExtractorError(Exception):
+    """
+    This class handles exceptions that occur in the process of extracting opcodes.
+    """
@@ -0,0 +1,152 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import fnmatch
+import os
+
+ZIP_MAGIC_NUMBERS = (b"PK\x03\x04", b"PK\x05\x06", b"PK\x07\x08")
+DEX_MAGIC_NUMBERS = (b"dex\n035\x00", b"dex\n036\x00", b"dex\n037\x00",
+                     b"dex\n038\x00", b"dex\n039\x00", b"dex\n040\x00")
+
+
+class Discovery:
+    """
+    This class finds the samples in a directory tree with os.scandir, keeping
+    only the files that match the globs and start with a zip or dex magic.
+    """
+
+    def __init__(self, include=None, exclude=None, check_magic=True):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.check_magic = check_magic
+        self.skipped_count = 0
+
+    def scan(self, directory):
+        """
+        This function yields the samples in the order they are found.
+        :param directory: string
+        :return: generator of (file path, size)
+        """
+
+        stack = [directory]
+
+        while stack:
+            current = stack.pop()
+            files, subdirectories = self.list_directory(directory, current)
+
+            for file_path, stat in files:
+                if self.check_magic and not self.has_magic(file_path):
+                    self.skipped_count += 1
+                    continue
+
+                yield file_path, stat.st_size
+
+            stack.extend(reversed(subdirectories))
+
+    def list_directory(self, directory, current):
+        """
+        This function lists one directory of the tree without descending into it,
+        applying the globs but not the magic check.
+        :param directory: the root of the tree, which the globs are relative to
+        :param current: string
+        :return: (list of (file path, os.stat_result), list of subdirectory path), sorted by name
+        """
+
+        files = []
+        subdirectories = []
+
+        try:
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+
+        except OSError:
+            return files, subdirectories
+
+        for entry in entries:
+            relative_path = os.path.relpath(entry.path, directory)
+
+            if self.__match(self.exclude, relative_path, entry.name):
+                continue
+
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                    continue
+
+                if not entry.is_file():
+                    continue
+
+                stat = entry.stat()
+
+            except OSError:
+                continue
+
+            if self.include and not self.__match(self.include, relative_path, entry.name):
+                continue
+
+            files.append((entry.path, stat))
+
+        return files, subdirectories
+
+    def get_samples(self, directory, order=None):
+        """
+        This function returns the samples in the given order. "size-desc"
+        puts the largest samples first so that parallel workers finish together.
+        :param directory: string
+        :param order: None (as found), "size" or "size-desc"
+        :return: list of file path
+        """
+
+        samples = list(self.scan(directory))
+
+        if order == "size":
+            samples.sort(key=lambda sample: sample[1])
+        elif order == "size-desc":
+            samples.sort(key=lambda sample: sample[1], reverse=True)
+        elif order is not None:
+            raise DiscoveryError(f"Unknown order '{order}'")
+
+        return [file_path for file_path, _ in samples]
+
+    def has_magic(self, file_path):
+        """
+        This function checks the first 8 bytes of the file for a zip or dex magic.
+        :param file_path: string
+        :return: bool
+        """
+
+        try:
+            with open(file_path, "rb") as file:
+                magic = file.read(8)
+
+        except OSError:
+            return False
+
+        return magic[0:4] in ZIP_MAGIC_NUMBERS or magic in DEX_MAGIC_NUMBERS
+
+    def __match(self, patterns, relative_path, name):
+        return any(
+            fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(name, pattern)
+            for pattern in patterns
+        )
+
+
+class DiscoveryError(Exception):
+    """
+    This class handles exceptions that occur in the process of discovering samples.
+    """
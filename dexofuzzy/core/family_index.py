@@ -0,0 +1,288 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import json
+import os
+
+# Internal packages
+from dexofuzzy.core.backend import get_backend
+
+
+class FamilyIndex:
+    """
+    This class searches a clustered corpus in two tiers. A query is first
+    compared with a few representatives of each family, then with the members
+    of the families whose representatives matched best, instead of with every
+    sample.
+
+    The families are the connected components of the -g or -m clustering. The
+    first representative of a family is its medoid, the member most similar
+    to the others. Each next one is the member least similar to those already
+    chosen, so that a family whose members span several block sizes keeps a
+    representative for each. Members with the same dexofuzzy are compared once.
+
+    On disk, the index is a directory holding families.json.
+    """
+
+    VERSION = 1
+
+    def __init__(self, representatives=3, max_medoid_members=200):
+        if representatives <= 0:
+            raise FamilyIndexError("representatives must be greater than zero")
+
+        self.representatives = representatives
+        self.max_medoid_members = max_medoid_members
+        self.samples = []
+        self.families = []
+
+    @staticmethod
+    def get_families(clustering_list):
+        """
+        This function groups the samples into the connected components of a clustering.
+        :param clustering_list: for each sample, the list of (neighbor index, key, value)
+        :return: list of the sorted sample indices of each family
+        """
+
+        parents = list(range(len(clustering_list)))
+
+        def find(idx):
+            while parents[idx] != idx:
+                parents[idx] = parents[parents[idx]]
+                idx = parents[idx]
+
+            return idx
+
+        for src, clustering in enumerate(clustering_list):
+            for dst, _, _ in clustering:
+                parents[find(src)] = find(dst)
+
+        families = {}
+        for idx in range(len(clustering_list)):
+            families.setdefault(find(idx), []).append(idx)
+
+        return list(families.values())
+
+    def build(self, samples, clustering_list):
+        """
+        This function replaces the index with the families of a clustered corpus.
+        :param samples: list of (name, sha256, dexofuzzy), in the order of the clustering
+        :param clustering_list: for each sample, the list of (neighbor index, key, value)
+        """
+
+        if len(samples) != len(clustering_list):
+            raise FamilyIndexError("samples and clustering_list must have the same length")
+
+        self.samples = [
+            {"name": name, "sha256": sha256, "dexofuzzy": dexofuzzy}
+            for name, sha256, dexofuzzy in samples
+        ]
+        self.families = [
+            {"members": members, "representatives": self.__choose_representatives(members)}
+            for members in self.get_families(clustering_list)
+        ]
+
+    def save(self, directory):
+        """
+        This function writes the index.
+        :param directory: string
+        """
+
+        meta = {}
+        meta["version"] = self.VERSION
+        meta["representatives"] = self.representatives
+        meta["samples"] = self.samples
+        meta["families"] = self.families
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+
+            with open(os.path.join(directory, "families.json"), "w", encoding="UTF-8") as families_file:
+                json.dump(meta, families_file)
+
+        except OSError:
+            FamilyIndexError("Unable to save the family index")
+            raise
+
+    @classmethod
+    def load(cls, directory):
+        """
+        This function opens an index written by save.
+        :param directory: string
+        :return: FamilyIndex
+        """
+
+        try:
+            with open(os.path.join(directory, "families.json"), encoding="UTF-8") as families_file:
+                meta = json.load(families_file)
+
+            if meta["version"] != cls.VERSION:
+                raise FamilyIndexError(f"Unsupported family index version {meta['version']}")
+
+            index = cls(meta["representatives"])
+            index.samples = meta["samples"]
+            index.families = meta["families"]
+
+            return index
+
+        except (OSError, ValueError, KeyError):
+            FamilyIndexError("Unable to load the family index")
+            raise
+
+    def query(self, dexofuzzy, top=10, expand=3):
+        """
+        This function finds the indexed samples most similar to a dexofuzzy.
+        :param dexofuzzy: string
+        :param top: the number of samples to return
+        :param expand: the number of best-matching families whose members are compared
+        :return: dict with the number of comparisons and the list of results,
+                 each a dict with name, sha256, dexofuzzy, family and score
+        """
+
+        scores, comparisons = self.__search(dexofuzzy, expand)
+        ranked = sorted(scores, key=lambda idx: -scores[idx][1])[:top]
+
+        output = {}
+        output["comparisons"] = comparisons
+        output["results"] = [
+            dict(self.samples[idx], family=scores[idx][0], score=scores[idx][1]) for idx in ranked
+        ]
+
+        return output
+
+    def evaluate(self, queries, top=10, expand=3):
+        """
+        This function measures the recall of the two-tier search against
+        comparing each query with every indexed sample. The relevant samples of
+        a query are its `top` best matches, with ties, among the samples with a
+        score above zero. An indexed sample named as the query is left out.
+        :param queries: list of (name, dexofuzzy)
+        :param top: the number of samples returned per query
+        :param expand: the number of best-matching families whose members are compared
+        :return: dict with the mean recall and the mean number of comparisons of both searches
+        """
+
+        compare = get_backend().compare
+        recalls = []
+        comparisons = 0
+        exhaustive_comparisons = 0
+
+        for name, dexofuzzy in queries:
+            exhaustive = {}
+
+            for idx, sample in enumerate(self.samples):
+                if sample["name"] != name:
+                    exhaustive_comparisons += 1
+                    score = compare(dexofuzzy, sample["dexofuzzy"])
+
+                    if score > 0:
+                        exhaustive[idx] = score
+
+            scores, count = self.__search(dexofuzzy, expand)
+            comparisons += count
+
+            if not exhaustive:
+                continue
+
+            ranked = sorted(exhaustive.values(), reverse=True)
+            cutoff = ranked[min(top, len(ranked)) - 1]
+            relevant = {idx for idx, score in exhaustive.items() if score >= cutoff}
+            found = sorted(
+                (idx for idx in scores if self.samples[idx]["name"] != name and scores[idx][1] > 0),
+                key=lambda idx: -scores[idx][1],
+            )[:top]
+            recalls.append(len(relevant.intersection(found)) / min(top, len(relevant)))
+
+        report = {}
+        report["queries"] = len(queries)
+        report["queries_with_matches"] = len(recalls)
+        report["recall"] = sum(recalls) / len(recalls) if recalls else None
+        report["comparisons"] = comparisons / len(queries) if queries else 0
+        report["exhaustive_comparisons"] = exhaustive_comparisons / len(queries) if queries else 0
+        report["families"] = len(self.families)
+        report["representatives"] = sum(len(family["representatives"]) for family in self.families)
+
+        return report
+
+    def __search(self, dexofuzzy, expand):
+        compare = get_backend().compare
+        known = {}
+
+        def score(idx):
+            # Members sharing a dexofuzzy, as repacked samples do, are compared once.
+            other = self.samples[idx]["dexofuzzy"]
+
+            if other not in known:
+                known[other] = compare(dexofuzzy, other)
+
+            return known[other]
+
+        family_scores = [
+            max(score(idx) for idx in family["representatives"]) for family in self.families
+        ]
+        best = sorted(
+            (family_idx for family_idx, family_score in enumerate(family_scores) if family_score > 0),
+            key=lambda family_idx: -family_scores[family_idx],
+        )[:expand]
+
+        scores = {}
+        for family_idx in best:
+            for idx in self.families[family_idx]["members"]:
+                scores[idx] = (family_idx, score(idx))
+
+        return scores, len(known)
+
+    def __choose_representatives(self, members):
+        compare = get_backend().compare
+        weights = {}
+
+        for idx in members:
+            dexofuzzy = self.samples[idx]["dexofuzzy"]
+            weights[dexofuzzy] = weights.get(dexofuzzy, 0) + 1
+
+        # A large family picks its medoid among an even sample of its distinct hashes.
+        candidates = sorted(weights, key=lambda dexofuzzy: -weights[dexofuzzy])
+        step = max(1, len(candidates) // self.max_medoid_members)
+        candidates = candidates[::step][:self.max_medoid_members]
+
+        scores = [[compare(src, dst) for dst in candidates] for src in candidates]
+        medoid = max(
+            range(len(candidates)),
+            key=lambda src: sum(weights[candidates[dst]] * scores[src][dst] for dst in range(len(candidates))),
+        )
+
+        chosen = [medoid]
+        closeness = list(scores[medoid])
+
+        while len(chosen) < min(self.representatives, len(candidates)):
+            farthest = min(
+                (src for src in range(len(candidates)) if src not in chosen), key=lambda src: closeness[src]
+            )
+            chosen.append(farthest)
+            closeness = [max(closeness[src], scores[src][farthest]) for src in range(len(candidates))]
+
+        first_member = {}
+        for idx in members:
+            first_member.setdefault(self.samples[idx]["dexofuzzy"], idx)
+
+        return [first_member[candidates[src]] for src in chosen]
+
+
+class FamilyIndexError(Exception):
+    """
+    This class handles exceptions that occur in the process of the family index.
+    """
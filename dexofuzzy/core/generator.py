@@ -18,78 +18,258 @@
 # Default packages
 import contextlib
 import os
-import sys
-import zipfile
+import time
 
 # Internal packages
+from dexofuzzy.core.archive import ArchiveWalker
+from dexofuzzy.core.backend import get_backend
+from dexofuzzy.core.cache import DexEntry
 from dexofuzzy.core.dex.extractor import Extractor
+from dexofuzzy.core.stats import Stats
 
-# 3rd-party packages
-if sys.platform == "win32":
-    import dexofuzzy.bin as ssdeep
-else:
-    import ssdeep
+# The Extractor keeps no state between calls, so every generator, in any thread, shares it.
+_extractor = Extractor()
 
 
 class Generator:
     """
     This class generates dexofuzzy from the opcode.
+
+    With profile=True, or when callbacks are given, the Stats of the last
+    sample are kept in `stats` and passed to each callback, also when the
+    sample fails. Otherwise `stats` stays None and nothing is measured.
+
+    With a Budget, `status` of the last sample is "complete" or "partial".
+
+    With detail=True, `details` of the last sample holds, from the same
+    extraction pass, the dexofuzzy of each dex and the fuzzy hash of each
+    method. Methods are stored as columns of indices into `strings`:
+
+        {
+            "dex": [{"name": "classes.dex", "dexofuzzy": ..., "methods": 1024}, ...],
+            "strings": ["Lcom/example/Main;", "onCreate", ...],
+            "methods": {"dex": [0, ...], "class": [0, ...], "name": [1, ...], "fuzzy": ["3:...:...", ...]},
+        }
+
+    With a DexCache, which can be shared by several generators, a dex seen
+    before is not extracted and hashed again; `stats.cache_hits` counts those.
+
+    An ArchiveWalker sets how split APK bundles and nested archives are read.
+
+    With a BufferArena, the dex files are read into its reused buffers and
+    parsed through memoryview slices, instead of into new bytes objects for
+    every sample. A worker hashing many samples keeps one arena for all of
+    its generators.
+
+    With an OpcodeNgrams, `ngram_counts` of the last sample holds its hashed
+    opcode n-gram counts, computed from the opcodes extracted for the dexofuzzy.
+
+    As it keeps the results of its last sample, a generator is used by one
+    thread at a time. Generators in several threads can share the DexCache,
+    the ArchiveWalker, the Budget and the OpcodeNgrams, but not a BufferArena.
     """
 
+    def __init__(self, profile=False, callbacks=None, budget=None, detail=False, cache=None,
+                 walker=None, ngrams=None, arena=None):
+        self.callbacks = list(callbacks or [])
+        self.profile = profile or bool(self.callbacks)
+        self.stats = None
+        self.budget = budget
+        self.status = None
+        self.detail = detail
+        self.details = None
+        self.cache = cache
+        self.walker = walker or ArchiveWalker()
+        self.ngrams = ngrams
+        self.ngram_counts = None
+        self.arena = arena
+        self.__budget_tracker = None
+        self.__method_names = []
+
     def get_dexofuzzy(self, param):
         """
         This function generates dexofuzzy from the opcode.
         :return: dexofuzzy
         """
 
+        if self.profile:
+            self.stats = Stats()
+            wall_started = time.perf_counter()
+            cpu_started = time.thread_time()
+
+        self.status = "complete"
+        self.details = None
+        self.ngram_counts = None
+        self.__method_names = []
+        self.__ngram_counts_list = []
+        self.__budget_tracker = self.budget.start() if self.budget is not None else None
+
         try:
-            opcodes_in_methods_list = self.__extract_dex_opcode(param)
-            feature = ""
+            backend = get_backend()
+            dex_names = []
+            method_fuzzy_lists = []
 
-            for opcodes_in_methods in opcodes_in_methods_list:
-                [(_, opcodes_list)] = opcodes_in_methods.items()
+            for dex_name, dex_data in self.__extract_dex_data(param):
+                dex_names.append(dex_name)
+                method_fuzzy_lists.append(self.__get_method_fuzzy_list(backend, dex_data))
 
-                for opcodes in opcodes_list:
-                    feature += ssdeep.hash(opcodes, encoding="UTF-8").split(":")[1]
+            with self.__measure("hash_final"):
+                feature = "".join(
+                    method_fuzzy.split(":")[1]
+                    for method_fuzzy_list in method_fuzzy_lists
+                    for method_fuzzy in method_fuzzy_list
+                )
+                dexofuzzy = backend.hash(feature)
 
-            return ssdeep.hash(feature, encoding="UTF-8")
+            if self.detail:
+                self.details = self.__get_details(backend, dex_names, method_fuzzy_lists)
+
+            if self.ngrams is not None:
+                self.ngram_counts = self.ngrams.merge(self.__ngram_counts_list)
+
+            return dexofuzzy
+
+        except Exception as e:
+            if self.stats is not None:
+                self.stats.error = f"{type(e).__name__}: {e}"
 
-        except Exception:
             GeneratorError("Unable to generate dexofuzzy")
             raise
 
-    def __extract_dex_opcode(self, param):
-        opcodes_in_methods_list = []
+        finally:
+            if self.profile:
+                self.stats.wall_time = time.perf_counter() - wall_started
+                self.stats.cpu_time = time.thread_time() - cpu_started
+
+                for callback in self.callbacks:
+                    callback(self.stats)
+
+    def __measure(self, stage):
+        if self.stats is None:
+            return contextlib.nullcontext()
+
+        return self.stats.measure(stage)
+
+    def __get_details(self, backend, dex_names, method_fuzzy_lists):
+        details = {"dex": [], "strings": [], "methods": {"dex": [], "class": [], "name": [], "fuzzy": []}}
+        string_indices = {}
+        methods = details["methods"]
+
+        def intern(string):
+            if string not in string_indices:
+                string_indices[string] = len(details["strings"])
+                details["strings"].append(string)
+
+            return string_indices[string]
+
+        for dex_idx, (dex_name, method_fuzzy_list, method_names) in enumerate(
+            zip(dex_names, method_fuzzy_lists, self.__method_names)
+        ):
+            dex = {}
+            dex["name"] = dex_name
+            dex["dexofuzzy"] = backend.hash(
+                "".join(method_fuzzy.split(":")[1] for method_fuzzy in method_fuzzy_list)
+            )
+            dex["methods"] = len(method_fuzzy_list)
+            details["dex"].append(dex)
+
+            for method_fuzzy, (class_name, method_name) in zip(method_fuzzy_list, method_names):
+                methods["dex"].append(dex_idx)
+                methods["class"].append(intern(class_name))
+                methods["name"].append(intern(method_name))
+                methods["fuzzy"].append(method_fuzzy)
+
+        return details
 
+    def __get_method_fuzzy_list(self, backend, dex_data):
+        key = None
+
+        if self.cache is not None:
+            key = self.cache.get_key(dex_data)
+            entry = self.cache.get(key, backend.name, self.detail, self.__get_ngrams_key())
+
+            if entry is not None and self.__charge_cached(entry, dex_data):
+                if self.stats is not None:
+                    self.stats.dex_count += 1
+                    self.stats.bytes_read += len(dex_data)
+                    self.stats.method_count += len(entry.method_fuzzy_list)
+                    self.stats.cache_hits += 1
+
+                if self.detail:
+                    self.__method_names.append(entry.method_names)
+
+                if self.ngrams is not None:
+                    self.__ngram_counts_list.append(entry.ngram_counts)
+
+                return entry.method_fuzzy_list
+
+        opcodes_list, status = self.__get_opcodes(dex_data)
+
+        with self.__measure("hash_methods"):
+            method_fuzzy_list = backend.hash_many(opcodes_list)
+
+        if self.ngrams is not None:
+            with self.__measure("count_ngrams"):
+                self.__ngram_counts_list.append(self.ngrams.get_counts(opcodes_list))
+
+        # A partial dex depends on what the budget had left, so it is not cached.
+        if key is not None and status == "complete":
+            self.cache.put(key, DexEntry(
+                backend.name,
+                method_fuzzy_list,
+                sum(len(opcodes) // 2 for opcodes in opcodes_list),
+                self.__method_names[-1] if self.detail else None,
+                self.__get_ngrams_key(),
+                self.__ngram_counts_list[-1] if self.ngrams is not None else None,
+            ))
+
+        return method_fuzzy_list
+
+    def __get_ngrams_key(self):
+        return self.ngrams.key if self.ngrams is not None else None
+
+    def __charge_cached(self, entry, dex_data):
+        if self.__budget_tracker is None:
+            return True
+
+        self.__budget_tracker.check_dex(len(dex_data))
+        return self.__budget_tracker.try_charge(len(entry.method_fuzzy_list), entry.instructions)
+
+    def __get_opcodes(self, dex_data):
+        if self.stats is not None:
+            self.stats.dex_count += 1
+            self.stats.bytes_read += len(dex_data)
+
+        extraction = _extractor.extract(dex_data, self.stats, self.__budget_tracker, track_methods=self.detail)
+
+        if extraction.status == "partial":
+            self.status = "partial"
+
+        if self.detail:
+            self.__method_names.append(extraction.method_names)
+
+        return extraction.opcodes_in_methods, extraction.status
+
+    def __extract_dex_data(self, param):
         try:
             if isinstance(param, bytes):
-                dex_name = "Undefined"
-                extractor = Extractor()
-                opcodes_in_methods = extractor.get_opcodes(param)
-                opcodes_in_methods_list.append({dex_name: opcodes_in_methods})
+                yield "Undefined", param
 
             elif isinstance(param, str):
                 filetype = self.__check_file_type(param)
 
                 if filetype == "application/zip":
-                    for dex_name, dex_data in self.__extract_dex_file(param):
-                        extractor = Extractor()
-                        opcodes_in_methods = extractor.get_opcodes(dex_data)
-                        opcodes_in_methods_list.append({dex_name: opcodes_in_methods})
+                    yield from self.__extract_dex_file(param)
 
                 elif filetype == "application/x-dex":
-                    with open(param, "rb") as dex_file:
-                        dex_data = dex_file.read()
-
-                    dex_name = os.path.basename(param)
-                    extractor = Extractor()
-                    opcodes_in_methods = extractor.get_opcodes(dex_data)
-                    opcodes_in_methods_list.append({dex_name: opcodes_in_methods})
+                    yield from self.__read_dex_file(param)
 
                 else:
                     raise GeneratorError("Unable to find Dex format")
 
-            return opcodes_in_methods_list
+            elif hasattr(param, "read"):
+                # A binary file object, such as an APK received in memory, is read as an archive.
+                yield from self.__extract_dex_file(param)
 
         except Exception:
             GeneratorError("Unable to extract opcode")
@@ -117,21 +297,33 @@ class Generator:
             GeneratorError("Unable to check file type")
             raise
 
+    def __read_dex_file(self, file_path):
+        # An oversized dex is refused before it is read.
+        if self.__budget_tracker is not None:
+            self.__budget_tracker.check_dex(os.path.getsize(file_path))
+
+        if self.arena is None:
+            with open(file_path, "rb") as dex_file:
+                dex_data = dex_file.read()
+
+            yield os.path.basename(file_path), dex_data
+            return
+
+        with self.arena.lend() as buffer, open(file_path, "rb") as dex_file:
+            yield os.path.basename(file_path), buffer.read(dex_file, size_hint=os.fstat(dex_file.fileno()).st_size)
+
     def __extract_dex_file(self, file_path):
         try:
-            dex_list = []
+            dex_files = self.walker.walk(file_path, arena=self.arena, budget=self.__budget_tracker)
 
-            with contextlib.closing(zipfile.ZipFile(file_path)) as zip_file:
-                for info in zip_file.infolist():
-                    if(info.filename.startswith("classes") and info.filename.endswith(".dex")):
-                        dex_list.append(info.filename)
+            while True:
+                with self.__measure("inflate"):
+                    dex_file = next(dex_files, None)
 
-                if not dex_list:
-                    raise GeneratorError("Unable to find 'classes.dex' in the APK file")
+                if dex_file is None:
+                    return
 
-                for dex_name in sorted(dex_list):
-                    with zip_file.open(dex_name) as dex:
-                        yield dex_name, dex.read()
+                yield dex_file
 
         except Exception:
             GeneratorError("Unable to extract dex file")
@@ -0,0 +1,315 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import threading
+import time
+
+# Internal packages
+from dexofuzzy.core.backend import BACKENDS, get_backend, set_backend
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_END = object()
+
+
+def _worker_main(connection, function, backend_name, memory_limit):
+    # Ctrl-C reaches the whole process group, and the parent stops the workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if backend_name in BACKENDS:
+        set_backend(backend_name)
+
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    while True:
+        try:
+            task = connection.recv()
+
+        except EOFError:
+            return
+
+        if task is None:
+            return
+
+        try:
+            connection.send(("ok", function(task)))
+
+        except MemoryError:
+            connection.send(("memory", "MemoryError: exceeded the memory limit"))
+
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class IsolatedPool:
+    """
+    This class runs each task in a worker process that is killed and replaced
+    when the task exceeds its timeout or the worker dies, e.g. when it hits its
+    memory limit. The other tasks are not affected.
+
+    imap_unordered runs a batch of tasks from one thread. run runs a single
+    task and may be called from several threads at once, each waiting for an
+    idle worker; its workers are kept until close.
+    """
+
+    def __init__(self, function, workers=None, timeout=None, memory_limit=None):
+        if workers is not None and workers <= 0:
+            raise IsolationError("workers must be greater than zero")
+
+        self.function = function
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.__backend_name = getattr(get_backend(), "name", None)
+        self.__context = multiprocessing.get_context()
+        self.__condition = threading.Condition()
+        self.__idle = []
+        self.__spawned = 0
+        self.__closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """
+        This function starts the workers of run ahead of the first task.
+        """
+
+        with self.__condition:
+            while self.__spawned < self.workers:
+                self.__idle.append(self.__spawn())
+                self.__spawned += 1
+
+    def run(self, task):
+        """
+        This function runs one task in an idle worker, waiting for one if all of them are busy.
+        :param task: picklable task
+        :return: (status, value, elapsed), as in imap_unordered
+        """
+
+        worker = self.__check_out()
+        started = time.monotonic()
+
+        try:
+            worker["connection"].send(task)
+
+            if not worker["connection"].poll(self.timeout):
+                self.__kill(worker)
+                worker = None
+                return "timeout", f"TimeoutError: exceeded {self.timeout} seconds", time.monotonic() - started
+
+            try:
+                status, value = worker["connection"].recv()
+
+            except (EOFError, OSError):
+                status, value = self.__reap(worker)
+                worker = None
+
+            return status, value, time.monotonic() - started
+
+        except BaseException:
+            if worker is not None:
+                self.__kill(worker)
+                worker = None
+
+            raise
+
+        finally:
+            self.__check_in(worker)
+
+    def close(self):
+        """
+        This function stops the idle workers of run. The busy ones are stopped when their task ends.
+        """
+
+        with self.__condition:
+            self.__closed = True
+            idle, self.__idle = self.__idle, []
+            self.__spawned -= len(idle)
+            self.__condition.notify_all()
+
+        for worker in idle:
+            self.__stop(worker)
+
+    def imap_unordered(self, tasks):
+        """
+        This function runs the tasks and yields their results in completion order.
+        :param tasks: iterable of picklable task
+        :return: generator of (task, status, value, elapsed), where status is
+                 "ok" (value is the result), "error", "timeout", "memory" or
+                 "crashed" (value is the error message)
+        """
+
+        tasks = iter(tasks)
+        idle = []
+        busy = {}
+
+        try:
+            while True:
+                while len(idle) + len(busy) < self.workers:
+                    idle.append(self.__spawn())
+
+                while idle:
+                    task = next(tasks, _END)
+                    if task is _END:
+                        break
+
+                    worker = idle.pop()
+                    worker["connection"].send(task)
+                    busy[worker["connection"]] = (worker, task, time.monotonic())
+
+                if not busy:
+                    return
+
+                ready = multiprocessing.connection.wait(list(busy), self.__next_timeout(busy))
+                now = time.monotonic()
+
+                for connection in ready:
+                    worker, task, started = busy.pop(connection)
+
+                    try:
+                        status, value = connection.recv()
+                        idle.append(worker)
+
+                    except (EOFError, OSError):
+                        status, value = self.__reap(worker)
+
+                    yield task, status, value, now - started
+
+                if self.timeout is None:
+                    continue
+
+                for connection in list(busy):
+                    worker, task, started = busy[connection]
+
+                    if now - started > self.timeout:
+                        busy.pop(connection)
+                        self.__kill(worker)
+                        yield task, "timeout", f"TimeoutError: exceeded {self.timeout} seconds", now - started
+
+        finally:
+            for worker in idle:
+                self.__stop(worker)
+
+            for worker, _, _ in busy.values():
+                self.__kill(worker)
+
+    def __check_out(self):
+        with self.__condition:
+            while True:
+                if self.__closed:
+                    raise IsolationError("IsolatedPool is closed")
+
+                if self.__idle:
+                    return self.__idle.pop()
+
+                if self.__spawned < self.workers:
+                    self.__spawned += 1
+                    break
+
+                self.__condition.wait()
+
+        try:
+            return self.__spawn()
+
+        except BaseException:
+            with self.__condition:
+                self.__spawned -= 1
+                self.__condition.notify()
+
+            raise
+
+    def __check_in(self, worker):
+        # A killed worker frees its place, and the next task starts a new one.
+        with self.__condition:
+            if worker is not None and not self.__closed:
+                self.__idle.append(worker)
+                worker = None
+            else:
+                self.__spawned -= 1
+
+            self.__condition.notify()
+
+        if worker is not None:
+            self.__stop(worker)
+
+    def __spawn(self):
+        parent_connection, child_connection = self.__context.Pipe()
+        process = self.__context.Process(
+            target=_worker_main,
+            args=(child_connection, self.function, self.__backend_name, self.memory_limit),
+            daemon=True,
+        )
+        process.start()
+        child_connection.close()
+
+        return {"process": process, "connection": parent_connection}
+
+    def __next_timeout(self, busy):
+        if self.timeout is None:
+            return None
+
+        oldest = min(started for _, _, started in busy.values())
+        return max(0.0, oldest + self.timeout - time.monotonic())
+
+    def __reap(self, worker):
+        worker["process"].join(1)
+        exitcode = worker["process"].exitcode
+        worker["connection"].close()
+
+        if exitcode is not None and exitcode < 0:
+            return "crashed", f"The worker was killed by signal {-exitcode}"
+
+        return "crashed", f"The worker exited with code {exitcode}"
+
+    def __kill(self, worker):
+        worker["process"].kill()
+        worker["process"].join()
+        worker["connection"].close()
+
+    def __stop(self, worker):
+        try:
+            worker["connection"].send(None)
+
+        except OSError:
+            pass
+
+        worker["process"].join(1)
+
+        if worker["process"].is_alive():
+            worker["process"].kill()
+            worker["process"].join()
+
+        worker["connection"].close()
+
+
+class IsolationError(Exception):
+    """
+    This class handles exceptions that occur in the process of running isolated workers.
+    """
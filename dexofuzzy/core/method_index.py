@@ -0,0 +1,265 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import hashlib
+import json
+import os
+import shutil
+
+# 3rd-party packages
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MethodIndex:
+    """
+    This class indexes samples by the fuzzy hash pieces of their methods, to
+    find the samples that share code with a query even inside a different app.
+
+    On disk, the index is a directory of sorted 64-bit piece keys with their
+    posting lists of sample ids (keys.npy, offsets.npy, postings.npy), which
+    are memory-mapped for lookups, and the sample table (samples.json).
+    A sample is indexed once per sha256, so the index can be rebuilt over the
+    same corpus. The directory is replaced as a whole by save, leaving the
+    previous index in INDEX_DIRECTORY.old until the new one is in place.
+    """
+
+    VERSION = 1
+
+    def __init__(self, min_piece_length=4):
+        if numpy is None:
+            raise MethodIndexError("The method index requires the numpy package")
+
+        self.min_piece_length = min_piece_length
+        self.samples = []
+        self.keys = numpy.zeros(0, dtype=numpy.uint64)
+        self.offsets = numpy.zeros(1, dtype=numpy.uint64)
+        self.postings = numpy.zeros(0, dtype=numpy.uint32)
+        self.__pending_keys = []
+        self.__pending_ids = []
+        self.__sample_ids = {}
+
+    @staticmethod
+    def exists(directory):
+        """
+        This function checks whether an index was saved in a directory.
+        :param directory: string
+        :return: bool
+        """
+
+        return any(
+            os.path.exists(os.path.join(path, "samples.json")) for path in (directory, f"{directory}.old")
+        )
+
+    def get_keys(self, method_fuzzy_list):
+        """
+        This function turns method fuzzy hashes into the sorted unique keys of their pieces.
+        Pieces shorter than min_piece_length, e.g. of trivial getters, are ignored.
+        :param method_fuzzy_list: list of method fuzzy hash
+        :return: numpy array of uint64
+        """
+
+        pieces = {
+            method_fuzzy.split(":")[1] for method_fuzzy in method_fuzzy_list
+        }
+        keys = [
+            int.from_bytes(hashlib.blake2b(piece.encode("UTF-8"), digest_size=8).digest(), "little")
+            for piece in pieces
+            if len(piece) >= self.min_piece_length
+        ]
+
+        return numpy.unique(numpy.array(keys, dtype=numpy.uint64))
+
+    def add(self, name, method_fuzzy_list, sha256=None):
+        """
+        This function adds a sample to the index. It is searchable after save.
+        A sample whose sha256 is already indexed is not added again.
+        :param name: string
+        :param method_fuzzy_list: list of method fuzzy hash
+        :param sha256: string
+        :return: the sample id
+        """
+
+        if sha256 is not None and sha256 in self.__sample_ids:
+            return self.__sample_ids[sha256]
+
+        keys = self.get_keys(method_fuzzy_list)
+        sample_id = len(self.samples)
+
+        sample = {}
+        sample["name"] = name
+        sample["sha256"] = sha256
+        sample["keys"] = int(len(keys))
+        self.samples.append(sample)
+
+        if sha256 is not None:
+            self.__sample_ids[sha256] = sample_id
+
+        self.__pending_keys.append(keys)
+        self.__pending_ids.append(numpy.full(len(keys), sample_id, dtype=numpy.uint32))
+
+        return sample_id
+
+    def save(self, directory):
+        """
+        This function merges the added samples into the index and writes it.
+        :param directory: string
+        """
+
+        counts = numpy.diff(self.offsets.astype(numpy.int64))
+        keys = numpy.concatenate([numpy.repeat(self.keys, counts)] + self.__pending_keys)
+        ids = numpy.concatenate([numpy.asarray(self.postings)] + self.__pending_ids)
+
+        order = numpy.lexsort((ids, keys))
+        keys = keys[order]
+        self.postings = ids[order]
+        self.keys, starts = numpy.unique(keys, return_index=True)
+        self.offsets = numpy.append(starts, len(keys)).astype(numpy.uint64)
+        self.__pending_keys = []
+        self.__pending_ids = []
+
+        meta = {}
+        meta["version"] = self.VERSION
+        meta["min_piece_length"] = self.min_piece_length
+        meta["samples"] = self.samples
+
+        directory = os.path.normpath(directory)
+        old_directory = f"{directory}.old"
+        temp_directory = f"{directory}.{os.getpid()}.tmp"
+
+        try:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            os.makedirs(temp_directory)
+
+            numpy.save(os.path.join(temp_directory, "keys.npy"), self.keys)
+            numpy.save(os.path.join(temp_directory, "offsets.npy"), self.offsets)
+            numpy.save(os.path.join(temp_directory, "postings.npy"), self.postings)
+
+            with open(os.path.join(temp_directory, "samples.json"), "w", encoding="UTF-8") as samples_file:
+                json.dump(meta, samples_file)
+
+            # A crash between the two renames leaves the previous index in old_directory, where load finds it.
+            if os.path.exists(directory):
+                shutil.rmtree(old_directory, ignore_errors=True)
+                os.rename(directory, old_directory)
+
+            os.rename(temp_directory, directory)
+            shutil.rmtree(old_directory, ignore_errors=True)
+
+        except OSError:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+
+            MethodIndexError("Unable to save the method index")
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        This function opens an index written by save.
+        :param directory: string
+        :param mmap: memory-map the arrays instead of reading them
+        :return: MethodIndex
+        """
+
+        directory = os.path.normpath(directory)
+
+        if not os.path.exists(os.path.join(directory, "samples.json")) and os.path.exists(f"{directory}.old"):
+            directory = f"{directory}.old"
+
+        try:
+            with open(os.path.join(directory, "samples.json"), encoding="UTF-8") as samples_file:
+                meta = json.load(samples_file)
+
+            if meta["version"] != cls.VERSION:
+                raise MethodIndexError(f"Unsupported method index version {meta['version']}")
+
+            index = cls(meta["min_piece_length"])
+            index.samples = meta["samples"]
+
+            for sample_id, sample in enumerate(index.samples):
+                if sample["sha256"] is not None:
+                    index.__sample_ids.setdefault(sample["sha256"], sample_id)
+
+            mmap_mode = "r" if mmap else None
+            index.keys = numpy.load(os.path.join(directory, "keys.npy"), mmap_mode=mmap_mode)
+            index.offsets = numpy.load(os.path.join(directory, "offsets.npy"), mmap_mode=mmap_mode)
+            index.postings = numpy.load(os.path.join(directory, "postings.npy"), mmap_mode=mmap_mode)
+
+            return index
+
+        except (OSError, ValueError, KeyError):
+            MethodIndexError("Unable to load the method index")
+            raise
+
+    def query(self, method_fuzzy_list, top=10, max_df=None):
+        """
+        This function ranks the indexed samples by the method pieces they share with the query.
+        :param method_fuzzy_list: list of method fuzzy hash of the query
+        :param top: the number of samples to return
+        :param max_df: ignore the pieces shared by more samples than this, e.g. library code
+        :return: list of dict with name, sha256, shared, containment and jaccard
+        """
+
+        query_keys = self.get_keys(method_fuzzy_list)
+        if not len(query_keys) or not len(self.keys):
+            return []
+
+        positions = numpy.searchsorted(self.keys, query_keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == query_keys[found]
+        positions = positions[found]
+
+        starts = self.offsets[positions].astype(numpy.int64)
+        ends = self.offsets[positions + 1].astype(numpy.int64)
+
+        if max_df is not None:
+            common = (ends - starts) <= max_df
+            starts, ends = starts[common], ends[common]
+
+        if not len(starts):
+            return []
+
+        lengths = ends - starts
+        indices = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths) + numpy.arange(lengths.sum())
+        shared = numpy.bincount(self.postings[indices], minlength=len(self.samples))
+
+        candidates = numpy.flatnonzero(shared)
+        ranked = candidates[numpy.argsort(-shared[candidates], kind="stable")][:top]
+
+        results = []
+        for sample_id in ranked.tolist():
+            sample = self.samples[sample_id]
+            count = int(shared[sample_id])
+
+            result = {}
+            result["name"] = sample["name"]
+            result["sha256"] = sample["sha256"]
+            result["shared"] = count
+            result["containment"] = count / len(query_keys)
+            result["jaccard"] = count / (len(query_keys) + sample["keys"] - count)
+            results.append(result)
+
+        return results
+
+
+class MethodIndexError(Exception):
+    """
+    This class handles exceptions that occur in the process of the method index.
+    """
@@ -0,0 +1,223 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import zlib
+
+# 3rd-party packages
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MinHashLSH:
+    """
+    This class clusters dexofuzzy by the approximate Jaccard index of its n-grams.
+    """
+
+    MERSENNE_PRIME = (1 << 61) - 1
+    MAX_HASH = (1 << 32) - 1
+
+    def __init__(self, n_gram, threshold, bands=32, rows=4, batch_size=256, seed=1):
+        if numpy is None:
+            raise MinHashError("MinHash clustering requires the numpy package: pip install dexofuzzy[numpy]")
+
+        if n_gram <= 0:
+            raise MinHashError("n_gram must be greater than zero")
+
+        if not 0.0 < threshold <= 1.0:
+            raise MinHashError("threshold must be in the range (0, 1]")
+
+        if bands <= 0 or rows <= 0:
+            raise MinHashError("bands and rows must be greater than zero")
+
+        self.n_gram = n_gram
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.batch_size = batch_size
+        self.candidate_count = 0
+
+        generator = numpy.random.RandomState(seed)
+        num_perm = bands * rows
+        self.perm_a = generator.randint(1, self.MAX_HASH, size=num_perm, dtype=numpy.uint64)
+        self.perm_b = generator.randint(0, self.MAX_HASH, size=num_perm, dtype=numpy.uint64)
+
+    def get_n_gram(self, dexofuzzy):
+        """
+        This function tokenizes the dexofuzzy the same way as M-Partial Matching.
+        :param dexofuzzy: string
+        :return: set of n-gram
+        """
+
+        signature = dexofuzzy.split(":")[1]
+        return {
+            signature[i : i + self.n_gram]
+            for i in range(len(signature) - self.n_gram + 1)
+        }
+
+    def get_signatures(self, n_gram_list):
+        """
+        This function computes the MinHash sketch of each n-gram set in batches.
+        :param n_gram_list: list of n-gram set
+        :return: numpy array of shape (len(n_gram_list), bands * rows)
+        """
+
+        num_perm = self.bands * self.rows
+        signatures = numpy.full((len(n_gram_list), num_perm), self.MAX_HASH, dtype=numpy.uint64)
+
+        for start in range(0, len(n_gram_list), self.batch_size):
+            batch = n_gram_list[start : start + self.batch_size]
+            sizes = numpy.fromiter((len(n_grams) for n_grams in batch), dtype=numpy.int64)
+
+            if not sizes.sum():
+                continue
+
+            values = numpy.fromiter(
+                (zlib.crc32(n_gram.encode("UTF-8")) for n_grams in batch for n_gram in n_grams),
+                dtype=numpy.uint64,
+                count=int(sizes.sum()),
+            )
+            hashes = (values[:, None] * self.perm_a + self.perm_b) % self.MERSENNE_PRIME
+            hashes &= self.MAX_HASH
+
+            non_empty = numpy.flatnonzero(sizes)
+            offsets = numpy.concatenate(([0], numpy.cumsum(sizes)[:-1]))[non_empty]
+            signatures[start + non_empty] = numpy.minimum.reduceat(hashes, offsets, axis=0)
+
+        return signatures
+
+    def get_candidates(self, signatures, n_gram_list):
+        """
+        This function buckets the MinHash sketches by band and collects colliding pairs.
+        :param signatures: numpy array
+        :param n_gram_list: list of n-gram set
+        :return: set of (i, j) with i < j
+        """
+
+        candidates = set()
+
+        for band in range(self.bands):
+            buckets = {}
+            band_signatures = signatures[:, band * self.rows : (band + 1) * self.rows]
+
+            for idx, band_signature in enumerate(band_signatures):
+                if n_gram_list[idx]:
+                    buckets.setdefault(band_signature.tobytes(), []).append(idx)
+
+            for members in buckets.values():
+                for i, src in enumerate(members):
+                    for dst in members[i + 1 :]:
+                        candidates.add((src, dst))
+
+        return candidates
+
+    def get_jaccard(self, src_n_gram, dst_n_gram):
+        """
+        This function computes the exact Jaccard index of two n-gram sets.
+        :return: A value from 0.0 to 1.0
+        """
+
+        if not src_n_gram or not dst_n_gram:
+            return 0.0
+
+        intersection = len(src_n_gram & dst_n_gram)
+        return intersection / (len(src_n_gram) + len(dst_n_gram) - intersection)
+
+    def get_pairs(self, dexofuzzy_list):
+        """
+        This function finds the pairs whose Jaccard index reaches the threshold,
+        verifying only the pairs that collide in at least one LSH band.
+        :param dexofuzzy_list: list of dexofuzzy
+        :return: dict of {(i, j): jaccard} with i < j
+        """
+
+        n_gram_list = [self.get_n_gram(dexofuzzy) for dexofuzzy in dexofuzzy_list]
+        signatures = self.get_signatures(n_gram_list)
+        self.candidate_count = 0
+        pairs = {}
+
+        for src, dst in self.get_candidates(signatures, n_gram_list):
+            self.candidate_count += 1
+            jaccard = self.get_jaccard(n_gram_list[src], n_gram_list[dst])
+
+            if jaccard >= self.threshold:
+                pairs[(src, dst)] = jaccard
+
+        return pairs
+
+    def get_exact_pairs(self, dexofuzzy_list):
+        """
+        This function finds the pairs whose Jaccard index reaches the threshold
+        by comparing every pair.
+        :param dexofuzzy_list: list of dexofuzzy
+        :return: dict of {(i, j): jaccard} with i < j
+        """
+
+        n_gram_list = [self.get_n_gram(dexofuzzy) for dexofuzzy in dexofuzzy_list]
+        pairs = {}
+
+        for src in range(len(n_gram_list)):
+            for dst in range(src + 1, len(n_gram_list)):
+                jaccard = self.get_jaccard(n_gram_list[src], n_gram_list[dst])
+
+                if jaccard >= self.threshold:
+                    pairs[(src, dst)] = jaccard
+
+        return pairs
+
+    def evaluate(self, dexofuzzy_list, pairs=None):
+        """
+        This function reports the recall of the approximate pairs against the
+        exact pairs of the same corpus. The approximate pairs are verified, so
+        they are all exact pairs; the share of the LSH candidates that passed
+        the verification is reported as candidate_precision.
+        :param dexofuzzy_list: list of dexofuzzy
+        :param pairs: the result of get_pairs, computed if omitted
+        :return: dict
+        """
+
+        if pairs is None:
+            pairs = self.get_pairs(dexofuzzy_list)
+
+        approximate = set(pairs)
+        exact = set(self.get_exact_pairs(dexofuzzy_list))
+        matched = len(approximate & exact)
+        total = len(dexofuzzy_list)
+
+        report = {}
+        report["samples"] = total
+        report["bands"] = self.bands
+        report["rows"] = self.rows
+        report["threshold"] = self.threshold
+        report["exact_pairs"] = len(exact)
+        report["approximate_pairs"] = len(approximate)
+        report["exact_comparisons"] = total * (total - 1) // 2
+        report["approximate_comparisons"] = self.candidate_count
+        report["recall"] = matched / len(exact) if exact else 1.0
+        report["candidate_precision"] = (
+            len(approximate) / self.candidate_count if self.candidate_count else 1.0
+        )
+
+        return report
+
+
+class MinHashError(Exception):
+    """
+    This class handles exceptions that occur in the process of MinHash clustering.
+    """
@@ -0,0 +1,225 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import os
+
+# 3rd-party packages
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class OpcodeNgrams:
+    """
+    This class counts the opcode n-grams of a sample, hashed into a fixed
+    number of dimensions, from the opcodes extracted for its dexofuzzy.
+
+    An n-gram never spans two methods. Each n-gram is packed with its length
+    into 64 bits and hashed multiplicatively, so the feature index of an
+    n-gram is the same for every sample and every run.
+    """
+
+    MULTIPLIER = 0x9E3779B97F4A7C15
+
+    def __init__(self, sizes=(1, 2, 3), dimension=1 << 20):
+        if numpy is None:
+            raise NgramError("Opcode n-gram counts require the numpy package")
+
+        if not sizes or any(not 1 <= size <= 7 for size in sizes):
+            raise NgramError("n-gram sizes must be in the range [1, 7]")
+
+        if dimension < 2 or dimension & (dimension - 1):
+            raise NgramError("dimension must be a power of two")
+
+        self.sizes = tuple(sorted(set(sizes)))
+        self.dimension = dimension
+        self.key = (self.sizes, self.dimension)
+        self.__shift = numpy.uint64(64 - (dimension.bit_length() - 1))
+
+    def get_counts(self, opcodes_list):
+        """
+        This function counts the hashed n-grams of the methods of a dex.
+        :param opcodes_list: list of the opcodes of each method, as hex strings
+        :return: (sorted feature indices, counts), both int32 arrays
+        """
+
+        lengths = numpy.fromiter((len(opcodes) // 2 for opcodes in opcodes_list), dtype=numpy.int64)
+        opcodes = numpy.frombuffer(bytes.fromhex("".join(opcodes_list)), dtype=numpy.uint8).astype(numpy.uint64)
+        method_ids = numpy.repeat(numpy.arange(len(lengths)), lengths)
+        codes = []
+
+        for size in self.sizes:
+            count = len(opcodes) - size + 1
+
+            if count <= 0:
+                continue
+
+            code = numpy.full(count, size << 56, dtype=numpy.uint64)
+
+            for offset in range(size):
+                code |= opcodes[offset : offset + count] << numpy.uint64(8 * offset)
+
+            codes.append(code[method_ids[:count] == method_ids[size - 1 :]])
+
+        if not codes:
+            return numpy.empty(0, dtype=numpy.int32), numpy.empty(0, dtype=numpy.int32)
+
+        hashed = (numpy.concatenate(codes) * numpy.uint64(self.MULTIPLIER)) >> self.__shift
+        indices, counts = numpy.unique(hashed, return_counts=True)
+
+        return indices.astype(numpy.int32), counts.astype(numpy.int32)
+
+    def merge(self, counts_list):
+        """
+        This function adds up the counts of the dex files of a sample.
+        :param counts_list: list of (feature indices, counts)
+        :return: (sorted feature indices, counts)
+        """
+
+        if not counts_list:
+            return numpy.empty(0, dtype=numpy.int32), numpy.empty(0, dtype=numpy.int32)
+
+        if len(counts_list) == 1:
+            return counts_list[0]
+
+        indices, inverse = numpy.unique(
+            numpy.concatenate([indices for indices, _ in counts_list]), return_inverse=True
+        )
+        counts = numpy.bincount(
+            inverse, weights=numpy.concatenate([counts for _, counts in counts_list]), minlength=len(indices)
+        )
+
+        return indices, counts.astype(numpy.int32)
+
+
+class NgramMatrix:
+    """
+    This class accumulates the n-gram counts of many samples, row by row, into
+    a CSR matrix saved as .npz. The data, indices, indptr, format and shape keys
+    follow scipy.sparse.save_npz, so scipy.sparse.load_npz reads the file as is;
+    the names and sha256 keys label the rows. A sample is added once per sha256.
+    """
+
+    def __init__(self, ngrams):
+        self.ngrams = ngrams
+        self.names = []
+        self.sha256 = []
+        self.__indices = []
+        self.__data = []
+        self.__indptr = [0]
+        self.__known = set()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, sha256, counts):
+        """
+        This function appends the row of a sample.
+        :param name: string
+        :param sha256: string
+        :param counts: the result of OpcodeNgrams.merge
+        """
+
+        if sha256 and sha256 in self.__known:
+            return
+
+        if sha256:
+            self.__known.add(sha256)
+
+        indices, data = counts
+        self.names.append(name)
+        self.sha256.append(sha256 or "")
+        self.__indices.append(numpy.asarray(indices, dtype=numpy.int32))
+        self.__data.append(numpy.asarray(data, dtype=numpy.int32))
+        self.__indptr.append(self.__indptr[-1] + len(indices))
+
+    @classmethod
+    def load(cls, file_path, ngrams):
+        """
+        This function reads a matrix written by save, to add rows to it.
+        :param file_path: string, to which .npz is appended if missing
+        :param ngrams: OpcodeNgrams with the n-gram sizes and dimension of the matrix
+        :return: NgramMatrix
+        """
+
+        if not file_path.endswith(".npz"):
+            file_path = f"{file_path}.npz"
+
+        try:
+            with numpy.load(file_path) as npz:
+                if tuple(npz["sizes"].tolist()) != ngrams.sizes or int(npz["shape"][1]) != ngrams.dimension:
+                    raise NgramError(
+                        f"{file_path} holds n-grams of sizes {npz['sizes'].tolist()} "
+                        + f"in {int(npz['shape'][1])} columns"
+                    )
+
+                matrix = cls(ngrams)
+                matrix.names = npz["names"].tolist()
+                matrix.sha256 = npz["sha256"].tolist()
+                matrix.__indices = [npz["indices"].astype(numpy.int32)]
+                matrix.__data = [npz["data"].astype(numpy.int32)]
+                matrix.__indptr = npz["indptr"].tolist()
+                matrix.__known = {sha256 for sha256 in matrix.sha256 if sha256}
+
+            return matrix
+
+        except (OSError, ValueError, KeyError):
+            NgramError("Unable to load the n-gram matrix")
+            raise
+
+    def save(self, file_path):
+        """
+        This function writes the matrix to a temporary file renamed over
+        file_path, so a reader never sees a partly written matrix.
+        :param file_path: string, to which .npz is appended if missing
+        """
+
+        if not file_path.endswith(".npz"):
+            file_path = f"{file_path}.npz"
+
+        temp_path = f"{file_path}.{os.getpid()}.tmp.npz"
+
+        try:
+            numpy.savez_compressed(
+                temp_path,
+                data=numpy.concatenate(self.__data) if self.__data else numpy.empty(0, dtype=numpy.int32),
+                indices=(
+                    numpy.concatenate(self.__indices) if self.__indices else numpy.empty(0, dtype=numpy.int32)
+                ),
+                indptr=numpy.asarray(self.__indptr, dtype=numpy.int64),
+                format=numpy.array(b"csr"),
+                shape=numpy.array([len(self), self.ngrams.dimension]),
+                names=numpy.array(self.names, dtype=str),
+                sha256=numpy.array(self.sha256, dtype=str),
+                sizes=numpy.array(self.ngrams.sizes),
+            )
+            os.replace(temp_path, file_path)
+
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            NgramError("Unable to save the n-gram matrix")
+            raise
+
+
+class NgramError(Exception):
+    """
+    This class handles exceptions that occur in the process of counting opcode n-grams.
+    """
@@ -0,0 +1,174 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import collections
+import json
+
+
+class PartialMatching:
+    """
+    This class clusters dexofuzzy by N-Gram Tokenizer and M-Partial Matching:
+    two samples are linked when at least M n-gram positions of one are
+    n-grams of the other.
+
+    The n-grams of every signature are counted in one pass, which gives the
+    number of samples containing each n-gram. The n-grams of the stop list,
+    and those found in more than `max_df` of the samples, such as the ones
+    left by common library code, are then dropped. Only the pairs sharing a
+    remaining n-gram are compared, through an inverted index from each n-gram
+    to the samples containing it, so a few ubiquitous n-grams no longer make
+    every pair a candidate. Without a stop list or `max_df`, the clusters are
+    the same as comparing every pair.
+    """
+
+    VERSION = 1
+
+    def __init__(self, n_gram, m_partial_matching, max_df=None, stop_list=None):
+        if n_gram <= 0:
+            raise PartialMatchingError("n_gram must be greater than zero")
+
+        if max_df is not None and not 0.0 < max_df <= 1.0:
+            raise PartialMatchingError("max_df must be in the range (0, 1]")
+
+        self.n_gram = n_gram
+        self.m_partial_matching = m_partial_matching
+        self.max_df = max_df
+        self.stop_list = set(stop_list or ())
+        self.document_count = 0
+        self.document_frequency = collections.Counter()
+        self.candidate_count = 0
+
+    @staticmethod
+    def load_stop_list(file_path):
+        """
+        This function reads a stop list, either one n-gram per line or the
+        stop list of a file written by save_frequencies.
+        :param file_path: string
+        :return: list of n-gram
+        """
+
+        with open(file_path, encoding="UTF-8") as stop_list_file:
+            text = stop_list_file.read()
+
+        # The base64 alphabet of a signature has no "{", so a JSON object is unambiguous.
+        if text.lstrip().startswith("{"):
+            return json.loads(text)["stop_list"]
+
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    def get_n_gram(self, signature):
+        """
+        This function tokenizes a signature.
+        :param signature: the part of a dexofuzzy after the block size
+        :return: list of n-gram, one per position
+        """
+
+        return [signature[i : i + self.n_gram] for i in range(len(signature) - self.n_gram + 1)]
+
+    def get_stopped(self):
+        """
+        This function lists the n-grams dropped before the pairs are compared.
+        :return: set of n-gram
+        """
+
+        stopped = {n_gram for n_gram in self.stop_list if n_gram in self.document_frequency}
+
+        if self.max_df is not None:
+            cutoff = self.max_df * self.document_count
+            stopped.update(n_gram for n_gram, df in self.document_frequency.items() if df > cutoff)
+
+        return stopped
+
+    def get_clustering(self, signatures):
+        """
+        This function links the signatures sharing at least M n-gram positions.
+        :param signatures: list of the parts of the dexofuzzy after the block size
+        :return: for each signature, the list of (neighbor index, "signature", the first M shared n-grams)
+        """
+
+        n_gram_list = []
+        self.document_count = len(signatures)
+        self.document_frequency = collections.Counter()
+
+        for signature in signatures:
+            counts = collections.Counter(self.get_n_gram(signature))
+            n_gram_list.append(counts)
+            self.document_frequency.update(counts.keys())
+
+        stopped = self.get_stopped()
+        postings = collections.defaultdict(list)
+
+        for idx, counts in enumerate(n_gram_list):
+            for n_gram, count in counts.items():
+                if n_gram not in stopped:
+                    postings[n_gram].append((idx, count))
+
+        clustering_list = []
+        self.candidate_count = 0
+
+        for src, src_counts in enumerate(n_gram_list):
+            # The number of positions of each candidate holding an n-gram of src.
+            partial_matching = collections.Counter()
+
+            for n_gram in src_counts:
+                for dst, count in postings.get(n_gram, ()):
+                    partial_matching[dst] += count
+
+            self.candidate_count += len(partial_matching)
+            clustering = []
+
+            for dst in sorted(partial_matching):
+                if self.m_partial_matching > 0 and partial_matching[dst] >= self.m_partial_matching:
+                    signature = [
+                        n_gram for n_gram in self.get_n_gram(signatures[dst])
+                        if n_gram in src_counts and n_gram not in stopped
+                    ]
+                    clustering.append((dst, "signature", signature[:self.m_partial_matching]))
+
+            clustering_list.append(clustering)
+
+        return clustering_list
+
+    def save_frequencies(self, file_path):
+        """
+        This function writes the document frequency of each n-gram and the stop list applied.
+        :param file_path: string
+        """
+
+        meta = {}
+        meta["version"] = self.VERSION
+        meta["n_gram"] = self.n_gram
+        meta["documents"] = self.document_count
+        meta["max_df"] = self.max_df
+        meta["candidate_pairs"] = self.candidate_count
+        meta["stop_list"] = sorted(self.get_stopped())
+        meta["document_frequency"] = dict(self.document_frequency.most_common())
+
+        try:
+            with open(file_path, "w", encoding="UTF-8") as frequency_file:
+                json.dump(meta, frequency_file, indent=4)
+
+        except OSError:
+            PartialMatchingError("Unable to save the n-gram document frequencies")
+            raise
+
+
+class PartialMatchingError(Exception):
+    """
+    This class handles exceptions that occur in the process of M-Partial Matching clustering.
+    """
@@ -0,0 +1,188 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import hashlib
+import multiprocessing
+import multiprocessing.pool
+import os
+import threading
+
+# Internal packages
+from dexofuzzy.core.arena import BufferArena
+from dexofuzzy.core.backend import BACKENDS, get_backend, set_backend
+from dexofuzzy.core.generator import Generator
+from dexofuzzy.core.record import Record
+
+_local = threading.local()
+
+
+def _init_worker(backend_name):
+    if backend_name in BACKENDS:
+        set_backend(backend_name)
+
+
+def _get_generator():
+    # A generator keeps the results of its last sample, so each worker thread has its own,
+    # along with the arena its dex files are inflated into.
+    if getattr(_local, "generator", None) is None:
+        _local.generator = Generator(arena=BufferArena())
+
+    return _local.generator
+
+
+def _get_record(item, dexofuzzy, arena):
+    # The sha256 and size are computed in the worker as well, so they do not serialize the batch.
+    if isinstance(item, bytes):
+        return Record(None, hashlib.sha256(item).digest(), len(item), dexofuzzy)
+
+    return Record(item, arena.get_digest(item), os.path.getsize(item), dexofuzzy)
+
+
+def _hash_item(task):
+    index, item, error, with_record = task
+
+    if error is not None:
+        return index, None, error, None
+
+    try:
+        generator = _get_generator()
+        dexofuzzy = generator.get_dexofuzzy(item)
+        record = _get_record(item, dexofuzzy, generator.arena) if with_record else None
+        return index, dexofuzzy, None, record
+
+    except Exception as e:
+        return index, None, f"{type(e).__name__}: {e}", None
+
+
+class Pool:
+    """
+    This class computes dexofuzzy of many samples with a pool of warm worker processes.
+
+    With threads=True, the workers are threads of this process instead. The
+    samples are then not pickled, so in-memory dex data is not copied, but
+    the threads only run in parallel on a free-threaded build of Python or
+    while the hash backend releases the GIL.
+    """
+
+    def __init__(self, workers=None, threads=False):
+        if workers is not None and workers <= 0:
+            raise PoolError("workers must be greater than zero")
+
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+
+        if threads:
+            # The backend is shared by the threads, so it is loaded once, before they start.
+            get_backend()
+            self.__pool = multiprocessing.pool.ThreadPool(self.workers)
+        else:
+            backend_name = getattr(get_backend(), "name", None)
+            self.__pool = multiprocessing.Pool(
+                self.workers, initializer=_init_worker, initargs=(backend_name,)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        This function stops the worker processes.
+        """
+
+        if self.__pool is not None:
+            self.__pool.terminate()
+            self.__pool.join()
+            self.__pool = None
+
+    def hash(self, sample):
+        """
+        This function computes the dexofuzzy of one sample in a worker.
+        It may be called from several threads at once.
+        :param sample: dex binary data (bytes) or file path (string)
+        :return: The dexofuzzy of the sample
+        """
+
+        if self.__pool is None:
+            raise PoolError("Pool is closed")
+
+        _, dexofuzzy, error, _ = self.__pool.apply(_hash_item, ((0, self.__check_sample(sample), None, False),))
+
+        if error is not None:
+            raise PoolError(error)
+
+        return dexofuzzy
+
+    def hash_many(self, samples, ordered=True, chunksize=1, table=None):
+        """
+        This function computes the dexofuzzy of each sample. An error in one
+        sample is reported in its result and does not abort the batch.
+
+        With a RecordTable, the workers also compute the sha256 and size of
+        each sample, and the sample is appended to the table as a Record, named
+        after its file path or None for dex binary data. The result then holds
+        the index of the record in the table, or None on error.
+        :param samples: iterable of dex binary data (bytes) or file path (string)
+        :param ordered: yield in input order if True, otherwise in completion order
+        :param chunksize: the number of samples sent to a worker at once
+        :param table: RecordTable to append the records to
+        :return: generator of dict with index, dexofuzzy, error and, with a table, record
+        """
+
+        if self.__pool is None:
+            raise PoolError("Pool is closed")
+
+        with_record = table is not None
+        tasks = (self.__get_task(index, sample, with_record) for index, sample in enumerate(samples))
+
+        if ordered:
+            results = self.__pool.imap(_hash_item, tasks, chunksize)
+        else:
+            results = self.__pool.imap_unordered(_hash_item, tasks, chunksize)
+
+        for index, dexofuzzy, error, record in results:
+            result = {}
+            result["index"] = index
+            result["dexofuzzy"] = dexofuzzy
+            result["error"] = error
+
+            if with_record:
+                result["record"] = table.append(record) if record is not None else None
+
+            yield result
+
+    def __check_sample(self, sample):
+        if not isinstance(sample, (bytes, str)):
+            raise TypeError("must be of bytes or string type")
+
+        return sample
+
+    def __get_task(self, index, sample, with_record):
+        # A sample of another type goes through the workers as its error, so it keeps its place in the batch.
+        if not isinstance(sample, (bytes, str)):
+            return index, None, "TypeError: must be of bytes or string type", False
+
+        return index, sample, None, with_record
+
+
+class PoolError(Exception):
+    """
+    This class handles exceptions that occur in the process of the worker pool.
+    """
@@ -0,0 +1,238 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import array
+import os
+import sys
+
+
+STATUSES = (None, "complete", "partial")
+
+
+class Record:
+    """
+    This class holds the result of a sample with a binary sha256 and an integer size.
+    `ngram_counts` carries the opcode n-gram counts to the CLI and is not part of the report.
+    """
+
+    __slots__ = ("name", "digest", "size", "dexofuzzy", "status", "details", "ngram_counts")
+
+    def __init__(self, name, sha256, size, dexofuzzy, status=None, details=None):
+        self.name = name
+        self.digest = bytes.fromhex(sha256) if isinstance(sha256, str) else sha256
+        self.size = int(size) if size is not None else None
+        self.dexofuzzy = dexofuzzy
+        self.status = status
+        self.details = details
+        self.ngram_counts = None
+
+    @property
+    def sha256(self):
+        return self.digest.hex() if self.digest is not None else None
+
+    @classmethod
+    def from_dict(cls, report):
+        """
+        This function builds a record from a report dict.
+        :param report: dict with name, sha256, size, dexofuzzy and optionally status and details
+        :return: Record
+        """
+
+        return cls(
+            report.get("name"), report.get("sha256"), report.get("size"), report.get("dexofuzzy"),
+            report.get("status"), report.get("details"),
+        )
+
+    def to_dict(self):
+        """
+        This function converts the record to the report dict written by the CLI.
+        :return: dict
+        """
+
+        report = {}
+        report["name"] = self.name
+        report["sha256"] = self.sha256
+        report["size"] = str(self.size) if self.size is not None else None
+        report["dexofuzzy"] = self.dexofuzzy
+
+        if self.status is not None:
+            report["status"] = self.status
+
+        if self.details is not None:
+            report["details"] = self.details
+
+        return report
+
+    def __repr__(self):
+        return (
+            f"Record(name={self.name!r}, sha256={self.sha256!r}, "
+            f"size={self.size!r}, dexofuzzy={self.dexofuzzy!r})"
+        )
+
+
+class RecordTable:
+    """
+    This class accumulates records into columns: the directories and dexofuzzy are interned,
+    the sha256 are packed into a single bytearray and the sizes into an integer array.
+    """
+
+    def __init__(self):
+        self.__directories = []
+        self.__directory_index = {}
+        self.__directory_ids = array.array("I")
+        self.__basenames = []
+        self.__digests = bytearray()
+        self.__sizes = array.array("q")
+        self.__dexofuzzy = []
+        self.__statuses = array.array("B")
+        self.__missing_digests = set()
+        self.__details = {}
+
+    def __len__(self):
+        return len(self.__basenames)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+
+        if not 0 <= idx < len(self):
+            raise IndexError("record index out of range")
+
+        return Record(
+            self.get_name(idx),
+            bytes(self.__digests[idx * 32 : idx * 32 + 32]) if idx not in self.__missing_digests else None,
+            self.get_size(idx),
+            self.__dexofuzzy[idx],
+            STATUSES[self.__statuses[idx]],
+            self.__details.get(idx),
+        )
+
+    def append(self, record):
+        """
+        This function appends a record, or a report dict, to the columns.
+        :param record: Record or dict
+        :return: the index of the record
+        """
+
+        if isinstance(record, dict):
+            record = Record.from_dict(record)
+
+        if record.status not in STATUSES:
+            raise RecordError(f"Unknown status: {record.status}")
+
+        idx = len(self)
+        directory, basename = "", record.name
+
+        if record.name is not None:
+            separator = record.name.rfind(os.sep) + 1
+            directory, basename = record.name[:separator], record.name[separator:]
+
+        if directory not in self.__directory_index:
+            self.__directory_index[directory] = len(self.__directories)
+            self.__directories.append(sys.intern(directory))
+
+        self.__directory_ids.append(self.__directory_index[directory])
+        self.__basenames.append(basename)
+
+        if record.digest is not None:
+            self.__digests += record.digest
+        else:
+            self.__digests += bytes(32)
+            self.__missing_digests.add(idx)
+
+        # A negative size marks a record whose size could not be read.
+        self.__sizes.append(record.size if record.size is not None else -1)
+        self.__dexofuzzy.append(sys.intern(record.dexofuzzy) if record.dexofuzzy is not None else None)
+        self.__statuses.append(STATUSES.index(record.status))
+
+        if record.details is not None:
+            self.__details[idx] = record.details
+
+        return idx
+
+    def extend(self, records):
+        """
+        This function appends many records to the columns.
+        :param records: iterable of Record or dict
+        """
+
+        for record in records:
+            self.append(record)
+
+    def get_name(self, idx):
+        basename = self.__basenames[idx]
+
+        if basename is None:
+            return None
+
+        return self.__directories[self.__directory_ids[idx]] + basename
+
+    def get_sha256(self, idx):
+        if idx in self.__missing_digests:
+            return None
+
+        return self.__digests[idx * 32 : idx * 32 + 32].hex()
+
+    def get_size(self, idx):
+        return self.__sizes[idx] if self.__sizes[idx] >= 0 else None
+
+    def get_dexofuzzy(self, idx):
+        return self.__dexofuzzy[idx]
+
+    def get_dexofuzzy_list(self):
+        """
+        This function returns the dexofuzzy column.
+        :return: list of dexofuzzy
+        """
+
+        return list(self.__dexofuzzy)
+
+    def get_digests(self):
+        """
+        This function returns the sha256 column as a single bytes object of 32 bytes per record.
+        :return: bytes
+        """
+
+        return bytes(self.__digests)
+
+    def get_sizes(self):
+        """
+        This function returns the size column.
+        :return: array of int
+        """
+
+        return array.array("q", self.__sizes)
+
+    def to_dicts(self):
+        """
+        This function converts the records to report dicts one at a time.
+        :return: generator of dict
+        """
+
+        for record in self:
+            yield record.to_dict()
+
+
+class RecordError(Exception):
+    """
+    This class handles exceptions that occur in the process of storing records.
+    """
@@ -0,0 +1,334 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import hashlib
+import http.server
+import io
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+
+# Internal packages
+from dexofuzzy.core.arena import BufferArena
+from dexofuzzy.core.discovery import DEX_MAGIC_NUMBERS, ZIP_MAGIC_NUMBERS
+from dexofuzzy.core.generator import Generator
+from dexofuzzy.core.isolation import IsolatedPool
+
+_generator = None
+
+
+def _hash_sample(task):
+    # Each worker process keeps its generator, and the arena its dex files are inflated into.
+    global _generator
+
+    if _generator is None:
+        _generator = Generator(arena=BufferArena())
+
+    sample, is_archive = task
+
+    return _generator.get_dexofuzzy(io.BytesIO(sample) if is_archive else sample)
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    This class handles the requests of the dexofuzzy server.
+
+    GET  /health                                   the server status
+    POST /hash  (application/octet-stream)         hash the raw dex or apk bytes of the body
+    POST /hash  (application/json {"path": ...})   hash a sample on the server's file system
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # A stalled client must not hold its connection, or its slot, forever.
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.__send_json(404, {"error": "Not found"})
+            return
+
+        status = {}
+        status["status"] = "shutting down" if self.server.closing else "ok"
+        status["workers"] = self.server.pool.workers
+        status["in_flight"] = self.server.in_flight
+        status["max_pending"] = self.server.max_pending
+        status["timeout"] = self.server.pool.timeout
+        self.__send_json(200, status)
+
+    def do_POST(self):
+        if self.path != "/hash":
+            self.__send_json(404, {"error": "Not found"})
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.__send_json(411, {"error": "Content-Length required"})
+            return
+
+        if int(length) > self.server.max_request_size:
+            self.close_connection = True
+            self.__send_json(413, {"error": f"Request exceeds {self.server.max_request_size} bytes"})
+            return
+
+        if self.server.closing or not self.server.slots.acquire():
+            self.close_connection = True
+            self.__send_json(503, {"error": "Server busy"}, {"Retry-After": "1"})
+            return
+
+        try:
+            try:
+                body = self.__read_body(int(length))
+
+            except TimeoutError:
+                self.close_connection = True
+                self.__send_json(408, {"error": f"The body took longer than {self.server.request_timeout} seconds"})
+                return
+
+            except ConnectionError:
+                self.close_connection = True
+                return
+
+            status, report = self.__hash(body)
+            self.__send_json(status, report)
+
+        finally:
+            self.server.slots.release()
+
+    def __read_body(self, length):
+        # The socket timeout bounds each read, the deadline a client trickling its body.
+        deadline = time.monotonic() + self.server.request_timeout
+        chunks = []
+
+        while length > 0:
+            if time.monotonic() > deadline:
+                raise TimeoutError("The request body is too slow")
+
+            chunk = self.rfile.read(min(length, 1 << 20))
+            if not chunk:
+                raise ConnectionError("The client closed the connection")
+
+            chunks.append(chunk)
+            length -= len(chunk)
+
+        return b"".join(chunks)
+
+    def __hash(self, body):
+        started = time.perf_counter()
+        report = {}
+
+        if self.headers.get_content_type() == "application/json":
+            try:
+                file_path = json.loads(body)["path"]
+                if not isinstance(file_path, str):
+                    raise TypeError("path must be of string type")
+
+                file_stat = os.stat(file_path)
+                if not stat.S_ISREG(file_stat.st_mode):
+                    raise ValueError(f"{file_path} is not a regular file")
+
+                if file_stat.st_size > self.server.max_request_size:
+                    return 413, {"error": f"The sample exceeds {self.server.max_request_size} bytes"}
+
+                # The sample is hashed in chunks, so the server never holds all of it.
+                sha256 = BufferArena().get_digest(file_path).hex()
+
+                report["name"] = file_path
+                report["sha256"] = sha256
+                report["size"] = str(file_stat.st_size)
+                sample = file_path
+                is_archive = False
+
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                return 400, {"error": f"{type(e).__name__}: {e}"}
+
+        else:
+            # A body that is neither would be hashed as an empty dex, so it is refused.
+            if body[0:4] in ZIP_MAGIC_NUMBERS:
+                is_archive = True
+            elif body[0:8] in DEX_MAGIC_NUMBERS:
+                is_archive = False
+            else:
+                return 422, {"error": "The body is neither a dex nor an apk file"}
+
+            report["name"] = "Undefined"
+            report["sha256"] = hashlib.sha256(body).hexdigest()
+            report["size"] = str(len(body))
+            sample = body
+
+        # The worker of a sample that times out or crashes is killed and replaced, freeing its slot.
+        status, value, _ = self.server.pool.run((sample, is_archive))
+
+        if status == "timeout":
+            return 504, {"error": value}
+
+        if status != "ok":
+            return 422, {"error": value}
+
+        report["dexofuzzy"] = value
+
+        report["elapsed"] = round(time.perf_counter() - started, 6)
+        return 200, report
+
+    def __send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("UTF-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no address.
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class Server:
+    """
+    This class serves dexofuzzy over localhost HTTP or a Unix socket with warm workers.
+    A sample taking longer than `timeout` seconds is answered with 504, and
+    its worker is killed and replaced. A request whose body takes longer than
+    `request_timeout` seconds to arrive is answered with 408.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, unix_socket=None, workers=None,
+                 max_pending=None, max_request_size=256 * 1024 * 1024, verbose=False,
+                 timeout=60, memory_limit=None, request_timeout=30):
+        self.pool = IsolatedPool(_hash_sample, workers=workers, timeout=timeout, memory_limit=memory_limit)
+        self.pool.start()
+        self.max_pending = max_pending or self.pool.workers * 2
+        self.unix_socket = unix_socket
+
+        try:
+            if unix_socket:
+                if os.path.exists(unix_socket):
+                    os.unlink(unix_socket)
+
+                self.httpd = _UnixHTTPServer(unix_socket, RequestHandler)
+                self.address = unix_socket
+            else:
+                self.httpd = _TCPHTTPServer((host, port), RequestHandler)
+                self.address = f"http://{host}:{self.httpd.server_address[1]}"
+
+        except Exception:
+            self.pool.close()
+            ServerError("Unable to listen")
+            raise
+
+        self.httpd.pool = self.pool
+        self.httpd.slots = _CountingSemaphore(self.max_pending)
+        self.httpd.max_pending = self.max_pending
+        self.httpd.max_request_size = max_request_size
+        self.httpd.request_timeout = request_timeout
+        self.httpd.verbose = verbose
+        self.httpd.closing = False
+
+    def serve_forever(self):
+        """
+        This function handles requests until shutdown is called.
+        """
+
+        try:
+            self.httpd.serve_forever()
+
+        finally:
+            self.close()
+
+    def shutdown(self, timeout=30):
+        """
+        This function stops accepting requests and waits for the ones in flight.
+        It must be called from a thread other than the one running serve_forever.
+        :param timeout: seconds to wait for the requests in flight
+        """
+
+        self.httpd.closing = True
+        deadline = time.monotonic() + timeout
+
+        while self.httpd.in_flight and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.httpd.shutdown()
+
+    def close(self):
+        """
+        This function releases the socket and the worker processes.
+        """
+
+        self.httpd.server_close()
+        self.pool.close()
+
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
+
+
+class _CountingSemaphore:
+    def __init__(self, value):
+        self.__lock = threading.Lock()
+        self.__value = value
+        self.in_flight = 0
+
+    def acquire(self):
+        with self.__lock:
+            if self.in_flight >= self.__value:
+                return False
+
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.__lock:
+            self.in_flight -= 1
+
+
+class _ServerMixIn(socketserver.ThreadingMixIn):
+    daemon_threads = True
+
+    @property
+    def in_flight(self):
+        return self.slots.in_flight
+
+
+class _TCPHTTPServer(_ServerMixIn, http.server.HTTPServer):
+    pass
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _UnixHTTPServer(_ServerMixIn, socketserver.UnixStreamServer):
+        def server_bind(self):
+            socketserver.UnixStreamServer.server_bind(self)
+            self.server_name = "localhost"
+            self.server_port = 0
+
+
+class ServerError(Exception):
+    """
+    This class handles exceptions that occur in the process of serving dexofuzzy.
+    """
@@ -0,0 +1,481 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+This is a pure Python implementation of the spamsum algorithm producing the same
+fuzzy hashes and match scores as ssdeep (libfuzzy 2.14) by Jesse Kornblum.
+When numpy is available, hash_many computes the rolling hash of many inputs
+at once over a single packed buffer.
+"""
+
+# 3rd-party packages
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Length of an individual fuzzy hash signature component
+SPAMSUM_LENGTH = 64
+
+ROLLING_WINDOW = 7
+MIN_BLOCKSIZE = 3
+NUM_BLOCKHASHES = 31
+
+B64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+B64_TABLE = numpy.frombuffer(B64.encode("ascii"), dtype=numpy.uint8) if numpy else None
+
+# The FNV hash of libfuzzy only ever emits its lowest 6 bits, so it is kept
+# reduced modulo 64: HASH_INIT is 0x28021967 & 0x3f, and HASH_PRIME & 0x3f is 0x13.
+HASH_INIT = 0x27
+SUM_TABLE = bytes(((h * 0x13) & 0x3F) ^ (c & 0x3F) for h in range(64) for c in range(256))
+
+
+class SpamsumError(Exception):
+    """
+    This class handles exceptions that occur in the process of spamsum hashing.
+    """
+
+
+def hash(data, encoding="utf-8"):
+    """
+    Compute the fuzzy hash of a string or binary data.
+
+    :param str|bytes data: The data to be fuzzy hashed
+    :param str encoding: The encoding that will be used to encode data if it is a string
+    :return: The fuzzy hash of the data
+    :rtype: str
+    """
+
+    data = _to_bytes(data, encoding)
+    if numpy is not None and len(data) > 1024:
+        return hash_many([data])[0]
+
+    block_index, part_1, part_2 = _layout(len(data), *_triggers(data))
+
+    return (
+        f"{MIN_BLOCKSIZE << block_index}:"
+        + "".join(B64[_fold(data, start, end)] for start, end in part_1)
+        + ":"
+        + "".join(B64[_fold(data, start, end)] for start, end in part_2)
+    )
+
+
+def hash_many(data_list, encoding="utf-8"):
+    """
+    Compute the fuzzy hash of each string or binary data of a list in one call.
+
+    :param list data_list: The list of data to be fuzzy hashed
+    :param str encoding: The encoding that will be used to encode data if it is a string
+    :return: The list of fuzzy hashes in the same order
+    :rtype: list
+    """
+
+    if numpy is None or not data_list:
+        return [hash(data, encoding) for data in data_list]
+
+    separator = "\x00" * ROLLING_WINDOW
+    buffer = None
+
+    # Text made of single-byte characters is encoded in one go.
+    if all(isinstance(data, str) for data in data_list):
+        sizes = numpy.fromiter(map(len, data_list), dtype=numpy.int64, count=len(data_list))
+        buffer = (separator.join(data_list) + separator).encode(encoding)
+
+        if len(buffer) != sizes.sum() + ROLLING_WINDOW * len(data_list):
+            buffer = None
+
+    if buffer is None:
+        data_list = [_to_bytes(data, encoding) for data in data_list]
+        sizes = numpy.fromiter(map(len, data_list), dtype=numpy.int64, count=len(data_list))
+        buffer = separator.encode("ascii").join(data_list) + separator.encode("ascii")
+
+    if sizes.max() > (MIN_BLOCKSIZE << (NUM_BLOCKHASHES - 1)) * SPAMSUM_LENGTH:
+        raise SpamsumError("The input exceeds data types")
+
+    block_index, parts = _packed_layout(buffer, sizes)
+
+    digests = []
+    for counts, starts, ends in parts:
+        text = B64_TABLE[_packed_fold(buffer, starts, ends)].tobytes().decode("ascii")
+        bounds = numpy.cumsum(counts).tolist()
+        digests.append([text[end - count : end] for count, end in zip(counts.tolist(), bounds)])
+
+    return [
+        f"{MIN_BLOCKSIZE << index}:{part_1}:{part_2}"
+        for index, part_1, part_2 in zip(block_index.tolist(), *digests)
+    ]
+
+
+def compare(signature_1, signature_2):
+    """
+    Computes the match score between two fuzzy hash signatures.
+
+    :param str|bytes signature_1: First fuzzy hash signature
+    :param str|bytes signature_2: Second fuzzy hash signature
+    :return: A value from zero to 100 indicating the match score of the two signatures
+    :rtype: int
+    :raises SpamsumError: If one of the signatures is badly formed
+    """
+
+    block_size_1, s1b1, s1b2 = _parse_signature(signature_1)
+    block_size_2, s2b1, s2b2 = _parse_signature(signature_2)
+
+    if (
+        block_size_1 != block_size_2
+        and block_size_1 * 2 != block_size_2
+        and (block_size_1 % 2 == 1 or block_size_1 // 2 != block_size_2)
+    ):
+        return 0
+
+    if block_size_1 == block_size_2 and s1b1 == s2b1 and s1b2 == s2b2:
+        return 100
+
+    if block_size_1 == block_size_2:
+        return max(
+            _score_strings(s1b1, s2b1, block_size_1),
+            _score_strings(s1b2, s2b2, block_size_1 * 2),
+        )
+
+    if block_size_1 * 2 == block_size_2:
+        return _score_strings(s2b1, s1b2, block_size_2)
+
+    return _score_strings(s1b1, s2b2, block_size_1)
+
+
+def _to_bytes(data, encoding):
+    if isinstance(data, str):
+        data = data.encode(encoding)
+
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        raise TypeError('"data" must be of binary or text type')
+
+    return bytes(data)
+
+
+def _triggers(data):
+    """
+    Runs the rolling hash over the data and returns the offsets and levels of
+    every reset point, where the level is the largest blockhash index the
+    point resets, together with the final rolling sum.
+    """
+
+    window = [0] * ROLLING_WINDOW
+    h1 = h2 = h3 = 0
+    offsets = []
+    levels = []
+    roll_sum = 0
+
+    for offset, char in enumerate(data):
+        h2 = (h2 - h1 + ROLLING_WINDOW * char) & 0xFFFFFFFF
+        h1 = h1 + char - window[offset % ROLLING_WINDOW]
+        window[offset % ROLLING_WINDOW] = char
+        h3 = ((h3 << 5) ^ char) & 0xFFFFFFFF
+        roll_sum = (h1 + h2 + h3) & 0xFFFFFFFF
+
+        reset = roll_sum + 1
+        if reset % MIN_BLOCKSIZE == 0 and reset != 0x100000000:
+            offsets.append(offset)
+            levels.append((reset & -reset).bit_length() - 1)
+
+    return offsets, levels, roll_sum
+
+
+def _layout(total_size, offsets, levels, roll_sum):
+    """
+    Chooses the blocksize the way libfuzzy does and lays out both parts of the
+    signature as the [start, end) pieces whose FNV hash gives each character.
+    """
+
+    if total_size > (MIN_BLOCKSIZE << (NUM_BLOCKHASHES - 1)) * SPAMSUM_LENGTH:
+        raise SpamsumError("The input exceeds data types")
+
+    histogram = [0] * (max(levels, default=-1) + 1)
+    for level in levels:
+        histogram[level] += 1
+
+    block_index = 0
+    while (MIN_BLOCKSIZE << block_index) * SPAMSUM_LENGTH < total_size:
+        block_index += 1
+
+    # A blockhash only exists once the previous one has hit a reset point.
+    block_index = min(block_index, len(histogram), NUM_BLOCKHASHES - 1)
+    while block_index > 0 and sum(histogram[block_index:]) < SPAMSUM_LENGTH // 2:
+        block_index -= 1
+
+    resets = [offset for offset, level in zip(offsets, levels) if level >= block_index]
+    part_1 = _pieces(resets, SPAMSUM_LENGTH - 1, total_size, roll_sum)
+
+    resets = [offset for offset, level in zip(offsets, levels) if level > block_index]
+    part_2 = _pieces(resets, SPAMSUM_LENGTH // 2 - 1, total_size, roll_sum)
+
+    return block_index, part_1, part_2
+
+
+def _pieces(resets, limit, total_size, roll_sum):
+    """
+    The blockhash is reset at the first limit reset points only, so the final
+    piece runs on to the end of the data, or to the last reset point when the
+    rolling sum ends on zero.
+    """
+
+    pieces = []
+    start = 0
+
+    for offset in resets[:limit]:
+        pieces.append((start, offset + 1))
+        start = offset + 1
+
+    if roll_sum != 0:
+        pieces.append((start, total_size))
+
+    elif len(resets) > limit:
+        pieces.append((start, resets[-1] + 1))
+
+    return pieces
+
+
+def _fold(data, start, end):
+    h = HASH_INIT
+    for char in data[start:end]:
+        h = SUM_TABLE[(h << 8) | char]
+
+    return h
+
+
+def _packed_layout(buffer, sizes):
+    """
+    The vectorized form of _triggers and _layout. The inputs are packed into
+    one buffer separated by ROLLING_WINDOW zero bytes, which brings the rolling
+    hash back to its initial state at the start of every input.
+    """
+
+    chars = numpy.frombuffer(
+        b"\x00" * (ROLLING_WINDOW - 1) + buffer, dtype=numpy.uint8
+    ).astype(numpy.uint32)
+    length = len(buffer)
+
+    # h1 + h2 weighs the window by ROLLING_WINDOW + 1 - age, h3 shifts it by 5 * age.
+    roll_sums = numpy.zeros(length, dtype=numpy.uint32)
+    h3 = numpy.zeros(length, dtype=numpy.uint32)
+    scratch = numpy.empty(length, dtype=numpy.uint32)
+
+    for age in range(ROLLING_WINDOW):
+        window = chars[ROLLING_WINDOW - 1 - age : ROLLING_WINDOW - 1 - age + length]
+        numpy.multiply(window, numpy.uint32(ROLLING_WINDOW + 1 - age), out=scratch)
+        roll_sums += scratch
+        numpy.left_shift(window, numpy.uint32(5 * age), out=scratch)
+        h3 ^= scratch
+
+    roll_sums += h3
+    bases = numpy.concatenate(([0], numpy.cumsum(sizes + ROLLING_WINDOW)[:-1]))
+    inside = numpy.ones(length, dtype=bool)
+    inside[(bases + sizes)[:, None] + numpy.arange(ROLLING_WINDOW)] = False
+
+    reset = roll_sums + numpy.uint32(1)
+    offsets = numpy.flatnonzero((reset % numpy.uint32(MIN_BLOCKSIZE) == 0) & (reset != 0) & inside)
+    reset = reset[offsets].astype(numpy.int64)
+    levels = numpy.minimum(numpy.log2(reset & -reset).astype(numpy.int64), NUM_BLOCKHASHES - 1)
+
+    item_ids = numpy.searchsorted(bases, offsets, side="right") - 1
+    offsets -= bases[item_ids]
+
+    last = numpy.maximum(bases + sizes - 1, 0)
+    roll_sums = numpy.where(sizes > 0, roll_sums[last], 0)
+
+    # histogram[level, item] is the number of reset points of at least that level.
+    histogram = numpy.zeros((NUM_BLOCKHASHES + 1, len(sizes)), dtype=numpy.int64)
+    histogram[:NUM_BLOCKHASHES] = numpy.bincount(
+        levels * len(sizes) + item_ids, minlength=NUM_BLOCKHASHES * len(sizes)
+    ).reshape(NUM_BLOCKHASHES, len(sizes))[::-1].cumsum(axis=0)[::-1]
+
+    block_index = numpy.zeros(len(sizes), dtype=numpy.int64)
+    while True:
+        grow = (MIN_BLOCKSIZE << block_index) * SPAMSUM_LENGTH < sizes
+        if not grow.any():
+            break
+        block_index += grow
+
+    block_index = numpy.minimum(block_index, (histogram > 0).sum(axis=0))
+    block_index = numpy.minimum(block_index, NUM_BLOCKHASHES - 1)
+    while True:
+        shrink = (block_index > 0) & (
+            histogram[block_index, numpy.arange(len(sizes))] < SPAMSUM_LENGTH // 2
+        )
+        if not shrink.any():
+            break
+        block_index -= shrink
+
+    parts = []
+    for threshold, limit in ((block_index, SPAMSUM_LENGTH - 1), (block_index + 1, SPAMSUM_LENGTH // 2 - 1)):
+        selected = levels >= threshold[item_ids]
+        counts, starts, ends = _packed_pieces(
+            item_ids[selected], offsets[selected], limit, sizes, roll_sums
+        )
+        parts.append((counts, starts + numpy.repeat(bases, counts), ends + numpy.repeat(bases, counts)))
+
+    return block_index, parts
+
+
+def _packed_pieces(item_ids, resets, limit, sizes, roll_sums):
+    """
+    The vectorized form of _pieces over the reset points of every input.
+    :return: the number of pieces of each input and the [start, end) of every piece
+    """
+
+    resets_count = numpy.bincount(item_ids, minlength=len(sizes))
+    first = numpy.cumsum(resets_count) - resets_count
+    rank = numpy.arange(len(resets)) - first[item_ids]
+
+    used = numpy.minimum(resets_count, limit)
+    final = (roll_sums != 0) | (resets_count > limit)
+    counts = used + final
+    position = numpy.cumsum(counts) - counts
+
+    starts = numpy.zeros(counts.sum(), dtype=numpy.int64)
+    ends = numpy.zeros(counts.sum(), dtype=numpy.int64)
+
+    piece = rank < limit
+    previous = numpy.concatenate(([0], resets[:-1] + 1))
+    starts[position[item_ids[piece]] + rank[piece]] = numpy.where(rank[piece] > 0, previous[piece], 0)
+    ends[position[item_ids[piece]] + rank[piece]] = resets[piece] + 1
+
+    final_start = numpy.zeros(len(sizes), dtype=numpy.int64)
+    final_start[used > 0] = resets[(first + used - 1)[used > 0]] + 1
+    final_end = sizes.copy()
+    tail = final & (roll_sums == 0)
+    final_end[tail] = resets[(first + resets_count - 1)[tail]] + 1
+
+    starts[(position + used)[final]] = final_start[final]
+    ends[(position + used)[final]] = final_end[final]
+
+    return counts, starts, ends
+
+
+def _packed_fold(buffer, starts, ends):
+    """
+    The vectorized form of _fold. All pieces advance one character per step,
+    shortest first dropping out, and the few longest are finished one by one.
+    """
+
+    lengths = ends - starts
+    if lengths.max(initial=0) <= 0xFFFF:
+        order = numpy.argsort(lengths.astype(numpy.uint16), kind="stable")
+    else:
+        order = numpy.argsort(lengths, kind="stable")
+    starts = starts[order]
+    lengths = lengths[order]
+
+    # (h << 8) | char stays below 1 << 14, so 16-bit lanes are wide enough.
+    chars = numpy.frombuffer(buffer, dtype=numpy.uint8).astype(numpy.uint16)
+    table = numpy.frombuffer(SUM_TABLE, dtype=numpy.uint8).astype(numpy.uint16)
+    values = numpy.full(len(order), HASH_INIT, dtype=numpy.uint16)
+
+    # Below about a hundred pieces a plain loop beats a numpy call per character.
+    firsts = numpy.searchsorted(lengths, numpy.arange(lengths.max(initial=0)), side="right").tolist()
+    step = 0
+    while step < len(firsts) and len(order) - firsts[step] >= 96:
+        first = firsts[step]
+        values[first:] = table[(values[first:] << 8) | chars[starts[first:] + step]]
+        step += 1
+
+    first = firsts[step] if step < len(firsts) else len(order)
+    ends = (starts + lengths).tolist()
+    for idx, start in zip(range(first, len(order)), starts[first:].tolist()):
+        end = ends[idx]
+        h = int(values[idx])
+        for char in buffer[start + step : end]:
+            h = SUM_TABLE[(h << 8) | char]
+
+        values[idx] = h
+
+    result = numpy.empty_like(values)
+    result[order] = values
+
+    return result
+
+
+def _eliminate_sequences(digest):
+    result = digest[:3]
+
+    for char in digest[3:]:
+        if not (char == result[-1] == result[-2] == result[-3]):
+            result += char
+
+    return result
+
+
+def _parse_signature(signature):
+    if isinstance(signature, (bytes, bytearray)):
+        signature = bytes(signature).decode("ascii")
+
+    if not isinstance(signature, str):
+        raise TypeError('"signature" must be of binary or text type')
+
+    parts = signature.split(":", 2)
+    if len(parts) != 3 or not parts[0].strip().isdigit():
+        raise SpamsumError("Badly formed signature")
+
+    block_1 = _eliminate_sequences(parts[1])
+    block_2 = _eliminate_sequences(parts[2].split(",", 1)[0])
+    if len(block_1) > SPAMSUM_LENGTH or len(block_2) > SPAMSUM_LENGTH:
+        raise SpamsumError("Badly formed signature")
+
+    return int(parts[0]), block_1, block_2
+
+
+def _has_common_substring(s1, s2):
+    substrings = {s1[i : i + ROLLING_WINDOW] for i in range(len(s1) - ROLLING_WINDOW + 1)}
+
+    return any(
+        s2[i : i + ROLLING_WINDOW] in substrings
+        for i in range(len(s2) - ROLLING_WINDOW + 1)
+    )
+
+
+def _edit_distance(s1, s2):
+    previous = list(range(len(s2) + 1))
+
+    for i1, char_1 in enumerate(s1):
+        current = [i1 + 1]
+
+        for i2, char_2 in enumerate(s2):
+            current.append(min(
+                previous[i2 + 1] + 1,
+                current[i2] + 1,
+                previous[i2] + (0 if char_1 == char_2 else 2),
+            ))
+
+        previous = current
+
+    return previous[-1]
+
+
+def _score_strings(s1, s2, block_size):
+    if len(s1) < ROLLING_WINDOW or len(s2) < ROLLING_WINDOW:
+        return 0
+
+    if not _has_common_substring(s1, s2):
+        return 0
+
+    score = _edit_distance(s1, s2)
+    score = (score * SPAMSUM_LENGTH) // (len(s1) + len(s2))
+    score = (100 * score) // SPAMSUM_LENGTH
+    score = 100 - score
+
+    if block_size >= (99 + ROLLING_WINDOW) // ROLLING_WINDOW * MIN_BLOCKSIZE:
+        return score
+
+    return min(score, block_size // MIN_BLOCKSIZE * min(len(s1), len(s2)))
@@ -0,0 +1,93 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import contextlib
+import time
+
+
+class Stats:
+    """
+    This class collects the per-stage timings and counters of one dexofuzzy computation.
+
+    Stages: inflate (reading dex from the apk), parse_tables, decode_opcodes,
+    hash_methods and hash_final. Times are in seconds; the CPU time is that
+    of the calling thread.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.bytes_read = 0
+        self.dex_count = 0
+        self.class_count = 0
+        self.method_count = 0
+        self.skipped_class_count = 0
+        self.cache_hits = 0
+        self.error = None
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """
+        This function adds the wall and CPU time of the enclosed block to a stage.
+        :param stage: string
+        """
+
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+
+        try:
+            yield
+
+        finally:
+            self.add(stage, time.perf_counter() - wall_started, time.thread_time() - cpu_started)
+
+    def add(self, stage, wall_time, cpu_time):
+        """
+        This function adds a measurement to a stage.
+        :param stage: string
+        :param wall_time: float
+        :param cpu_time: float
+        """
+
+        if stage not in self.stages:
+            self.stages[stage] = {"wall_time": 0.0, "cpu_time": 0.0, "calls": 0}
+
+        self.stages[stage]["wall_time"] += wall_time
+        self.stages[stage]["cpu_time"] += cpu_time
+        self.stages[stage]["calls"] += 1
+
+    def to_dict(self):
+        """
+        This function returns the stats as a JSON-serializable dict.
+        :return: dict
+        """
+
+        stats = {}
+        stats["wall_time"] = self.wall_time
+        stats["cpu_time"] = self.cpu_time
+        stats["stages"] = {stage: dict(values) for stage, values in self.stages.items()}
+        stats["bytes_read"] = self.bytes_read
+        stats["dex_count"] = self.dex_count
+        stats["class_count"] = self.class_count
+        stats["method_count"] = self.method_count
+        stats["skipped_class_count"] = self.skipped_class_count
+        stats["cache_hits"] = self.cache_hits
+        stats["error"] = self.error
+
+        return stats
@@ -0,0 +1,211 @@
+"""
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+# Default packages
+import json
+import os
+import time
+
+# Internal packages
+from dexofuzzy.core.discovery import Discovery
+
+
+class Watcher:
+    """
+    This class polls a directory tree for new samples without walking it again.
+
+    Only the directories whose mtime changed, or changed within the last
+    `settle` seconds (for file systems with coarse timestamps), are listed
+    again; a file is told apart by its inode, size and mtime. A new or changed
+    file is ready once it has not been modified for `settle` seconds, so that
+    files still being written are not hashed.
+
+    The files already seen can be saved to a state file and loaded on start,
+    so that a restarted watcher does not hash the samples left in the
+    directory again.
+    """
+
+    def __init__(self, directory, discovery=None, settle=2.0):
+        if not os.path.isdir(directory):
+            raise WatcherError(f"The directory {directory} not found")
+
+        self.directory = directory
+        self.discovery = discovery or Discovery()
+        self.settle = settle
+        self.__directories = {}
+        self.__files = {}
+        self.__pending = {}
+        self.__seen = {}
+        self.__changed = False
+
+    def load_state(self, file_path):
+        """
+        This function marks the files of a state file as seen, unless they changed since.
+        :param file_path: string, written by save_state
+        """
+
+        try:
+            with open(file_path, encoding="UTF-8") as state_file:
+                state = json.load(state_file)
+
+        except FileNotFoundError:
+            return
+
+        except (OSError, ValueError) as e:
+            raise WatcherError(f"Unable to load the watch state: {e}")
+
+        for relative_path, signature in state.get("seen", {}).items():
+            self.__seen[os.path.join(self.directory, relative_path)] = tuple(signature)
+
+    def save_state(self, file_path):
+        """
+        This function writes the files seen to a temporary file renamed over
+        file_path. Nothing is written if no file was seen since the last save.
+        :param file_path: string
+        """
+
+        if not self.__changed:
+            return
+
+        # Only the files still in the directory are kept, so the state does not grow with the samples removed.
+        tracked = set().union(*self.__files.values())
+        state = {}
+        state["seen"] = {
+            os.path.relpath(known, self.directory): list(signature)
+            for known, signature in self.__seen.items() if known in tracked
+        }
+
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="UTF-8") as state_file:
+            json.dump(state, state_file)
+
+        os.replace(temp_path, file_path)
+        self.__changed = False
+
+    def poll(self):
+        """
+        This function finds the samples that arrived or changed since the last poll.
+        :return: list of file path, in the order they became ready
+        """
+
+        now = time.time()
+
+        if not self.__directories:
+            self.__list(self.directory, now)
+
+        for directory, mtime in list(self.__directories.items()):
+            try:
+                current_mtime = os.stat(directory).st_mtime_ns
+
+            except OSError:
+                self.__forget(directory)
+                continue
+
+            if current_mtime != mtime or now - current_mtime / 1e9 < self.settle:
+                self.__list(directory, now)
+
+        return self.__get_ready(now)
+
+    def forget(self, file_path):
+        """
+        This function stops tracking a file, e.g. after it was moved away.
+        :param file_path: string
+        """
+
+        self.__pending.pop(file_path, None)
+        self.__seen.pop(file_path, None)
+        self.__files.get(os.path.dirname(file_path), set()).discard(file_path)
+
+    def __list(self, directory, now):
+        try:
+            self.__directories[directory] = os.stat(directory).st_mtime_ns
+
+        except OSError:
+            self.__forget(directory)
+            return
+
+        files, subdirectories = self.discovery.list_directory(self.directory, directory)
+        file_paths = set()
+
+        for file_path, stat in files:
+            file_paths.add(file_path)
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+            if self.__seen.get(file_path) == signature:
+                continue
+
+            if file_path not in self.__pending or self.__pending[file_path][0] != signature:
+                self.__pending[file_path] = (signature, now)
+
+        for file_path in self.__files.get(directory, set()) - file_paths:
+            self.__pending.pop(file_path, None)
+            self.__seen.pop(file_path, None)
+
+        self.__files[directory] = file_paths
+
+        for subdirectory in subdirectories:
+            if subdirectory not in self.__directories:
+                self.__list(subdirectory, now)
+
+    def __forget(self, directory):
+        prefix = directory + os.sep
+
+        for known in [known for known in self.__directories if known == directory or known.startswith(prefix)]:
+            del self.__directories[known]
+
+            for file_path in self.__files.pop(known, set()):
+                self.__pending.pop(file_path, None)
+                self.__seen.pop(file_path, None)
+
+    def __get_ready(self, now):
+        ready = []
+
+        for file_path, (signature, since) in list(self.__pending.items()):
+            # Writing to a file does not touch its directory, so each pending file is checked.
+            try:
+                stat = os.stat(file_path)
+
+            except OSError:
+                del self.__pending[file_path]
+                continue
+
+            current = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+            if current != signature:
+                self.__pending[file_path] = (current, now)
+                continue
+
+            if now - since < self.settle and now - stat.st_mtime < self.settle:
+                continue
+
+            del self.__pending[file_path]
+            self.__seen[file_path] = signature
+            self.__changed = True
+
+            if self.discovery.check_magic and not self.discovery.has_magic(file_path):
+                self.discovery.skipped_count += 1
+                continue
+
+            ready.append(file_path)
+
+        return ready
+
+
+class WatcherError(Exception):
+    """
+    This class handles exceptions that occur in the process of watching a directory.
+    """
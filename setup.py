@@ -31,11 +31,12 @@ setup(
     author_email="""lee1029ng@gmail.com""",
     url="https://github.com/lee1029ng/Dexofuzzy",
     license="Apache License 2.0",
-    python_requires=">=3.5",
+    python_requires=">=3.7",
     include_package_data=True,
     ext_package="dexofuzzy",
-    packages=find_packages(exclude=[]),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=["ssdeep==3.4; platform_system!='Windows'"],
+    extras_require={"numpy": ["numpy"]},
     entry_points={
         "console_scripts": ["dexofuzzy=dexofuzzy.cli:execute_from_command_line"],
     },
@@ -45,6 +46,6 @@ setup(
     ],
     classifiers=[
         "License :: OSI Approved :: Apache Software License",
-        "Programming Language :: Python :: 3.5",
+        "Programming Language :: Python :: 3.7",
     ],
 )